@@ -0,0 +1,331 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(REPO_ROOT))
+sys.path.append(str(REPO_ROOT / "mcp_server"))
+from benchmarks.synthetic import latency_samples, make_histogram, write_report, write_run_directory
+
+RESULTS_DIR = REPO_ROOT / "data" / "benchmarks"
+DEFAULT_BASELINE = RESULTS_DIR / "baseline.json"
+DEFAULT_RESULTS = RESULTS_DIR / "latest.json"
+RESULTS_FORMAT = 1
+# A benchmark regresses when its median is this much slower than the baseline's...
+DEFAULT_THRESHOLD = 0.15
+# ...and the slowdown is also larger than this many times the runs' own spread.
+NOISE_MULTIPLIER = 3.0
+MIN_TIME = 0.5
+RUN_DIRECTORY_FILES = 10_000
+PERCENTILE_SAMPLES = 1_000_000
+
+
+class Workspace:
+    """Synthetic fixtures in a temporary directory, each generated on first use."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self._fixtures = {}
+
+    def fixture(self, name, build):
+        if name not in self._fixtures:
+            self._fixtures[name] = build()
+        return self._fixtures[name]
+
+    def report_pair(self, size):
+        def build():
+            runs_dir = self.root / f"reports-{size}"
+            return (write_report(runs_dir, f"{size}-baseline", size, scale=1.0, seed=1),
+                    write_report(runs_dir, f"{size}-test", size, scale=1.15, seed=2))
+        return self.fixture(f"reports-{size}", build)
+
+    def run_directory(self):
+        return self.fixture("run-directory", lambda: write_run_directory(self.root / "runs", RUN_DIRECTORY_FILES))
+
+    def samples(self):
+        return self.fixture("samples", lambda: latency_samples(PERCENTILE_SAMPLES, random.Random(7)))
+
+
+def bench_diff(size):
+    def setup(workspace):
+        from analysis import build_analysis, load_report
+        baseline, test = workspace.report_pair(size)
+        # The same steps as analyze_performance_diff on a cache miss.
+        return lambda: build_analysis(load_report(baseline), load_report(test))
+    return setup
+
+
+def bench_mcp_call(cached):
+    def setup(workspace):
+        from dashboard.mcp_runner import call_mcp_tool
+        baseline, test = workspace.report_pair("small")
+        stamp = [time.time_ns()]
+
+        def call():
+            if not cached:
+                # A new mtime changes the input fingerprint, forcing a real analysis.
+                stamp[0] += 1000
+                os.utime(test, ns=(stamp[0], stamp[0]))
+            result = call_mcp_tool(baseline, test)
+            if "error" in result:
+                raise RuntimeError(result["error"])
+        call()
+        return call
+    return setup
+
+
+def bench_mcp_ping(workspace):
+    from dashboard.mcp_runner import get_pool
+    client = get_pool().get()
+    return lambda: client.request("ping")
+
+
+def bench_list_runs(workspace):
+    from utils.run_schema import list_run_files
+    runs_dir = workspace.run_directory()
+    return lambda: list_run_files(runs_dir)
+
+
+def bench_load_runs(workspace):
+    from utils.run_schema import list_run_files, read_run_dict
+    paths = list_run_files(workspace.run_directory())
+    return lambda: [read_run_dict(path) for path in paths]
+
+
+def bench_catalog_import(workspace):
+    from utils.run_catalog import RunCatalog
+    runs_dir = workspace.run_directory()
+    counter = [0]
+
+    def run():
+        counter[0] += 1
+        RunCatalog(workspace.root / f"import-{counter[0]}.sqlite3").import_directory(runs_dir)
+    return run
+
+
+def bench_catalog_query(workspace):
+    from utils.run_catalog import RunCatalog
+    catalog = workspace.fixture("catalog", lambda: RunCatalog(workspace.root / "catalog.sqlite3"))
+    catalog.import_directory(workspace.run_directory())
+    return lambda: (catalog.query(tag="nightly", limit=50, offset=200), catalog.count(tag="nightly"))
+
+
+def bench_record_samples(workspace):
+    from utils.run_stats import RunStats
+    samples = workspace.samples()
+
+    def run():
+        # test_scenario's per-request path, then the end-of-run summary.
+        stats = RunStats()
+        for value in samples:
+            stats.record(value)
+        return stats.latency.summary()
+    return run
+
+
+def bench_from_samples(workspace):
+    from utils.histogram import LatencyHistogram
+    samples = workspace.samples()
+    # run_logger's path: a list of latencies turned into a histogram and summarized.
+    return lambda: LatencyHistogram.from_samples(samples).summary()
+
+
+def bench_summary(workspace):
+    histogram = workspace.fixture("histogram-1m", lambda: make_histogram(PERCENTILE_SAMPLES, random.Random(3)))
+    return lambda: histogram.summary()
+
+
+# name -> (setup(workspace) returning the timed callable, description, minimum repeats)
+BENCHMARKS = {
+    "diff_small": (bench_diff("small"), "load + build_analysis, 5k-request single-endpoint reports", 20),
+    "diff_large": (bench_diff("large"), "load + build_analysis, 1e6-request reports with 20 routes and 600 windows", 3),
+    "mcp_ping": (bench_mcp_ping, "JSON-RPC ping through the pooled mcp_runner client", 50),
+    "mcp_diff_cached": (bench_mcp_call(True), "call_mcp_tool round trip answered from the result cache", 50),
+    "mcp_diff_uncached": (bench_mcp_call(False), "call_mcp_tool round trip with a fresh analysis of small reports", 20),
+    "runs_list_10k": (bench_list_runs, f"list {RUN_DIRECTORY_FILES} run files", 5),
+    "runs_load_10k": (bench_load_runs, f"read and migrate {RUN_DIRECTORY_FILES} run files", 3),
+    "catalog_import_10k": (bench_catalog_import, f"index {RUN_DIRECTORY_FILES} run files into a new catalog", 3),
+    "catalog_query_page": (bench_catalog_query, "one filtered catalog page plus its count", 50),
+    "percentiles_record_1m": (bench_record_samples, "RunStats.record of 1e6 latencies + summary", 3),
+    "percentiles_from_samples_1m": (bench_from_samples, "LatencyHistogram.from_samples(1e6) + summary", 3),
+    "percentiles_summary_1m": (bench_summary, "summary() of a 1e6-request histogram", 50),
+}
+
+
+def measure(func, min_repeats, min_time=MIN_TIME):
+    func()  # warm-up: imports, caches, page cache
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < min_repeats or time.perf_counter() - started < min_time:
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+        if len(timings) >= 1000:
+            break
+    median = statistics.median(timings)
+    return {
+        "median_ms": round(median, 4),
+        "min_ms": round(min(timings), 4),
+        "mad_ms": round(statistics.median(abs(t - median) for t in timings), 4),
+        "repeats": len(timings),
+    }
+
+
+def environment():
+    return {"python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine(),
+            "cpus": os.cpu_count()}
+
+
+def run_benchmarks(pattern=None, min_time=MIN_TIME, log=print):
+    selected = [name for name in BENCHMARKS if not pattern or re.search(pattern, name)]
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="perf-bench-") as root:
+        workspace = Workspace(root)
+        try:
+            for name in selected:
+                setup, description, min_repeats = BENCHMARKS[name]
+                result = measure(setup(workspace), min_repeats, min_time)
+                result["description"] = description
+                results[name] = result
+                log(f"{name:<28} median {result['median_ms']:>10.3f} ms  (±{result['mad_ms']:.3f}, n={result['repeats']})")
+        finally:
+            if "dashboard.mcp_runner" in sys.modules:
+                sys.modules["dashboard.mcp_runner"].get_pool().close()
+    return {
+        "format": RESULTS_FORMAT,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "benchmarks": results,
+    }
+
+
+def save_results(results, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+
+
+def load_results(path):
+    results = json.loads(Path(path).read_text(encoding="utf-8"))
+    if results.get("format") != RESULTS_FORMAT:
+        raise ValueError(f"{path}: unsupported benchmark results format {results.get('format')}")
+    return results
+
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Per-benchmark verdicts; a slowdown must beat both ``threshold`` and the measured noise."""
+    rows = []
+    for name, now in current["benchmarks"].items():
+        before = baseline["benchmarks"].get(name)
+        if before is None:
+            rows.append({"name": name, "status": "new", "current_ms": now["median_ms"]})
+            continue
+        change = (now["median_ms"] - before["median_ms"]) / before["median_ms"]
+        noise = NOISE_MULTIPLIER * (before["mad_ms"] + now["mad_ms"]) / before["median_ms"]
+        allowed = max(threshold, noise)
+        if change > allowed:
+            status = "regressed"
+        elif change < -allowed:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append({
+            "name": name, "status": status, "baseline_ms": before["median_ms"], "current_ms": now["median_ms"],
+            "change_percent": round(change * 100, 2), "allowed_percent": round(allowed * 100, 2),
+        })
+    for name in baseline["benchmarks"]:
+        if name not in current["benchmarks"]:
+            rows.append({"name": name, "status": "missing"})
+    return rows
+
+
+def print_comparison(rows, baseline, current):
+    if baseline.get("environment") != current.get("environment"):
+        print("Note: baseline was recorded in a different environment; timings may not be comparable.")
+    for row in rows:
+        if "change_percent" in row:
+            print(f"{row['status'].upper():<10} {row['name']:<28} {row['baseline_ms']:>10.3f} → {row['current_ms']:>10.3f} ms "
+                  f"({row['change_percent']:+.1f}%, allowed ±{row['allowed_percent']:.1f}%)")
+        else:
+            print(f"{row['status'].upper():<10} {row['name']}")
+
+
+def cmd_run(args):
+    results = run_benchmarks(args.filter, args.min_time)
+    save_results(results, args.output)
+    print(f"Results written to {args.output}")
+    if args.save_baseline:
+        save_results(results, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if args.compare:
+        return compare_files(args.baseline, results, args.threshold)
+    return 0
+
+
+def compare_files(baseline_path, current, threshold):
+    baseline = load_results(baseline_path)
+    rows = compare_results(baseline, current, threshold)
+    print_comparison(rows, baseline, current)
+    regressed = [row["name"] for row in rows if row["status"] == "regressed"]
+    if regressed:
+        print(f"{len(regressed)} benchmark(s) regressed: {', '.join(regressed)}")
+        return 1
+    return 0
+
+
+def cmd_compare(args):
+    return compare_files(args.baseline, load_results(args.current), args.threshold)
+
+
+def cmd_list(args):
+    for name, (_, description, _) in BENCHMARKS.items():
+        print(f"{name:<28} {description}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the analyzer's own hot paths")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the benchmarks and write machine-readable results")
+    run.add_argument("-k", "--filter", help="Only benchmarks whose name matches this regular expression")
+    run.add_argument("--output", type=Path, default=DEFAULT_RESULTS)
+    run.add_argument("--min-time", type=float, default=MIN_TIME, help="Seconds to keep repeating each benchmark")
+    run.add_argument("--save-baseline", action="store_true", help="Also store the results as the new baseline")
+    run.add_argument("--compare", action="store_true", help="Compare against the baseline; exit 1 on a regression")
+    run.set_defaults(func=cmd_run)
+
+    compare = commands.add_parser("compare", help="Compare stored results; exit 1 on a regression")
+    compare.add_argument("--current", type=Path, default=DEFAULT_RESULTS)
+    compare.set_defaults(func=cmd_compare)
+
+    for command in (run, compare):
+        command.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+        command.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                             help="Relative slowdown tolerated before a benchmark counts as regressed (0.15 = 15%%)")
+
+    listing = commands.add_parser("list", help="List the benchmarks")
+    listing.set_defaults(func=cmd_list)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args)
+    except (OSError, ValueError) as e:
+        print(f"run_benchmarks: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+import random
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from utils.histogram import LatencyHistogram
+from utils.run_stats import RunStats
+from utils.run_schema import RunRecord, EndpointSummary, run_file_path, write_run
+from utils.timeseries import TimeSeriesWriter, timeseries_path, window_record
+
+# Report shapes: "small" is a single-endpoint run with a modest histogram;
+# "large" has a 1e6-request histogram, 20 routes and a 10-minute windows file.
+REPORT_SIZES = {
+    "small": {"requests": 5_000, "routes": 0, "windows": 0},
+    "large": {"requests": 1_000_000, "routes": 20, "windows": 600},
+}
+# Histograms are filled with this many distinct draws, each recorded with a
+# weight, so a 1e6-request histogram is built in milliseconds.
+DISTINCT_SAMPLES = 20_000
+
+
+def latency_samples(count, rng, median_ms=40.0, sigma=0.5, scale=1.0):
+    return [rng.lognormvariate(0.0, sigma) * median_ms * scale for _ in range(count)]
+
+
+def make_histogram(requests, rng, scale=1.0):
+    histogram = LatencyHistogram()
+    distinct = min(requests, DISTINCT_SAMPLES)
+    weight, remainder = divmod(requests, distinct)
+    for index, value in enumerate(latency_samples(distinct, rng, scale=scale)):
+        histogram.record(value, weight + (1 if index < remainder else 0))
+    return histogram
+
+
+def make_record(run_id, size="small", scale=1.0, seed=0, timestamp=None):
+    """A synthetic RunRecord whose latencies are multiplied by ``scale``."""
+    shape = REPORT_SIZES[size]
+    rng = random.Random(seed)
+    histogram = make_histogram(shape["requests"], rng, scale)
+    latency = histogram.summary()
+    record = RunRecord(
+        run_id=run_id,
+        timestamp=timestamp or "2026-01-01T00:00:00",
+        endpoint="/synthetic",
+        total_requests=shape["requests"],
+        error_rate=0.1,
+        avg_response_time=latency["avg"],
+        p50_response_time=latency["p50"],
+        p90_response_time=latency["p90"],
+        p95_response_time=latency["p95"],
+        p99_response_time=latency["p99"],
+        p999_response_time=latency["p999"],
+        max_response_time=latency["max"],
+        latency_histogram=histogram.to_dict(),
+        tags=["synthetic"],
+    )
+    if shape["routes"]:
+        record.scenario_file = "synthetic.json"
+        record.endpoints = {}
+        for index in range(shape["routes"]):
+            route = make_histogram(shape["requests"] // shape["routes"], rng, scale)
+            summary = route.summary(qs=(50, 95, 99))
+            record.endpoints[f"route-{index}"] = EndpointSummary(
+                path=f"/route/{index}", total_requests=route.count, error_rate=0.1,
+                avg_response_time=summary["avg"], p50_response_time=summary["p50"],
+                p95_response_time=summary["p95"], p99_response_time=summary["p99"],
+                latency_histogram=route.to_dict(),
+            )
+    return record
+
+
+def write_windows(run_file, windows, rng, scale=1.0, requests_per_window=200):
+    path = timeseries_path(run_file)
+    writer = TimeSeriesWriter(path)
+    for second in range(windows):
+        stats = RunStats()
+        for value in latency_samples(requests_per_window, rng, scale=scale):
+            stats.record(value)
+        writer.write([window_record(1_700_000_000.0 + second, 1.0, stats)])
+    writer.close()
+    return path
+
+
+def write_report(runs_dir, run_id, size="small", scale=1.0, seed=0, fmt=None):
+    record = make_record(run_id, size, scale, seed)
+    run_file = run_file_path(runs_dir, run_id, fmt)
+    windows = REPORT_SIZES[size]["windows"]
+    if windows:
+        record.timeseries_file = write_windows(run_file, windows, random.Random(seed + 1), scale).name
+        record.window_seconds = 1.0
+    write_run(run_file, record)
+    return run_file
+
+
+def write_run_directory(runs_dir, count, seed=0):
+    """``count`` small run files, as a long-lived ``data/runs`` would hold."""
+    rng = random.Random(seed)
+    runs_dir = Path(runs_dir)
+    runs_dir.mkdir(parents=True, exist_ok=True)
+    for index in range(count):
+        # Small histograms keep 10k files quick to generate; the catalog only reads the summary.
+        histogram = make_histogram(200, rng)
+        latency = histogram.summary()
+        day, second = divmod(index, 86_400)
+        record = RunRecord(
+            run_id=f"bench-{index:06d}",
+            timestamp=f"2026-01-{1 + day % 28:02d}T{second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}",
+            endpoint=f"/endpoint/{index % 10}",
+            total_requests=histogram.count,
+            error_rate=round(rng.random(), 2),
+            avg_response_time=latency["avg"],
+            p95_response_time=latency["p95"],
+            p99_response_time=latency["p99"],
+            latency_histogram=histogram.to_dict(),
+            tags=["nightly"] if index % 7 == 0 else [],
+        )
+        write_run(run_file_path(runs_dir, record.run_id), record)
+    return runs_dir
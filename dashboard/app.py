@@ -1,140 +1,351 @@
 import streamlit as st
-import json
 from pathlib import Path
 import pandas as pd
-import matplotlib.pyplot as plt
-import subprocess
-import time
 from datetime import datetime
 import sys
 import os
-import threading
-import queue
+import html
+import shutil
+import uuid
 
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 from utils.run_logger import save_run_data
+from utils.run_catalog import RunCatalog, SERIES_METRICS
+from utils.trend import TrendEngine
+from utils.timeseries import WindowTail, timeseries_path
+from utils.run_schema import run_file_path
+from utils.phase_timing import compare_phases
+from utils.retention import ENABLED as RETENTION_ENABLED, RetentionManager, RetentionWorker
+from dashboard.job_manager import JobManager
+from dashboard.log_capture import LOGS_DIR, log_path_for, log_page_count, read_log_page, list_logs
+from dashboard.data_access import (
+    query_runs, catalog_choices, load_run_summary, load_window_frames, load_sample_histogram, clear_caches,
+)
 
 st.set_page_config(page_title="Performance AI Analyzer", layout="wide")
 st.title("📊 AI-Powered Performance Degradation Dashboard")
 
-runs_path = Path(__file__).resolve().parent.parent / "data" / "runs"
+repo_root = Path(__file__).resolve().parent.parent
+runs_path = repo_root / "data" / "runs"
 runs_path.mkdir(parents=True, exist_ok=True)
 
-def get_run_files():
-    return sorted(runs_path.glob("*.json"), reverse=True)
+RUNS_PAGE_SIZE = 50
 
-def load_run_data(file):
-    return json.loads(file.read_text())
+@st.cache_resource
+def get_catalog():
+    catalog = RunCatalog()
+    # One-shot import of run files written before the catalog existed.
+    catalog.import_directory(runs_path)
+    return catalog
+
+catalog = get_catalog()
+
+@st.cache_resource
+def get_trend_engine():
+    # Kept across reruns so each refresh only scores runs indexed since the last one.
+    return TrendEngine(catalog)
+
+TREND_POINTS = 500
+
+@st.cache_resource
+def get_job_manager():
+    # Shared by every session and rerun, so tests keep running while the script reruns.
+    return JobManager()
+
+job_manager = get_job_manager()
+
+@st.cache_resource
+def get_service_manager():
+    # Long-running helpers such as the mock target, kept apart so they never take a load-test slot.
+    return JobManager(max_concurrent=4)
+
+service_manager = get_service_manager()
+
+@st.cache_resource
+def get_retention_worker():
+    # One background thread per dashboard process; each pass handles a bounded batch of old runs.
+    return RetentionWorker(RetentionManager(runs_dir=runs_path, catalog=catalog)).start()
+
+@st.cache_resource
+def get_mock_target_state():
+    # Where the mock target listens, shared like the job that runs it.
+    return {"url": None}
+
+mock_target = get_mock_target_state()
+MOCK_DISTRIBUTIONS = ["constant", "uniform", "normal", "lognormal", "exponential", "pareto"]
+
+JOB_STATUS_ICONS = {"queued": "⏳", "running": "🏃", "succeeded": "✅", "failed": "❌", "cancelled": "🛑"}
+LOG_BOX_STYLE = (
+    "max-height: 300px; min-height: 200px; overflow-y: auto; "
+    "background:#111; padding:8px; color:white; font-family:monospace; "
+    "border: 1px solid #ccc; border-radius: 6px; margin-bottom: 8px;"
+)
+
+LIVE_WINDOWS = 300
+
+def render_live_metrics(job):
+    """Charts of the per-second windows the running test is appending to its time-series file."""
+    if not job["run_id"]:
+        return
+    tails = st.session_state.setdefault("live_tails", {})
+    tail = tails.get(job["id"])
+    if tail is None:
+        tail = tails[job["id"]] = WindowTail(timeseries_path(run_file_path(runs_path, job['run_id'])))
+    tail.poll()
+    live = tail.windows()[-LIVE_WINDOWS:]
+    if not live:
+        st.caption("Waiting for the first metrics window...")
+        return
+    start = live[0]["t"]
+    frame = pd.DataFrame(live, index=[round(w["t"] - start, 3) for w in live])
+    latest = live[-1]
+    rps_col, err_col, p95_col = st.columns(3)
+    rps_col.metric("Throughput (req/s)", latest["rps"])
+    err_col.metric("Error rate (%)", latest.get("error_rate", 0))
+    p95_col.metric("p95 (ms)", latest["p95"])
+    st.line_chart(frame[["rps"]])
+    st.line_chart(frame[["p50", "p95", "p99"]])
+    if "error_rate" in frame:
+        st.line_chart(frame[["error_rate"]])
+
+@st.fragment(run_every=1)
+def render_jobs():
+    jobs = job_manager.snapshot()
+    if not jobs:
+        return
+    st.subheader("🧵 Load Test Jobs")
+    finished = {job["id"] for job in jobs if job["status"] not in ("queued", "running")}
+    seen = st.session_state.setdefault("finished_jobs", set(finished))
+    for job in jobs:
+        icon = JOB_STATUS_ICONS.get(job["status"], "")
+        title = f"{icon} #{job['id']} {job['label']} — {job['status']} ({job['elapsed']}s)"
+        with st.expander(title, expanded=job["status"] == "running"):
+            if job["status"] == "running":
+                percent = int(job["progress"] * 100)
+                st.progress(job["progress"], text=f"{percent}% completed")
+                render_live_metrics(job)
+            if job["status"] in ("queued", "running"):
+                if st.button("🛑 Cancel", key=f"cancel-job-{job['id']}"):
+                    job_manager.cancel(job["id"])
+            rendered = html.escape(job["log_tail"]) or "Waiting for logs..."
+            st.markdown(f"<div style='{LOG_BOX_STYLE}'><pre>{rendered}</pre></div>", unsafe_allow_html=True)
+    for job_id in finished:
+        st.session_state.get("live_tails", {}).pop(job_id, None)
+    if finished - seen:
+        # A run just finished: rerun the whole app so the run list and trend pick it up.
+        seen.update(finished)
+        st.rerun(scope="app")
 
 st.sidebar.title("⚙️ Controls")
 if st.sidebar.button("🗑️ Clear History"):
-    for file in get_run_files():
+    for file in runs_path.glob("run_*"):
         file.unlink()
+    shutil.rmtree(runs_path.parent / "samples", ignore_errors=True)
+    active_logs = {job["log_path"] for job in job_manager.snapshot() if job["status"] in ("queued", "running")}
+    for log_file in list_logs():
+        if str(log_file) not in active_logs:
+            log_file.unlink()
+    catalog.clear()
+    clear_caches()
     msg = st.success("✅ All runs deleted.")
     import time as pytime
     pytime.sleep(2)
     msg.empty()
 if st.sidebar.button("🔄 Refresh Runs"):
     st.rerun()
+if RETENTION_ENABLED:
+    retention = get_retention_worker()
+    with st.sidebar.expander("🧹 Retention"):
+        policy = retention.manager.policy
+        st.caption(
+            f"Compress after {policy.compress_after_days:g} d · compact after {policy.compact_after_days:g} d · "
+            f"roll up after {policy.rollup_after_days:g} d · pinned tags: {', '.join(sorted(policy.pin_tags)) or 'none'}"
+            + (f" · prune after {policy.max_age_days:g} d" if policy.max_age_days else "")
+            + (f" · budget {policy.max_bytes / 1024 / 1024:g} MB" if policy.max_bytes else "")
+        )
+        report = retention.last_report
+        if retention.last_error:
+            st.error(f"Last pass failed: {retention.last_error}")
+        elif report is not None:
+            st.caption(
+                f"Last pass {retention.last_run_at}: {report['rolled_up']} run(s) rolled up into {report['rollups']}, "
+                f"{report['compacted']} compacted, {report['compressed']} compressed, {report['pruned']} pruned, "
+                f"{report['bytes_freed'] / 1024 / 1024:.1f} MB freed"
+                + ("" if report["done"] else " (more to do)")
+            )
+        if st.button("Run retention now"):
+            retention.run_now()
+            st.toast("🧹 Retention pass started")
+concurrent_tests = st.sidebar.number_input(
+    "Concurrent load tests", 1, 8, job_manager.max_concurrent,
+    help="Tests beyond this limit wait in a queue until a running test finishes.",
+)
+if concurrent_tests != job_manager.max_concurrent:
+    job_manager.set_max_concurrent(concurrent_tests)
+
+def mock_control(path, body):
+    import requests
+    try:
+        requests.post(f"{mock_target['url']}/_mock/{path}", json=body, timeout=5).raise_for_status()
+    except requests.RequestException as e:
+        st.sidebar.error(f"Mock target control failed: {e}")
+
+mock_job = next((job for job in service_manager.snapshot() if job["status"] in ("queued", "running")), None)
+with st.sidebar.expander("🧪 Local mock target", expanded=mock_job is not None):
+    if mock_job:
+        st.success(f"Running on {mock_target['url']}")
+        regress_col, restore_col = st.columns(2)
+        if regress_col.button("Inject regression"):
+            mock_control("regression", {"active": True})
+        if restore_col.button("Clear regression"):
+            mock_control("regression", {"active": None})
+        if st.button("🛑 Stop mock target"):
+            service_manager.cancel(mock_job["id"])
+        st.code(mock_job["log_tail"] or "(no output yet)", language=None)
+    else:
+        mock_port = st.number_input("Port", 1024, 65535, 8099)
+        mock_distribution = st.selectbox("Latency distribution", MOCK_DISTRIBUTIONS, index=MOCK_DISTRIBUTIONS.index("lognormal"))
+        mock_latency = st.number_input("Latency (ms)", 0.0, 60000.0, 50.0, help="Mean; median for lognormal; minimum for pareto")
+        mock_errors = st.number_input("Error rate (%)", 0.0, 100.0, 0.0)
+        mock_payload = st.number_input("Payload (bytes)", 0, 16 * 1024 * 1024, 256)
+        mock_regress_after = st.number_input("Step regression after (s)", 0.0, value=0.0, help="0 = only when injected by hand")
+        mock_regress_factor = st.number_input("Regression latency factor", 1.0, 100.0, 1.5)
+        mock_profile = st.text_input("Profile file (optional)", "", help="e.g. mock_target/profiles/mixed.json; the fields above override its default profile")
+        if st.button("▶️ Start mock target"):
+            command = [
+                sys.executable, "-u", "mock_target/server.py", "--port", str(mock_port),
+                "--distribution", mock_distribution, "--latency-ms", str(mock_latency),
+                "--error-rate", str(mock_errors / 100), "--payload-bytes", str(mock_payload),
+                "--regress-factor", str(mock_regress_factor),
+            ]
+            if mock_regress_after:
+                command += ["--regress-after-s", str(mock_regress_after)]
+            if mock_profile.strip():
+                command += ["--config", mock_profile.strip()]
+            service_manager.submit(command, cwd=repo_root, label="mock target", log_path=LOGS_DIR / "mock_target.log")
+            mock_target["url"] = f"http://127.0.0.1:{mock_port}"
+            st.toast(f"🧪 Mock target starting on {mock_target['url']}")
 
 left_col, mid_col = st.columns([1, 2])
 
 with left_col:
     st.header("🚀 Run New Load Test")
-    base_url = st.text_input("Base URL", "https://httpbin.org")
+    base_url = st.text_input("Base URL", mock_target["url"] if mock_job else "https://httpbin.org")
     endpoint = st.text_input("Endpoint", "/delay/1")
-    num_users = st.slider("Number of Users", 1, 100, 10)
+    scenario_file = st.text_input(
+        "Scenario file (optional)", "",
+        help="JSON/YAML list of weighted endpoints with methods, headers and bodies, e.g. locust_tests/scenarios/httpbin.json. Overrides Endpoint.",
+    )
+    load_mode = st.radio(
+        "Load model", ["closed", "open", "step"], horizontal=True,
+        help="closed: users with 1-2 s think time. open: constant arrival rate. step: arrival rate raised every step.",
+    )
+    num_users = st.slider(
+        "Number of Users", 1, 100, 10,
+        help="In the open and step models this is the pool of concurrent users available to keep up with the target rate.",
+    )
     spawn_rate = st.slider("Spawn Rate (users/sec)", 1, 50, 5)
     duration = st.slider("Test Duration (seconds)", 5, 60, 15)
+    target_rps = step_rps = step_seconds = 0
+    if load_mode != "closed":
+        target_rps = st.number_input("Target RPS (start rate for step)", 0.1, 10000.0, 10.0)
+    if load_mode == "step":
+        step_col1, step_col2 = st.columns(2)
+        step_rps = step_col1.number_input("RPS added per step", 0.1, 10000.0, 5.0)
+        step_seconds = step_col2.number_input("Step length (s)", 1, 600, 10)
+    raw_samples = st.checkbox("Record raw samples", False, help="Store every request (timestamp, latency, status, bytes) as columnar .npy segments for forensics")
+    run_tags = st.text_input("Tags (comma separated)", "", help="Stored in the run catalog, e.g. 'baseline, nightly'")
+    client_mode = st.radio(
+        "HTTP client", ["http", "fast", "timed"], horizontal=True,
+        help="http: Locust HttpUser (requests). fast: FastHttpUser (geventhttpclient), for high request rates. "
+             "timed: records DNS, connect, TLS, time to first byte and download per request, so a regression "
+             "can be traced to a phase. Runs made with different clients are never compared.",
+    )
+    client_col1, client_col2 = st.columns(2)
+    keep_alive = client_col1.checkbox("Keep-alive", True)
+    client_concurrency = client_col2.number_input(
+        "Connections per user", 1, 100, 10, disabled=client_mode != "fast",
+        help="FastHttpUser connection pool size per user.",
+    )
+    abort_col1, abort_col2 = st.columns(2)
+    abort_error_rate = abort_col1.number_input("Abort if error rate ≥ (%)", 0.0, 100.0, 0.0, help="0 = never. Checked on each live window.")
+    abort_p95 = abort_col2.number_input("Abort if p95 ≥ (ms)", 0.0, value=0.0, help="0 = never. Checked on each live window.")
+    max_workers = os.cpu_count() or 1
+    workers = st.slider(
+        "Workers (processes)", 1, max_workers, 1,
+        help=f"Run Locust as a master plus N worker processes. {max_workers} = one worker per CPU core.",
+        disabled=max_workers == 1 or sys.platform == "win32",
+    )
 
     if st.button("Run Test"):
-        log_placeholder = st.empty()
-        progress_placeholder = st.empty()
-        log_box_style = (
-            "max-height: 300px; min-height: 200px; overflow-y: auto; "
-            "background:#111; padding:8px; color:white; font-family:monospace; "
-            "border: 1px solid #ccc; border-radius: 6px; margin-bottom: 8px;"
-        )
-        log_placeholder.markdown(
-            f"<div style='{log_box_style}'><pre>Waiting for logs...</pre></div>", unsafe_allow_html=True
+        # Jobs run concurrently, so the suffix keeps two submissions in the same second apart.
+        run_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        command = [
+            sys.executable, "-u", "-m", "locust",
+            "-f", "locust_tests/test_scenario.py",
+            "--headless", "-u", str(num_users), "-r", str(spawn_rate),
+            "-t", f"{duration}s", "--host", base_url
+        ]
+        if workers > 1:
+            command += ["--processes", str(workers)]
+        env = os.environ.copy()
+        env["PYTHONUNBUFFERED"] = "1"
+        env["LOCUST_ENDPOINT"] = endpoint
+        env["LOCUST_SCENARIO"] = scenario_file.strip()
+        env["LOCUST_RUN_ID"] = run_id
+        env["LOCUST_TAGS"] = run_tags
+        env["LOCUST_RAW_SAMPLES"] = "1" if raw_samples else ""
+        env["LOCUST_LOAD_MODE"] = load_mode
+        env["LOCUST_TARGET_RPS"] = str(target_rps or "")
+        env["LOCUST_STEP_RPS"] = str(step_rps or "")
+        env["LOCUST_STEP_SECONDS"] = str(step_seconds or "")
+        env["LOCUST_PROCESSES"] = str(workers)
+        env["LOCUST_CLIENT"] = client_mode
+        env["LOCUST_KEEP_ALIVE"] = "1" if keep_alive else "0"
+        env["LOCUST_CLIENT_CONCURRENCY"] = str(client_concurrency)
+        env["LOCUST_ABORT_ERROR_RATE"] = str(abort_error_rate or "")
+        env["LOCUST_ABORT_P95_MS"] = str(abort_p95 or "")
+        job_id = job_manager.submit(
+            command, env=env, cwd=repo_root, duration=duration,
+            label=f"{Path(scenario_file.strip()).stem if scenario_file.strip() else endpoint} · {num_users} users{f' · {target_rps:g} rps {load_mode}' if load_mode != 'closed' else ''} · {duration}s",
+            run_id=run_id,
+            log_path=log_path_for(run_id),
         )
-        with st.spinner("Running test... please wait"):
-            progress_bar = progress_placeholder.progress(0, text="0% completed")
-            timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-            command = [
-                sys.executable, "-u", "-m", "locust",
-                "-f", "locust_tests/test_scenario.py",
-                "--headless", "-u", str(num_users), "-r", str(spawn_rate),
-                "-t", f"{duration}s", "--host", base_url
-            ]
-            env = os.environ.copy()
-            env["PYTHONUNBUFFERED"] = "1"
-            env["LOCUST_ENDPOINT"] = endpoint
-            creationflags = 0
-            if sys.platform == "win32":
-                creationflags = subprocess.CREATE_NEW_PROCESS_GROUP
-            process = subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                bufsize=1,
-                universal_newlines=True,
-                env=env,
-                creationflags=creationflags
-            )
+        st.toast(f"🚀 Load test #{job_id} submitted")
 
-            q = queue.Queue()
-            def enqueue_output(pipe, pipe_name):
-                for line in iter(pipe.readline, ''):
-                    q.put((pipe_name, line))
-                pipe.close()
-
-            t_stdout = threading.Thread(target=enqueue_output, args=(process.stdout, 'stdout'))
-            t_stderr = threading.Thread(target=enqueue_output, args=(process.stderr, 'stderr'))
-            t_stdout.daemon = True
-            t_stderr.daemon = True
-            t_stdout.start()
-            t_stderr.start()
-
-            stdout_lines = []
-            start_time = time.time()
-            while True:
-                try:
-                    pipe_name, line = q.get(timeout=0.1)
-                except queue.Empty:
-                    if process.poll() is not None:
-                        break
-                    elapsed = time.time() - start_time
-                    if duration > 0:
-                        progress = min(1.0, elapsed / duration)
-                        percent = int(progress * 100)
-                        progress_bar.progress(progress, text=f"{percent}% completed")
-                    continue
-                if line:
-                    decoded = line.strip()
-                    stdout_lines.append(decoded)
-                    rendered = "\n".join(stdout_lines[-100:])
-                    log_placeholder.markdown(
-                        f"<div style='{log_box_style}'><pre>{rendered}</pre></div>",
-                        unsafe_allow_html=True
-                    )
-                elapsed = time.time() - start_time
-                if duration > 0:
-                    progress = min(1.0, elapsed / duration)
-                    percent = int(progress * 100)
-                    progress_bar.progress(progress, text=f"{percent}% completed")
-            process.wait()
-            log_placeholder.empty()
-            progress_bar.progress(1.0, text="100% completed")
-            progress_placeholder.empty()
-
-            if process.returncode == 0:
-                st.success("✅ Load Test Completed Successfully!")
-            else:
-                st.error("❌ Load Test Failed. Check logs above.")
+    render_jobs()
+
+    log_files = list_logs()
+    if log_files:
+        with st.expander("📜 Run Logs"):
+            log_file = st.selectbox("Log file", log_files, format_func=lambda p: p.stem)
+            log_pages = log_page_count(log_file)
+            log_page = st.number_input(f"Log page (of {log_pages})", 1, log_pages, log_pages) if log_pages > 1 else 1
+            log_lines, _ = read_log_page(log_file, log_page - 1)
+            st.code("\n".join(log_lines) or "(empty)", language=None)
 
     st.header("📂 Select Runs for Comparison")
-    run_files = get_run_files()
+    with st.expander("🔎 Filter runs"):
+        known_endpoints, known_tags = catalog_choices(catalog)
+        endpoint_filter = st.selectbox("Endpoint", ["All"] + known_endpoints)
+        tag_filter = st.selectbox("Tag", ["All"] + known_tags)
+        date_filter = st.date_input("Date range", value=())
+    filters = {
+        "endpoint": None if endpoint_filter == "All" else endpoint_filter,
+        "tag": None if tag_filter == "All" else tag_filter,
+    }
+    if len(date_filter) == 2:
+        filters["since"] = date_filter[0].isoformat()
+        filters["until"] = f"{date_filter[1].isoformat()}T23:59:59"
+    page = st.session_state.get("runs_page", 1)
+    run_files, total_runs = query_runs(catalog, limit=RUNS_PAGE_SIZE, offset=(page - 1) * RUNS_PAGE_SIZE, **filters)
+    page_count = max(1, -(-total_runs // RUNS_PAGE_SIZE))
+    if page > page_count:
+        # The filters shrank the result set below the remembered page.
+        page = st.session_state["runs_page"] = page_count
+        run_files, total_runs = query_runs(catalog, limit=RUNS_PAGE_SIZE, offset=(page - 1) * RUNS_PAGE_SIZE, **filters)
+    if page_count > 1:
+        st.number_input(f"Page (of {page_count})", 1, page_count, key="runs_page")
     if len(run_files) == 0:
         st.warning("⚠️ No test runs found. Please run a test.")
     elif len(run_files) == 1:
@@ -148,17 +359,28 @@ with mid_col:
     if 'run1' not in locals() or 'run2' not in locals() or run1 == run2:
         st.markdown("<div style='color:#aaa; font-size:1.1rem; margin-bottom: 18px;'>Select runs to display the Graphical analysis.</div>", unsafe_allow_html=True)
     comparison_chart_placeholder = st.empty()
+    timeseries_placeholder = st.empty()
     st.subheader("🧠 AI Analysis Summary")
     if 'run1' not in locals() or 'run2' not in locals() or run1 == run2:
         st.markdown("<div style='color:#aaa; font-size:1.1rem; margin-bottom: 18px;'>Select runs to display the Summary.</div>", unsafe_allow_html=True)
     ai_analysis_placeholder = st.empty()
 
 if 'run1' in locals() and 'run2' in locals() and run1 != run2:
+    client1 = load_run_summary(run1).get("client_mode") or "http"
+    client2 = load_run_summary(run2).get("client_mode") or "http"
+    if client1 != client2:
+        st.error(f"⛔ {run1.stem} used the '{client1}' HTTP client and {run2.stem} used '{client2}'. "
+                 "Latencies from different clients are not comparable; pick runs made with the same client.")
+
+if 'run1' in locals() and 'run2' in locals() and run1 != run2 and client1 == client2:
     compare_col, ai_col = st.columns([1, 1])
     with compare_col:
         if st.button("Compare Performance"):
-            data1 = load_run_data(run1)
-            data2 = load_run_data(run2)
+            st.session_state["compared_runs"] = (str(run1), str(run2))
+        # Keep the comparison on screen across reruns so the optional views below can load lazily.
+        if st.session_state.get("compared_runs") == (str(run1), str(run2)):
+            data1 = load_run_summary(run1)
+            data2 = load_run_summary(run2)
             metrics = [
                 ("Avg Response Time (ms)", data1.get("avg_response_time", 0), data2.get("avg_response_time", 0)),
                 ("95th Percentile (ms)", data1.get("p95_response_time", 0), data2.get("p95_response_time", 0)),
@@ -172,6 +394,56 @@ if 'run1' in locals() and 'run2' in locals() and run1 != run2:
             })
             df = df.set_index("Metric")
             comparison_chart_placeholder.bar_chart(df)
+            for run, data in ((run1, data1), (run2, data2)):
+                generator = data.get("generator") or {}
+                if generator.get("saturated"):
+                    st.warning(
+                        f"⚠️ The load generator was saturated during {run.stem} (CPU up to {generator.get('cpu_percent_max')}%, "
+                        f"event-loop lag p95 {generator.get('lag_ms_p95')} ms). Its latencies partly measure Locust itself."
+                    )
+            routes1, routes2 = data1.get("endpoints") or {}, data2.get("endpoints") or {}
+            if routes1 or routes2:
+                st.markdown("**Per-endpoint p95 (ms)**")
+                route_rows = []
+                for name in sorted(set(routes1) | set(routes2)):
+                    before_p95 = routes1.get(name, {}).get("p95_response_time")
+                    after_p95 = routes2.get(name, {}).get("p95_response_time")
+                    change = round((after_p95 - before_p95) / before_p95 * 100, 2) if before_p95 and after_p95 is not None else None
+                    route_rows.append({"Endpoint": name, run1.stem: before_p95, run2.stem: after_p95, "% Change": change})
+                st.dataframe(pd.DataFrame(route_rows).set_index("Endpoint"), use_container_width=True)
+            request_phases = compare_phases(data1.get("phase_timings"), data2.get("phase_timings"))
+            if request_phases is not None:
+                st.markdown("**Request phases** (mean ms per request)")
+                phase_df = pd.DataFrame(request_phases["phases"]).set_index("phase")
+                st.bar_chart(phase_df[["before_avg", "after_avg"]].rename(columns={"before_avg": run1.stem, "after_avg": run2.stem}))
+                st.dataframe(phase_df, use_container_width=True)
+                attributed = request_phases["attributed_phase"]
+                if attributed is not None:
+                    row = phase_df.loc[attributed]
+                    st.info(
+                        f"🔎 Mean latency moved {request_phases['total_delta_ms']:+.2f} ms; {attributed} accounts for "
+                        f"{row['delta_ms']:+.2f} ms ({row['share_percent']:.0f}%), p95 {row['before_p95']} → {row['after_p95']} ms."
+                    )
+            has_windows = data1.get("timeseries_file") or data2.get("timeseries_file")
+            if has_windows and st.checkbox("Show per-window timeline", True):
+                frames1 = load_window_frames(run1, data1)
+                frames2 = load_window_frames(run2, data2)
+                if frames1 is not None or frames2 is not None:
+                    with timeseries_placeholder.container():
+                        st.markdown("**Per-window timeline** (seconds since run start)")
+                        for column, label in (("rps", "Throughput (req/s)"), ("p95", "95th Percentile (ms)"), ("errors", "Errors")):
+                            st.caption(label)
+                            st.line_chart(pd.DataFrame({
+                                run.stem: frames[column]
+                                for run, frames in ((run1, frames1), (run2, frames2)) if frames is not None
+                            }))
+            has_samples = data1.get("samples_dir") or data2.get("samples_dir")
+            if has_samples and st.checkbox("Show raw latency distribution", False):
+                for run, data in ((run1, data1), (run2, data2)):
+                    sample_hist = load_sample_histogram(run, data)
+                    if sample_hist is not None:
+                        st.caption(f"Raw latency distribution (ms, log bins): {run.stem}")
+                        st.bar_chart(sample_hist)
     with ai_col:
         if st.button("Claude Analysis"):
             import time as pytime
@@ -229,3 +501,38 @@ if 'run1' in locals() and 'run2' in locals() and run1 != run2:
                 )
             except Exception as e:
                 ai_analysis_placeholder.error(f"Claude analysis failed: {e}")
+
+st.header("📉 Run History Trend")
+trend_endpoint_col, trend_metric_col = st.columns([1, 1])
+with trend_endpoint_col:
+    trend_endpoint = st.selectbox("Trend endpoint", ["All"] + catalog_choices(catalog)[0])
+with trend_metric_col:
+    trend_metric = st.selectbox("Trend metric", SERIES_METRICS, index=SERIES_METRICS.index("p95_response_time"))
+trend = get_trend_engine().analyze(
+    trend_metric,
+    None if trend_endpoint == "All" else trend_endpoint,
+    include_series=True,
+    tail=TREND_POINTS,
+)
+if trend["points"] < 2:
+    st.info("ℹ️ Not enough runs to show a trend yet.")
+else:
+    series = trend["series"]
+    st.caption(f"Last {len(series['value'])} of {trend['points']} runs (x axis: run number)")
+    st.line_chart(pd.DataFrame(
+        {trend_metric: series["value"], "rolling baseline": series["baseline"]},
+        index=series["index"],
+    ))
+    events = [
+        {"Run": c["run_id"], "Started": c["started_at"], "Event": f"Level shift {c['direction']}",
+         "Detail": f"{c['before_mean']} → {c['after_mean']} ({c['shift_percent']}%)"}
+        for c in trend["change_points"]
+    ] + [
+        {"Run": a["run_id"], "Started": a["started_at"], "Event": "Anomaly",
+         "Detail": f"{round(a['value'], 2)} (score {a['score']})"}
+        for a in trend["anomalies"]
+    ]
+    if events:
+        st.dataframe(pd.DataFrame(events).sort_values("Started", ascending=False), use_container_width=True)
+    else:
+        st.success("✅ No level shifts or anomalous runs detected.")
@@ -0,0 +1,161 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+from utils.timeseries import load_windows
+from utils.sample_store import SampleStore, resolve_samples_dir
+from utils.run_schema import read_run_dict
+
+# Run-file fields that are only needed by the analyzer; dropped from dashboard summaries.
+HEAVY_FIELDS = ("latency_histogram", "ok_latency_histogram")
+RUN_CACHE_ENTRIES = 512
+QUERY_CACHE_ENTRIES = 64
+PAYLOAD_CACHE_BYTES = int(os.environ.get("DASHBOARD_CACHE_MB", "256")) * 1024 * 1024
+WINDOW_COLUMNS = ("rps", "p95", "errors")
+
+
+def file_version(path):
+    """``(mtime_ns, size)`` of ``path``, or None if it does not exist; part of every cache key."""
+    try:
+        stat = Path(path).stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def catalog_version(catalog):
+    # WAL mode writes land in the -wal file first, so both files make up the version.
+    return file_version(catalog.db_path), file_version(f"{catalog.db_path}-wal")
+
+
+class PayloadCache:
+    """LRU of large derived payloads, evicted by an approximate byte budget."""
+
+    def __init__(self, max_bytes=PAYLOAD_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, load):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+        value = load()
+        size = payload_size(value)
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, old_size) = self._entries.popitem(last=False)
+                self.bytes -= old_size
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+
+def payload_size(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    return 0 if value is None else len(json.dumps(value, default=str))
+
+
+@st.cache_resource
+def get_payload_cache():
+    return PayloadCache()
+
+
+@st.cache_data(max_entries=QUERY_CACHE_ENTRIES, show_spinner=False)
+def _query_runs(_catalog, version, endpoint=None, since=None, until=None, tag=None, limit=50, offset=0):
+    filters = {"endpoint": endpoint, "since": since, "until": until, "tag": tag}
+    rows = _catalog.query(limit=limit, offset=offset, **filters)
+    return [row["path"] for row in rows], _catalog.count(**filters)
+
+
+def query_runs(catalog, limit=50, offset=0, **filters):
+    """``(run_paths, total)`` for one page of the catalog, re-queried only after the catalog changes."""
+    paths, total = _query_runs(catalog, catalog_version(catalog), limit=limit, offset=offset, **filters)
+    return [Path(path) for path in paths], total
+
+
+@st.cache_data(max_entries=QUERY_CACHE_ENTRIES, show_spinner=False)
+def _catalog_choices(_catalog, version):
+    return _catalog.endpoints(), _catalog.tags()
+
+
+def catalog_choices(catalog):
+    """``(endpoints, tags)`` for the filter widgets."""
+    return _catalog_choices(catalog, catalog_version(catalog))
+
+
+@st.cache_data(max_entries=RUN_CACHE_ENTRIES, show_spinner=False)
+def _load_run_summary(path, version):
+    data = read_run_dict(path)
+    for field in HEAVY_FIELDS:
+        data.pop(field, None)
+    for route in (data.get("endpoints") or {}).values():
+        for field in HEAVY_FIELDS:
+            route.pop(field, None)
+    return data
+
+
+def load_run_summary(file):
+    """Run JSON without analyzer-only payloads; re-parsed only when the file changes."""
+    return _load_run_summary(str(file), file_version(file))
+
+
+def load_window_frames(file, data):
+    """Per-window ``rps``/``p95``/``errors`` columns indexed by seconds since run start, or None."""
+    if not data.get("timeseries_file"):
+        return None
+    path = Path(file).parent / data["timeseries_file"]
+    version = file_version(path)
+    if version is None:
+        return None
+
+    def load():
+        windows = load_windows(path)
+        if not windows:
+            return None
+        start = windows[0]["t"]
+        index = [round(w["t"] - start, 3) for w in windows]
+        return pd.DataFrame({column: [w.get(column) for w in windows] for column in WINDOW_COLUMNS}, index=index)
+
+    return get_payload_cache().get_or_load(("windows", str(path), version), load)
+
+
+def load_sample_histogram(file, data, bins=40):
+    samples_dir = resolve_samples_dir(file, data)
+    if samples_dir is None or not samples_dir.exists():
+        return None
+    # New segments are added as new files, which bumps the directory mtime.
+    key = ("samples", str(samples_dir), file_version(samples_dir), bins)
+
+    def load():
+        try:
+            counts, edges = SampleStore(samples_dir).histogram("latency_ms", bins=bins)
+        except RuntimeError:
+            return None
+        return pd.Series(counts, index=[round(float(edge), 2) for edge in edges[:-1]])
+
+    return get_payload_cache().get_or_load(key, load)
+
+
+def clear_caches():
+    _query_runs.clear()
+    _catalog_choices.clear()
+    _load_run_summary.clear()
+    get_payload_cache().clear()
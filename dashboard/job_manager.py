@@ -0,0 +1,230 @@
+import itertools
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from dashboard.log_capture import LogCapture
+
+DEFAULT_MAX_CONCURRENT = int(os.environ.get("DASHBOARD_MAX_CONCURRENT_TESTS", "1"))
+# Snapshots handed to the UI are rebuilt at most this often.
+SNAPSHOT_INTERVAL = 0.5
+SNAPSHOT_LOG_LINES = 100
+TERMINATE_TIMEOUT = 10
+FINISHED_JOBS_KEPT = 20
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+
+class Job:
+    """One queued or running subprocess and the output it has produced so far."""
+
+    def __init__(self, job_id, command, env=None, cwd=None, duration=None, label=None, run_id=None, log_path=None):
+        self.id = job_id
+        self.command = command
+        self.env = env
+        self.cwd = cwd
+        self.duration = duration
+        self.label = label or " ".join(command)
+        self.run_id = run_id
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.returncode = None
+        self.process = None
+        self.log = LogCapture(log_path)
+        self.cancel_requested = False
+
+    def progress(self, now=None):
+        if self.status != RUNNING:
+            return 1.0 if self.finished_at else 0.0
+        if not self.duration:
+            return 0.0
+        return min(1.0, ((now or time.time()) - self.started_at) / self.duration)
+
+    def snapshot(self, log_lines=SNAPSHOT_LOG_LINES):
+        now = time.time()
+        return {
+            "id": self.id,
+            "label": self.label,
+            "run_id": self.run_id,
+            "status": self.status,
+            "progress": self.progress(now),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed": round((self.finished_at or now) - self.started_at, 1) if self.started_at else 0.0,
+            "returncode": self.returncode,
+            "log_tail": self.log.rendered_tail(log_lines),
+            "log_lines": self.log.total_lines,
+            "log_path": str(self.log.path) if self.log.path else None,
+        }
+
+
+class JobManager:
+    """Runs subprocess jobs on background threads, independent of Streamlit reruns.
+
+    At most ``max_concurrent`` jobs run at once; the rest wait in FIFO order.
+    The UI only ever reads :meth:`snapshot`, which is rebuilt at most every
+    ``SNAPSHOT_INTERVAL`` seconds and only when some job changed.
+    """
+
+    def __init__(self, max_concurrent=DEFAULT_MAX_CONCURRENT):
+        self.max_concurrent = max(1, max_concurrent)
+        self._jobs = {}
+        self._queue = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._version = 0
+        self._snapshot = []
+        self._snapshot_version = -1
+        self._snapshot_at = 0.0
+
+    def submit(self, command, env=None, cwd=None, duration=None, label=None, run_id=None, log_path=None):
+        with self._lock:
+            job = Job(str(next(self._ids)), command, env, cwd, duration, label, run_id, log_path)
+            self._jobs[job.id] = job
+            self._queue.append(job)
+            self._changed()
+        self._start_queued()
+        return job.id
+
+    def set_max_concurrent(self, value):
+        with self._lock:
+            self.max_concurrent = max(1, int(value))
+        self._start_queued()
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in ACTIVE_STATES:
+                return False
+            job.cancel_requested = True
+            if job.status == QUEUED:
+                self._queue.remove(job)
+                job.status = CANCELLED
+                job.finished_at = time.time()
+                job.log.close()
+                self._changed()
+                return True
+            process = job.process
+        self._terminate(process)
+        return True
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.snapshot() if job else None
+
+    def snapshot(self):
+        """Newest-first list of job snapshots, throttled for cheap polling."""
+        now = time.monotonic()
+        with self._lock:
+            running = any(job.status == RUNNING for job in self._jobs.values())
+            stale = self._snapshot_version != self._version or running
+            if stale and now - self._snapshot_at >= SNAPSHOT_INTERVAL:
+                self._snapshot = [job.snapshot() for job in reversed(list(self._jobs.values()))]
+                self._snapshot_version = self._version
+                self._snapshot_at = now
+            return self._snapshot
+
+    def active(self):
+        with self._lock:
+            return [job.id for job in self._jobs.values() if job.status in ACTIVE_STATES]
+
+    def _changed(self):
+        self._version += 1
+
+    def _start_queued(self):
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.status == RUNNING)
+            to_start = []
+            while self._queue and running < self.max_concurrent:
+                job = self._queue.pop(0)
+                job.status = RUNNING
+                job.started_at = time.time()
+                to_start.append(job)
+                running += 1
+            self._changed()
+        for job in to_start:
+            threading.Thread(target=self._run, args=(job,), daemon=True, name=f"job-{job.id}").start()
+
+    def _run(self, job):
+        creationflags = subprocess.CREATE_NEW_PROCESS_GROUP if sys.platform == "win32" else 0
+        try:
+            process = subprocess.Popen(
+                job.command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                bufsize=1,
+                universal_newlines=True,
+                env=job.env,
+                cwd=job.cwd,
+                creationflags=creationflags,
+                start_new_session=sys.platform != "win32",
+            )
+        except OSError as e:
+            self._finish(job, None, f"Failed to start: {e}")
+            return
+        with self._lock:
+            job.process = process
+            cancel_requested = job.cancel_requested
+        if cancel_requested:
+            self._terminate(process)
+        # The log capture has its own lock; only the version bump needs ours.
+        for line in iter(process.stdout.readline, ""):
+            job.log.append(line)
+            with self._lock:
+                self._changed()
+        process.stdout.close()
+        self._finish(job, process.wait())
+
+    def _finish(self, job, returncode, message=None):
+        with self._lock:
+            if message:
+                job.log.append(message)
+            job.log.close()
+            job.returncode = returncode
+            job.finished_at = time.time()
+            if job.cancel_requested:
+                job.status = CANCELLED
+            else:
+                job.status = SUCCEEDED if returncode == 0 else FAILED
+            job.process = None
+            self._prune()
+            self._changed()
+        self._start_queued()
+
+    def _prune(self):
+        finished = [job for job in self._jobs.values() if job.status not in ACTIVE_STATES]
+        for job in finished[:-FINISHED_JOBS_KEPT]:
+            del self._jobs[job.id]
+
+    @staticmethod
+    def _terminate(process):
+        if process is None or process.poll() is not None:
+            return
+        # Signal the whole process group so Locust's --processes workers stop too.
+        try:
+            if sys.platform == "win32":
+                process.send_signal(signal.CTRL_BREAK_EVENT)
+            else:
+                os.killpg(process.pid, signal.SIGTERM)
+        except OSError:
+            process.terminate()
+
+        def reap():
+            try:
+                process.wait(timeout=TERMINATE_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+        threading.Thread(target=reap, daemon=True).start()
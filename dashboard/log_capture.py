@@ -0,0 +1,108 @@
+import itertools
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+LOGS_DIR = Path(__file__).resolve().parent.parent / "data" / "logs"
+DEFAULT_MAX_LINES = 1000
+# Rendered tails are rebuilt at most this many times per second.
+DEFAULT_MAX_FLUSHES_PER_SECOND = 4
+LOG_PAGE_BYTES = 64 * 1024
+
+
+def log_path_for(run_id, logs_dir=LOGS_DIR):
+    return Path(logs_dir) / f"run_{run_id}.log"
+
+
+class LogCapture:
+    """Keeps the last ``max_lines`` lines in a ring buffer and spills every line to disk.
+
+    Appending is O(1) whatever the output rate. Readers get a tail string
+    that is re-joined at most ``max_flushes_per_second`` times per second,
+    so a burst of lines is coalesced into a single UI update.
+    """
+
+    def __init__(self, path=None, max_lines=DEFAULT_MAX_LINES, max_flushes_per_second=DEFAULT_MAX_FLUSHES_PER_SECOND):
+        self.path = Path(path) if path else None
+        self.lines = deque(maxlen=max_lines)
+        self.total_lines = 0
+        self.flush_interval = 1.0 / max_flushes_per_second
+        self._lock = threading.Lock()
+        self._file = None
+        self._rendered = ""
+        self._rendered_count = 0
+        self._rendered_at = 0.0
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8", buffering=64 * 1024)
+
+    def append(self, line):
+        line = line.rstrip("\n")
+        with self._lock:
+            self.lines.append(line)
+            self.total_lines += 1
+            if self._file is not None:
+                self._file.write(line + "\n")
+
+    @property
+    def dropped_lines(self):
+        return self.total_lines - len(self.lines)
+
+    def tail(self, count=None):
+        with self._lock:
+            lines = list(self.lines)
+        return lines[-count:] if count else lines
+
+    def rendered_tail(self, count=100):
+        """The last ``count`` lines joined, refreshed no more often than the flush interval."""
+        now = time.monotonic()
+        with self._lock:
+            if self._rendered_count != self.total_lines and now - self._rendered_at >= self.flush_interval:
+                start = max(0, len(self.lines) - count)
+                self._rendered = "\n".join(itertools.islice(self.lines, start, None))
+                self._rendered_count = self.total_lines
+                self._rendered_at = now
+                # Make what the UI shows available to the log viewer as well.
+                if self._file is not None:
+                    self._file.flush()
+            return self._rendered
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._rendered_at = 0.0
+
+
+def log_page_count(path, page_bytes=LOG_PAGE_BYTES):
+    return max(1, -(-Path(path).stat().st_size // page_bytes))
+
+
+def read_log_page(path, page=0, page_bytes=LOG_PAGE_BYTES):
+    """Return ``(lines, page_count)`` for one byte-range page of a log file.
+
+    Pages are cut at line boundaries: a line belongs to the page in which it
+    starts, so reading any page only seeks and reads about ``page_bytes``.
+    """
+    page_count = log_page_count(path, page_bytes)
+    page = min(max(0, page), page_count - 1)
+    start = page * page_bytes
+    end = start + page_bytes
+    lines = []
+    with open(path, "rb") as f:
+        if start:
+            f.seek(start - 1)
+            # Skip the tail of a line that began on the previous page.
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            lines.append(line.decode("utf-8", errors="replace").rstrip("\n"))
+    return lines, page_count
+
+
+def list_logs(logs_dir=LOGS_DIR):
+    return sorted(Path(logs_dir).glob("run_*.log"), key=lambda p: p.stat().st_mtime, reverse=True)
@@ -1,46 +1,218 @@
 import sys
 import subprocess
 import json
+import itertools
+import os
+import threading
+import time
+from collections import deque
 from pathlib import Path
 
 CLAUDE_MCP_PATH = Path(__file__).resolve().parent.parent / "mcp_server" / "claude_perf_mcp.py"
+DEFAULT_TIMEOUT = 30
+HEALTH_CHECK_TIMEOUT = 5
+# A pooled client that has not answered anything for this long is pinged on
+# checkout, and replaced if the ping fails, so a hung server is not handed out.
+HEALTH_CHECK_INTERVAL = float(os.environ.get("MCP_HEALTH_CHECK_INTERVAL", "10"))
+POOL_SIZE = int(os.environ.get("MCP_POOL_SIZE", "1"))
 
-def call_mcp_tool(baseline_path, test_path):
-    payload = {
-        "jsonrpc": "2.0",
-        "id": "1",
-        "method": "tools/call",
-        "params": {
-            "name": "analyze_performance_diff",
-            "arguments": {
-                "baseline_report": str(baseline_path),
-                "test_report": str(test_path)
-            }
-        }
-    }
 
-    try:
-        proc = subprocess.Popen(
-            ["python", str(CLAUDE_MCP_PATH)],
+class MCPError(RuntimeError):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class MCPClient:
+    """One long-lived MCP server subprocess, multiplexed by JSON-RPC id."""
+
+    def __init__(self, server_path=CLAUDE_MCP_PATH):
+        self.server_path = Path(server_path)
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stderr = deque(maxlen=50)
+        self.last_response = time.monotonic()
+        self.proc = subprocess.Popen(
+            [sys.executable, "-u", str(self.server_path)],
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True
+            text=True,
+            bufsize=1,
         )
+        self._reader = threading.Thread(target=self._read_responses, daemon=True)
+        self._reader.start()
+        threading.Thread(target=self._drain_stderr, daemon=True).start()
+        try:
+            self.server_info = self.request("initialize", {
+                "protocolVersion": "2024-11-05",
+                "capabilities": {},
+                "clientInfo": {"name": "perf-dashboard", "version": "0.2.0"},
+            }, timeout=HEALTH_CHECK_TIMEOUT).get("serverInfo")
+            self.notify("notifications/initialized")
+        except BaseException:
+            # No pool holds this client yet, so nobody else would reap the process.
+            self.close(timeout=0)
+            raise
 
-        stdout, stderr = proc.communicate(json.dumps(payload) + "\n", timeout=30)
-
-        if proc.returncode != 0:
-            raise RuntimeError(f"MCP error: {stderr.strip()}")
-
-        for line in stdout.splitlines():
+    def _read_responses(self):
+        for line in self.proc.stdout:
             try:
-                result = json.loads(line)
-                return result.get("result", result)
+                message = json.loads(line)
             except json.JSONDecodeError:
                 continue
+            self.last_response = time.monotonic()
+            if not isinstance(message, dict):
+                continue
+            with self._lock:
+                waiter = self._pending.pop(message.get("id"), None)
+            if waiter is not None:
+                waiter["response"] = message
+                waiter["event"].set()
+        # Server went away: fail everything still waiting instead of timing out.
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for waiter in pending.values():
+            waiter["event"].set()
+
+    def _drain_stderr(self):
+        for line in self.proc.stderr:
+            self._stderr.append(line.rstrip())
+
+    def _send(self, message):
+        with self._write_lock:
+            self.proc.stdin.write(json.dumps(message) + "\n")
+            self.proc.stdin.flush()
+
+    def notify(self, method, params=None):
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        self._send(message)
+
+    def request(self, method, params=None, timeout=DEFAULT_TIMEOUT):
+        if not self.is_alive():
+            raise ConnectionError(f"MCP server is not running: {self.last_stderr()}")
+        request_id = str(next(self._ids))
+        waiter = {"event": threading.Event(), "response": None}
+        message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            message["params"] = params
+        with self._lock:
+            self._pending[request_id] = waiter
+        try:
+            self._send(message)
+        except (BrokenPipeError, OSError) as e:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            raise ConnectionError(f"MCP server connection lost: {e}")
+        if not waiter["event"].wait(timeout):
+            with self._lock:
+                stale = self._pending.pop(request_id, None) is not None
+            # Tell the server to stop working on a request nobody is waiting for.
+            if stale:
+                try:
+                    self.notify("$/cancelRequest", {"id": request_id})
+                except OSError:
+                    pass
+            raise TimeoutError(f"MCP request '{method}' timed out after {timeout}s")
+        response = waiter["response"]
+        if response is None:
+            raise ConnectionError(f"MCP server exited: {self.last_stderr()}")
+        if "error" in response:
+            raise MCPError(response["error"].get("code"), response["error"].get("message"))
+        return response.get("result")
+
+    def call_tool(self, name, arguments, timeout=DEFAULT_TIMEOUT):
+        return self.request("tools/call", {"name": name, "arguments": arguments}, timeout=timeout)
+
+    def is_alive(self):
+        return self.proc.poll() is None and self._reader.is_alive()
+
+    def is_healthy(self):
+        """Alive, and either answered recently or answers a ping now."""
+        if not self.is_alive():
+            return False
+        return time.monotonic() - self.last_response < HEALTH_CHECK_INTERVAL or self.health_check()
+
+    def health_check(self):
+        try:
+            self.request("ping", timeout=HEALTH_CHECK_TIMEOUT)
+            return True
+        except (ConnectionError, TimeoutError, MCPError):
+            return False
 
-        raise ValueError("No valid JSON response from MCP.")
+    def last_stderr(self):
+        return "\n".join(self._stderr).strip() or "no stderr output"
+
+    def close(self, timeout=HEALTH_CHECK_TIMEOUT):
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self.proc.kill()
+
+
+class MCPClientPool:
+    """Round-robin pool of MCP clients; dead or unresponsive clients are replaced on checkout."""
+
+    def __init__(self, size=POOL_SIZE, server_path=CLAUDE_MCP_PATH):
+        self.size = max(1, size)
+        self.server_path = server_path
+        self._clients = [None] * self.size
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+
+    def get(self):
+        slot = next(self._next) % self.size
+        with self._lock:
+            client = self._clients[slot]
+        # The ping runs outside the lock so a hung server does not hold up the other slots.
+        if client is not None and client.is_healthy():
+            return client
+        with self._lock:
+            if self._clients[slot] is client:
+                if client is not None:
+                    # It already failed to answer; waiting for a clean exit would only add to the delay.
+                    client.close(timeout=0)
+                self._clients[slot] = MCPClient(self.server_path)
+            return self._clients[slot]
+
+    def close(self):
+        with self._lock:
+            clients, self._clients = self._clients, [None] * self.size
+        for client in clients:
+            if client is not None:
+                client.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = MCPClientPool()
+        return _pool
+
+
+def call_mcp_tool(baseline_path, test_path, timeout=DEFAULT_TIMEOUT):
+    arguments = {
+        "baseline_report": str(baseline_path),
+        "test_report": str(test_path)
+    }
+    try:
+        return get_pool().get().call_tool("analyze_performance_diff", arguments, timeout=timeout)
+    except ConnectionError:
+        # The server died between the liveness check and the call; retry once on a fresh process.
+        try:
+            return get_pool().get().call_tool("analyze_performance_diff", arguments, timeout=timeout)
+        except Exception as e:
+            return {"error": f"Failed MCP call: {e}"}
     except Exception as e:
         return {"error": f"Failed MCP call: {e}"}
 
@@ -57,10 +229,10 @@ if __name__ == "__main__":
         print("Usage: python mcp_runner.py <baseline_report> <test_report>")
         sys.exit(1)
 
-    baseline_path = sys.argv[1]
-    test_path = sys.argv[2]
-    with open(baseline_path, 'r') as f1, open(test_path, 'r') as f2:
-        baseline = json.load(f1)
-        test = json.load(f2)
-    result = call_mcp_tool(baseline, test)
+    # The server reads the files itself; it takes paths, not parsed reports.
+    try:
+        result = call_mcp_tool(sys.argv[1], sys.argv[2])
+    finally:
+        get_pool().close()
     print(json.dumps(result, indent=2))
+    sys.exit(1 if "error" in result else 0)
@@ -1,55 +1,388 @@
-from locust import HttpUser, task, between, events
-from statistics import mean
-import json
+from locust import HttpUser, task, between, constant, events
+from locust.runners import MasterRunner, WorkerRunner, WORKER_REPORT_INTERVAL
+import gevent
+import time
 from pathlib import Path
 from datetime import datetime
 import os
+import sys
 
-response_times = []
-error_count = 0
-request_count = 0
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from utils.run_stats import RunStats
+from utils.timeseries import WindowAggregator, TimeSeriesWriter, timeseries_path
+from utils.run_catalog import record_run, parse_tags
+from utils.sample_store import SampleWriter, samples_dir_for
+from utils.load_shape import ArrivalSchedule, parse_load_mode, CLOSED, STEP
+from utils.scenario import load_scenario, single_endpoint_scenario
+from utils.generator_health import GeneratorHealth, summarize_health
+from utils.run_schema import RunRecord, EndpointSummary, run_file_path, write_run
+from utils.phase_timing import PhaseStats
 
-class WebsiteUser(HttpUser):
-    wait_time = between(1, 2)
+WORKER_PAYLOAD_KEY = "perf_run_stats"
+WORKER_WINDOWS_KEY = "perf_run_windows"
+WORKER_ENDPOINTS_KEY = "perf_endpoint_stats"
+WORKER_HEALTH_KEY = "perf_generator_health"
+WORKER_PHASES_KEY = "perf_phase_timings"
+
+RUN_ID = os.environ.get("LOCUST_RUN_ID") or datetime.now().strftime("%Y%m%d-%H%M%S")
+RUNS_DIR = Path(__file__).resolve().parent.parent / "data" / "runs"
+# PERF_RUN_FORMAT picks json (default), msgpack or msgpack.zst.
+RUN_FILE = run_file_path(RUNS_DIR, RUN_ID)
+WINDOW_SECONDS = float(os.environ.get("LOCUST_WINDOW_SECONDS", "1"))
+RAW_SAMPLES = os.environ.get("LOCUST_RAW_SAMPLES", "").lower() in ("1", "true", "yes")
+SAMPLES_DIR = samples_dir_for(RUN_FILE, RUN_ID)
+# A weighted multi-endpoint scenario file (JSON, or YAML with PyYAML) takes
+# precedence over the single LOCUST_ENDPOINT. Loaded once per process.
+SCENARIO_FILE = os.environ.get("LOCUST_SCENARIO")
+SCENARIO = load_scenario(SCENARIO_FILE) if SCENARIO_FILE else single_endpoint_scenario(os.environ.get("LOCUST_ENDPOINT", "/delay/1"))
+# Load model: "closed" (users with think time), "open" (constant arrival rate)
+# or "step" (arrival rate raised by LOCUST_STEP_RPS every LOCUST_STEP_SECONDS).
+# Rates are totals; each of LOCUST_PROCESSES worker processes paces its share.
+LOAD_MODE = parse_load_mode(os.environ.get("LOCUST_LOAD_MODE"))
+TARGET_RPS = float(os.environ.get("LOCUST_TARGET_RPS") or 0)
+STEP_RPS = float(os.environ.get("LOCUST_STEP_RPS") or 0)
+STEP_SECONDS = float(os.environ.get("LOCUST_STEP_SECONDS") or 0)
+MAX_RPS = float(os.environ.get("LOCUST_MAX_RPS") or 0)
+PROCESSES = max(1, int(os.environ.get("LOCUST_PROCESSES") or 1))
+if LOAD_MODE != CLOSED and TARGET_RPS <= 0:
+    raise ValueError(f"LOCUST_TARGET_RPS must be set for the '{LOAD_MODE}' load mode")
+# HTTP client: "http" (requests-based HttpUser), "fast" (geventhttpclient
+# FastHttpUser) or "timed" (http.client with per-phase timings: DNS, connect,
+# TLS, time to first byte, download). Runs made with different clients are never compared.
+CLIENT_MODE = (os.environ.get("LOCUST_CLIENT") or "http").strip().lower()
+if CLIENT_MODE not in ("http", "fast", "timed"):
+    raise ValueError(f"Unknown LOCUST_CLIENT '{CLIENT_MODE}'. Choose 'http', 'fast' or 'timed'")
+CONNECTION_TIMEOUT = float(os.environ.get("LOCUST_CONNECTION_TIMEOUT") or 60)
+NETWORK_TIMEOUT = float(os.environ.get("LOCUST_NETWORK_TIMEOUT") or 60)
+# Connections each FastHttpUser may keep open (its pool size); ignored by the http client.
+CLIENT_CONCURRENCY = int(os.environ.get("LOCUST_CLIENT_CONCURRENCY") or 10)
+KEEP_ALIVE = os.environ.get("LOCUST_KEEP_ALIVE", "1").lower() not in ("0", "false", "no")
+if CLIENT_MODE == "fast":
+    from locust.contrib.fasthttp import FastHttpUser as BaseUser
+elif CLIENT_MODE == "timed":
+    from locust import User as BaseUser
+    from locust.exception import CatchResponseError
+    from utils.timed_http import TimedHTTPClient
+else:
+    BaseUser = HttpUser
+# Optional early abort: stop the test once this many consecutive live windows
+# breach the error-rate (%) or p95 (ms) limit. 0 disables a limit.
+ABORT_ERROR_RATE = float(os.environ.get("LOCUST_ABORT_ERROR_RATE") or 0)
+ABORT_P95_MS = float(os.environ.get("LOCUST_ABORT_P95_MS") or 0)
+ABORT_WINDOWS = int(os.environ.get("LOCUST_ABORT_WINDOWS") or 3)
+
+# Process-local stats. On a worker these hold the delta since the last report
+# to the master; on the master (or a standalone run) they hold the whole run.
+run_stats = RunStats()
+endpoint_stats = {endpoint.name: RunStats() for endpoint in SCENARIO.endpoints}
+phase_stats = PhaseStats()
+windows = WindowAggregator(WINDOW_SECONDS)
+worker_ids = set()
+timeseries_writer = None
+flush_greenlet = None
+sample_writer = None
+breached_windows = 0
+abort_reason = None
+arrival_schedule = None
+# Cumulative self-measurement of this process; the master keeps each worker's latest report.
+generator_health = GeneratorHealth()
+worker_health = {}
+health_greenlet = None
+
+def get_sample_writer():
+    # Opened lazily so every (possibly forked) worker process writes its own segments.
+    global sample_writer
+    if sample_writer is None:
+        sample_writer = SampleWriter(SAMPLES_DIR)
+    return sample_writer
+
+def client_settings():
+    settings = {"keep_alive": KEEP_ALIVE, "connection_timeout": CONNECTION_TIMEOUT, "network_timeout": NETWORK_TIMEOUT}
+    if CLIENT_MODE == "fast":
+        settings["concurrency"] = CLIENT_CONCURRENCY
+    return settings
+
+class WebsiteUser(BaseUser):
+    # In the open modes the users are only a concurrency pool; pacing comes from arrival_schedule.
+    wait_time = between(1, 2) if LOAD_MODE == CLOSED else constant(0)
+    if CLIENT_MODE == "fast":
+        connection_timeout = CONNECTION_TIMEOUT
+        network_timeout = NETWORK_TIMEOUT
+        concurrency = CLIENT_CONCURRENCY
 
     def on_start(self):
-        self.endpoint = os.environ.get("LOCUST_ENDPOINT", "/delay/1")
+        if CLIENT_MODE == "timed":
+            self.timed_client = TimedHTTPClient(self.host, CONNECTION_TIMEOUT, NETWORK_TIMEOUT)
+
+    def on_stop(self):
+        if CLIENT_MODE == "timed":
+            self.timed_client.close()
+
+    def request_kwargs(self, endpoint):
+        kwargs = endpoint.request_kwargs()
+        if not KEEP_ALIVE:
+            kwargs["headers"] = {**kwargs.get("headers", {}), "Connection": "close"}
+        if CLIENT_MODE == "http":
+            kwargs["timeout"] = (CONNECTION_TIMEOUT, NETWORK_TIMEOUT)
+        return kwargs
 
     @task
     def load_test_endpoint(self):
-        global response_times, error_count, request_count
-        with self.client.get(self.endpoint, catch_response=True) as response:
-            request_count += 1
-            response_times.append(response.elapsed.total_seconds() * 1000)
-            if response.status_code != 200:
-                error_count += 1
-                response.failure("Non-200 response")
+        endpoint = SCENARIO.pick()
+        intended_start = None
+        if arrival_schedule is not None:
+            intended_start = arrival_schedule.next_slot()
+            delay = intended_start - time.time()
+            if delay > 0:
+                gevent.sleep(delay)
+        sent_at = time.time()
+        generator_health.request_started()
+        try:
+            self.send(endpoint, intended_start, sent_at)
+        finally:
+            generator_health.request_finished()
+
+    def send(self, endpoint, intended_start, sent_at):
+        if CLIENT_MODE == "timed":
+            return self.send_timed(endpoint, intended_start, sent_at)
+        with self.client.request(endpoint.method, endpoint.path, catch_response=True, **self.request_kwargs(endpoint)) as response:
+            ok = response.status_code in endpoint.expect_status
+            now = time.time()
+            if intended_start is None and CLIENT_MODE == "http":
+                latency_ms = response.elapsed.total_seconds() * 1000
+            elif intended_start is None:
+                # FastHttpUser responses carry no elapsed timer; time the whole exchange.
+                latency_ms = (now - sent_at) * 1000
+            else:
+                # Measured from when the request should have been sent, so time spent
+                # waiting for a free user while the target was slow is counted too.
+                latency_ms = (now - intended_start) * 1000
+            record_request(endpoint, latency_ms, ok, now, response.status_code, len(response.content or b""))
+            if not ok:
+                response.failure(f"Unexpected status {response.status_code}")
+
+    def send_timed(self, endpoint, intended_start, sent_at):
+        # User has no Locust client, so the request event is fired here for Locust's own stats.
+        kwargs = self.request_kwargs(endpoint)
+        name = kwargs.pop("name", None) or endpoint.path
+        response, exception = None, None
+        try:
+            response = self.timed_client.request(endpoint.method, endpoint.path, **kwargs)
+        except Exception as e:
+            exception = e
+        now = time.time()
+        if response is None:
+            ok, status, size = False, 0, 0
+            latency_ms = (now - (intended_start or sent_at)) * 1000
+        else:
+            ok, status, size = response.status_code in endpoint.expect_status, response.status_code, len(response.content)
+            latency_ms = response.elapsed_ms if intended_start is None else (now - intended_start) * 1000
+            phase_stats.record(response.phases, size)
+            if not ok:
+                exception = CatchResponseError(f"Unexpected status {status}")
+        self.environment.events.request.fire(
+            request_type=endpoint.method, name=name, response_time=latency_ms, response_length=size,
+            response=response, context={}, exception=exception, start_time=sent_at,
+            url=response.url if response is not None else endpoint.path,
+        )
+        record_request(endpoint, latency_ms, ok, now, status, size)
+
+def record_request(endpoint, latency_ms, ok, now, status_code, size):
+    run_stats.record(latency_ms, ok)
+    endpoint_stats[endpoint.name].record(latency_ms, ok)
+    windows.record(latency_ms, ok, now)
+    if RAW_SAMPLES:
+        get_sample_writer().append(now - latency_ms / 1000, latency_ms, status_code, size, ok)
+
+@events.report_to_master.add_listener
+def send_worker_stats(client_id, data, **kwargs):
+    data[WORKER_PAYLOAD_KEY] = run_stats.to_dict()
+    data[WORKER_WINDOWS_KEY] = windows.drain()
+    data[WORKER_ENDPOINTS_KEY] = {name: stats.to_dict() for name, stats in endpoint_stats.items() if stats.request_count}
+    data[WORKER_HEALTH_KEY] = generator_health.to_dict()
+    if phase_stats.request_count:
+        data[WORKER_PHASES_KEY] = phase_stats.to_dict()
+        phase_stats.reset()
+    run_stats.reset()
+    for stats in endpoint_stats.values():
+        stats.reset()
+
+@events.worker_report.add_listener
+def merge_worker_stats(client_id, data, **kwargs):
+    payload = data.get(WORKER_PAYLOAD_KEY)
+    if payload:
+        worker_ids.add(client_id)
+        run_stats.merge(RunStats.from_dict(payload))
+    if data.get(WORKER_WINDOWS_KEY):
+        windows.merge(data[WORKER_WINDOWS_KEY])
+    for name, payload in (data.get(WORKER_ENDPOINTS_KEY) or {}).items():
+        endpoint_stats.setdefault(name, RunStats()).merge(RunStats.from_dict(payload))
+    if data.get(WORKER_HEALTH_KEY):
+        worker_health[client_id] = data[WORKER_HEALTH_KEY]
+    if data.get(WORKER_PHASES_KEY):
+        phase_stats.merge(PhaseStats.from_dict(data[WORKER_PHASES_KEY]))
+
+def window_breach(record):
+    if ABORT_ERROR_RATE and record["error_rate"] >= ABORT_ERROR_RATE:
+        return f"error rate {record['error_rate']}% >= {ABORT_ERROR_RATE}%"
+    if ABORT_P95_MS and record["p95"] is not None and record["p95"] >= ABORT_P95_MS:
+        return f"p95 {record['p95']} ms >= {ABORT_P95_MS} ms"
+    return None
+
+def check_abort(environment, records):
+    global breached_windows, abort_reason
+    for record in records:
+        if not record["requests"]:
+            continue
+        reason = window_breach(record)
+        breached_windows = breached_windows + 1 if reason else 0
+        if reason and breached_windows >= ABORT_WINDOWS and abort_reason is None:
+            abort_reason = f"{reason} for {breached_windows} consecutive windows"
+            print(f"Aborting load test: {abort_reason}")
+            # Quit from a fresh greenlet: quitting kills this flush loop.
+            gevent.spawn(environment.runner.quit)
+
+def flush_windows(environment, grace):
+    # The windows file doubles as the live metrics channel the dashboard tails.
+    while True:
+        gevent.sleep(WINDOW_SECONDS)
+        records = windows.pop_closed(time.time(), grace)
+        timeseries_writer.write(records)
+        if ABORT_ERROR_RATE or ABORT_P95_MS:
+            check_abort(environment, records)
+
+@events.test_start.add_listener
+def start_arrival_schedule(environment, **kwargs):
+    global arrival_schedule
+    if LOAD_MODE == CLOSED or isinstance(environment.runner, MasterRunner):
+        return
+    arrival_schedule = ArrivalSchedule(
+        TARGET_RPS / PROCESSES,
+        step_rate=STEP_RPS / PROCESSES if LOAD_MODE == STEP else 0.0,
+        step_seconds=STEP_SECONDS if LOAD_MODE == STEP else 0.0,
+        max_rate=MAX_RPS / PROCESSES if MAX_RPS else None,
+    )
+
+def sample_health():
+    generator_health.start()
+    while True:
+        gevent.sleep(generator_health.interval)
+        generator_health.sample()
+
+@events.test_start.add_listener
+def start_health_monitor(environment, **kwargs):
+    global health_greenlet
+    # Only processes that run users generate load; the master just aggregates.
+    if isinstance(environment.runner, MasterRunner) or health_greenlet is not None:
+        return
+    health_greenlet = gevent.spawn(sample_health)
+
+@events.test_start.add_listener
+def start_timeseries(environment, **kwargs):
+    global timeseries_writer, flush_greenlet
+    if isinstance(environment.runner, WorkerRunner) or timeseries_writer is not None:
+        return
+    # Worker windows arrive with the stats report, so the master holds them
+    # back long enough for every worker to have reported.
+    grace = 2 * WORKER_REPORT_INTERVAL if isinstance(environment.runner, MasterRunner) else 0.0
+    timeseries_writer = TimeSeriesWriter(timeseries_path(RUN_FILE))
+    flush_greenlet = gevent.spawn(flush_windows, environment, grace)
+
+def stop_timeseries():
+    if timeseries_writer is None:
+        return None
+    if flush_greenlet is not None:
+        flush_greenlet.kill()
+    timeseries_writer.write(windows.pop_all())
+    timeseries_writer.close()
+    return timeseries_writer.path
+
+def latency_basis():
+    if LOAD_MODE != CLOSED:
+        return "intended_start"
+    return "response_elapsed" if CLIENT_MODE == "http" else "request_wall_time"
+
+def endpoint_breakdown():
+    breakdown = {}
+    for endpoint in SCENARIO.endpoints:
+        stats = endpoint_stats[endpoint.name]
+        latency = stats.latency.summary(qs=(50, 95, 99))
+        breakdown[endpoint.name] = EndpointSummary(
+            **endpoint.describe(),
+            total_requests=stats.request_count,
+            error_rate=round(stats.error_rate, 2),
+            avg_response_time=latency["avg"],
+            p50_response_time=latency["p50"],
+            p95_response_time=latency["p95"],
+            p99_response_time=latency["p99"],
+            latency_histogram=stats.latency.to_dict(),
+        )
+    return breakdown
 
 @events.quitting.add_listener
 def write_run_summary(environment, **kwargs):
-    if not response_times:
+    if health_greenlet is not None:
+        health_greenlet.kill()
+    if sample_writer is not None:
+        sample_writer.close()
+    if isinstance(environment.runner, WorkerRunner):
+        return
+    timeseries_file = stop_timeseries()
+    if not run_stats.latency.count:
         print("No successful requests made.")
         return
 
-    avg_response = mean(response_times)
-    p95 = sorted(response_times)[int(0.95 * len(response_times)) - 1]
-    error_rate = (error_count / request_count) * 100 if request_count > 0 else 0
-
-    run_data = {
-        "run_id": datetime.now().strftime("%Y%m%d-%H%M%S"),
-        "avg_response_time": round(avg_response, 2),
-        "p95_response_time": round(p95, 2),
-        "error_rate": round(error_rate, 2),
-        "total_requests": request_count,
-        "endpoint": os.environ.get("LOCUST_ENDPOINT", "/delay/1"),
-        "timestamp": datetime.now().isoformat()
-    }
-
-    output_dir = Path(__file__).resolve().parent.parent / "data" / "runs"
-    output_dir.mkdir(parents=True, exist_ok=True)
-    output_path = output_dir / f"run_{run_data['run_id']}.json"
-
-    with open(output_path, "w") as f:
-        json.dump(run_data, f, indent=2)
+    latency = run_stats.latency.summary()
+
+    record = RunRecord(
+        run_id=RUN_ID,
+        avg_response_time=latency["avg"],
+        p50_response_time=latency["p50"],
+        p90_response_time=latency["p90"],
+        p95_response_time=latency["p95"],
+        p99_response_time=latency["p99"],
+        p999_response_time=latency["p999"],
+        max_response_time=latency["max"],
+        error_rate=round(run_stats.error_rate, 2),
+        total_requests=run_stats.request_count,
+        endpoint=SCENARIO.name,
+        workers=max(len(worker_ids), 1),
+        tags=parse_tags(os.environ.get("LOCUST_TAGS")),
+        timestamp=datetime.now().isoformat(),
+        latency_histogram=run_stats.latency.to_dict(),
+        load_mode=LOAD_MODE,
+        latency_basis=latency_basis(),
+        client_mode=CLIENT_MODE,
+        client_settings=client_settings(),
+    )
+    if LOAD_MODE != CLOSED:
+        record.target_rps = TARGET_RPS
+    if LOAD_MODE == STEP:
+        record.step_rps, record.step_seconds = STEP_RPS, STEP_SECONDS
+    if MAX_RPS and LOAD_MODE != CLOSED:
+        record.max_rps = MAX_RPS
+    if timeseries_file is not None:
+        record.timeseries_file = timeseries_file.name
+        record.window_seconds = WINDOW_SECONDS
+    generator = summarize_health(
+        list(worker_health.values()) if isinstance(environment.runner, MasterRunner) else [generator_health.to_dict()]
+    )
+    if generator is not None:
+        record.generator = generator
+        if generator["saturated"]:
+            print("Warning: the load generator was saturated during this run; latencies may be inflated by Locust itself.")
+    if SCENARIO_FILE:
+        record.scenario_file = str(SCENARIO_FILE)
+        record.endpoints = endpoint_breakdown()
+    if phase_stats.request_count:
+        record.phase_timings = phase_stats.to_dict(with_summary=True)
+    if abort_reason is not None:
+        record.aborted = {"reason": abort_reason}
+    if RAW_SAMPLES:
+        record.samples_dir = SAMPLES_DIR.relative_to(RUNS_DIR.parent).as_posix()
+
+    output_path = RUN_FILE
+    write_run(output_path, record)
+    record_run(output_path, record.to_dict())
 
     print(f"\nTest results written to: {output_path}")
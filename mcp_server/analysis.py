@@ -0,0 +1,485 @@
+# Loading and diffing run reports. Kept free of the JSON-RPC server and asyncio
+# so the command-line analyzer can import it cheaply.
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from utils.timeseries import load_windows, split_warmup, summarize_windows, merge_window_histograms
+from utils.perf_stats import compare_histograms, DEFAULT_ALPHA, DEFAULT_CONFIDENCE, DEFAULT_BOOTSTRAP_ITERATIONS
+from utils.run_catalog import RunCatalog
+from utils.sample_store import SampleStore, resolve_samples_dir
+from utils.run_schema import read_run_dict
+from utils.histogram import LatencyHistogram
+from utils.phase_timing import compare_phases, describe_phases
+
+LATENCY_KEYS = [
+    "avg_response_time", "p95_response_time", "steady_avg_response_time", "steady_p95_response_time",
+    "ok_p95_response_time", "ok_p99_response_time",
+]
+STEADY_LATENCY_KEYS = ["steady_avg_response_time", "steady_p95_response_time"]
+METADATA_KEYS = {
+    "run_id", "timestamp", "endpoint", "workers", "tags", "timeseries_file", "window_seconds", "samples_dir",
+    "load_mode", "target_rps", "step_rps", "step_seconds", "max_rps", "latency_basis", "scenario_file",
+    "client_mode", "schema_version",
+}
+# Runs written before client modes existed all used Locust's requests-based HttpUser.
+DEFAULT_CLIENT_MODE = "http"
+ROUTE_METRICS = ("avg_response_time", "p95_response_time", "p99_response_time", "error_rate", "total_requests")
+# Load-generation settings that change what the latency numbers mean.
+WORKLOAD_KEYS = ("load_mode", "latency_basis", "target_rps", "step_rps", "step_seconds", "max_rps")
+# Error rates are judged by their rise over the baseline in percentage points,
+# so a steady background error rate is not a regression. A rise beyond the
+# tolerance is a warning, and a threat once the test run's rate is this high.
+ERROR_RATE_TOLERANCE = 0.5
+HIGH_ERROR_RATE = 5.0
+
+
+def load_report(path):
+    # Any run format or schema version, migrated to current field names.
+    report = read_run_dict(path)
+    if report.get("timeseries_file"):
+        report["_windows"] = load_windows(Path(path).parent / report["timeseries_file"])
+    samples_dir = resolve_samples_dir(path, report)
+    if samples_dir is not None and samples_dir.exists():
+        report["_samples"] = samples_dir
+    return report
+
+
+def add_sample_metrics(report):
+    samples_dir = report.pop("_samples", None)
+    if samples_dir is not None:
+        try:
+            store = SampleStore(samples_dir)
+        except RuntimeError:
+            return
+        # Latency of successful requests only: fast error responses would otherwise
+        # make a failing release look quicker.
+        ok_histogram = store.latency_histogram(ok_only=True)
+    elif report.get("ok_latency_histogram"):
+        # Compacted runs keep this histogram in place of their dropped raw samples.
+        ok_histogram = LatencyHistogram.from_dict(report["ok_latency_histogram"])
+    else:
+        return
+    if ok_histogram.count:
+        ok = ok_histogram.percentiles((95, 99))
+        report["ok_p95_response_time"] = round(ok[95], 2)
+        report["ok_p99_response_time"] = round(ok[99], 2)
+        report["_sample_histogram"] = ok_histogram.to_dict()
+
+
+def catalog_path(run_id):
+    run = RunCatalog().get(run_id)
+    if run is None:
+        raise ValueError(f"Run '{run_id}' not found in the run catalog")
+    return run["path"]
+
+
+def resolve_report(params, path_key, id_key):
+    if params.get(path_key):
+        return params[path_key]
+    return catalog_path(params[id_key])
+
+
+def load_report_for(params, path_key, id_key):
+    return load_report(resolve_report(params, path_key, id_key))
+
+
+def add_window_metrics(report, warmup_seconds=None):
+    windows = report.pop("_windows", None)
+    if not windows:
+        return None
+    warmup, steady = split_warmup(windows, warmup_seconds)
+    steady_summary = summarize_windows(steady)
+    warmup_summary = summarize_windows(warmup)
+    if steady_summary:
+        steady_histogram = merge_window_histograms(steady)
+        if steady_histogram.count:
+            report["_steady_histogram"] = steady_histogram.to_dict()
+        report["steady_avg_response_time"] = steady_summary["avg_response_time"]
+        report["steady_p95_response_time"] = steady_summary["p95_response_time"]
+        report["steady_throughput_rps"] = steady_summary["throughput_rps"]
+    if warmup_summary:
+        report["warmup_p95_response_time"] = warmup_summary["p95_response_time"]
+    return {"warmup": warmup_summary, "steady": steady_summary}
+
+
+def safe_float(val):
+    try:
+        return float(val)
+    except (ValueError, TypeError):
+        return None
+
+
+def safe_divide(a, b):
+    try:
+        return round(((b - a) / a) * 100, 2)
+    except Exception:
+        return None
+
+
+def metric_status(key, change, after_val, before_val=None):
+    if key == "error_rate":
+        # Judged even without a percent change: a 0% baseline has none.
+        before, after = safe_float(before_val) or 0.0, safe_float(after_val)
+        if after is None or after - before <= ERROR_RATE_TOLERANCE:
+            return "🟢 Stable"
+        if after > HIGH_ERROR_RATE:
+            return "🚨 Threat: High error rate"
+        return "⚠️ Warning: More errors than the baseline"
+    if key in LATENCY_KEYS:
+        if change > 20:
+            return "⚠️ Warning: Significant increase"
+        if change < -20:
+            return "✅ Stable: Significant improvement"
+        return "🟢 Stable"
+    if key == "steady_throughput_rps":
+        if change < -20:
+            return "⚠️ Warning: Significant throughput drop"
+        return "🟢 Stable"
+    return ""
+
+
+def diff_reports(before, after):
+    results = {}
+    for key in before:
+        if key in after:
+            if key in METADATA_KEYS or key.startswith("_"):
+                continue
+            if isinstance(before[key], (dict, list)) or isinstance(after[key], (dict, list)):
+                continue
+            a = safe_float(before[key])
+            b = safe_float(after[key])
+            change = safe_divide(a, b) if a is not None and b is not None else None
+            results[key] = {
+                "before": before[key],
+                "after": after[key],
+                "change_percent": change
+            }
+    return results
+
+
+def conclude(statuses):
+    lines = list(statuses.values())
+    if any("Threat" in line for line in lines):
+        return "🚨 Conclusion: There is a performance threat that needs immediate attention."
+    if any(line.startswith(DISCOUNTED) for line in lines) and not any("Warning" in line for line in lines):
+        return "❔ Conclusion: Inconclusive. Latency moved, but the load generator was saturated; re-run with more workers or a lower load."
+    warned = [key for key, line in statuses.items() if "Warning" in line]
+    if warned:
+        steady_measured = any(key in statuses for key in STEADY_LATENCY_KEYS)
+        latency_only = all(key in LATENCY_KEYS or key == "warmup_p95_response_time" for key in warned)
+        if steady_measured and latency_only and not any(key in STEADY_LATENCY_KEYS for key in warned):
+            return "🟢 Conclusion: Latency moved only during warm-up; steady state is stable (likely startup noise)."
+        return "⚠️ Conclusion: There are warnings. Please review the metrics."
+    if any("improvement" in line for line in lines):
+        return "✅ Conclusion: Performance has improved."
+    return "🟢 Conclusion: System is stable."
+
+
+def is_regression(conclusion):
+    """True for the warning and threat conclusions; an inconclusive verdict does not fail a gate."""
+    return conclusion.startswith(("🚨", "⚠️"))
+
+
+# Histogram sources for the significance test, best first. Both runs must
+# offer the same source so warm-up or failed requests are treated alike.
+HISTOGRAM_SOURCES = (
+    ("steady state", "_steady_histogram"),
+    ("raw samples, successful requests", "_sample_histogram"),
+    ("whole run", "latency_histogram"),
+)
+
+
+def statistical_comparison(before, after, alpha=DEFAULT_ALPHA, confidence=DEFAULT_CONFIDENCE,
+                           iterations=DEFAULT_BOOTSTRAP_ITERATIONS):
+    for source, key in HISTOGRAM_SOURCES:
+        if isinstance(before.get(key), dict) and isinstance(after.get(key), dict):
+            comparison = compare_histograms(before[key], after[key], alpha, confidence, iterations)
+            if comparison is not None:
+                comparison["source"] = source
+                return comparison
+    return None
+
+
+def format_statistics(stats):
+    line = (
+        f"latency_distribution ({stats['source']}): Cliff's δ={stats['cliffs_delta']:+.3f} ({stats['effect_size']}), "
+        f"Mann-Whitney p={stats['mann_whitney_p']:.2g}, KS D={stats['ks_statistic']:.3f} (p={stats['ks_p']:.2g})"
+    )
+    p95 = stats.get("p95_change")
+    if p95:
+        line += f", p95 {p95['change_percent']:+.2f}% [{p95['ci_low']:+.2f}%, {p95['ci_high']:+.2f}%] at {p95['confidence']:.0%}"
+    return f"{line} {stats['status']}"
+
+
+def client_mode(report):
+    return report.get("client_mode") or DEFAULT_CLIENT_MODE
+
+
+def check_client_modes(before, after):
+    """Refuse to compare runs driven by different HTTP clients; their latency is measured differently."""
+    if client_mode(before) != client_mode(after):
+        raise ValueError(
+            f"Runs used different HTTP clients (baseline '{client_mode(before)}', test '{client_mode(after)}'); "
+            "their latencies are not comparable. Re-run one of them with the same client mode."
+        )
+
+
+DISCOUNTED = "ℹ️ Discounted (load generator saturated)"
+
+
+def generator_saturation(report):
+    """Short description of a saturated load generator, or None."""
+    generator = report.get("generator")
+    if not isinstance(generator, dict) or not generator.get("saturated"):
+        return None
+    return (f"CPU up to {generator.get('cpu_percent_max')}%, event-loop lag p95 {generator.get('lag_ms_p95')} ms, "
+            f"max {generator.get('lag_ms_max')} ms")
+
+
+def discount_status(key, status):
+    """Latency warnings from a saturated generator may be Locust's own delay; keep them visible but not decisive."""
+    is_latency = key in LATENCY_KEYS or key == "latency_distribution" or key.startswith("route:")
+    if is_latency and "Warning" in status and "error" not in status:
+        return f"{DISCOUNTED}: {status.replace('⚠️ Warning: ', '')}"
+    return status
+
+
+def workload_differences(before, after):
+    """Workload settings that differ between two runs (closed-model runs predate these keys)."""
+    defaults = {"load_mode": "closed", "latency_basis": "response_elapsed"}
+    differences = {}
+    for key in WORKLOAD_KEYS:
+        a, b = before.get(key, defaults.get(key)), after.get(key, defaults.get(key))
+        if a != b:
+            differences[key] = {"before": a, "after": b}
+    return differences
+
+
+def compare_routes(before, after, use_statistics=True, alpha=DEFAULT_ALPHA, confidence=DEFAULT_CONFIDENCE,
+                   iterations=DEFAULT_BOOTSTRAP_ITERATIONS):
+    """Per-endpoint diff of two scenario runs, so one slow route is not averaged away."""
+    before_routes = before.get("endpoints")
+    after_routes = after.get("endpoints")
+    if not isinstance(before_routes, dict) or not isinstance(after_routes, dict):
+        return None
+    routes = {}
+    for name in sorted(set(before_routes) | set(after_routes)):
+        b, a = before_routes.get(name), after_routes.get(name)
+        if b is None or a is None:
+            routes[name] = {"status": "ℹ️ Route only in the test run" if b is None else "ℹ️ Route only in the baseline run"}
+            continue
+        metrics = {}
+        for key in ROUTE_METRICS:
+            before_val, after_val = safe_float(b.get(key)), safe_float(a.get(key))
+            change = safe_divide(before_val, after_val) if before_val is not None and after_val is not None else None
+            metrics[key] = {"before": b.get(key), "after": a.get(key), "change_percent": change}
+        statistics = None
+        if use_statistics and b.get("latency_histogram") and a.get("latency_histogram"):
+            statistics = compare_histograms(b["latency_histogram"], a["latency_histogram"], alpha, confidence, iterations)
+        p95 = metrics["p95_response_time"]
+        if statistics is not None:
+            latency_status = statistics["status"]
+        elif p95["change_percent"] is not None:
+            latency_status = metric_status("p95_response_time", p95["change_percent"], p95["after"])
+        else:
+            latency_status = ""
+        error_rate = metrics["error_rate"]
+        error_status = metric_status("error_rate", error_rate["change_percent"], error_rate["after"], error_rate["before"])
+        flagged = [line for line in (latency_status, error_status)
+                   if any(marker in line for marker in ("Threat", "Warning", "improvement"))]
+        status = "; ".join(flagged) if flagged else (latency_status or error_status)
+        routes[name] = {"metrics": metrics, "statistics": statistics, "status": status}
+    return routes
+
+
+def format_route(name, route):
+    if "metrics" not in route:
+        return f"route {name}: {route['status']}"
+    p95 = route["metrics"]["p95_response_time"]
+    errors = route["metrics"]["error_rate"]
+    change = f" ({p95['change_percent']:+.2f}%)" if p95["change_percent"] is not None else ""
+    return f"route {name}: p95 {p95['before']} → {p95['after']}{change}, errors {errors['before']}% → {errors['after']}% {route['status']}"
+
+
+def build_analysis(before, after, warmup_seconds=None, mode="auto", alpha=DEFAULT_ALPHA,
+                   confidence=DEFAULT_CONFIDENCE, iterations=DEFAULT_BOOTSTRAP_ITERATIONS):
+    check_client_modes(before, after)
+    before_phases = add_window_metrics(before, warmup_seconds)
+    after_phases = add_window_metrics(after, warmup_seconds)
+    add_sample_metrics(before)
+    add_sample_metrics(after)
+    results = diff_reports(before, after)
+
+    statistics = None
+    if mode != "threshold":
+        statistics = statistical_comparison(before, after, alpha, confidence, iterations)
+        if statistics is None and mode == "statistical":
+            raise ValueError("Statistical mode needs latency histograms (or raw samples) in both runs.")
+
+    # Compose a human-readable analysis summary and diff_metrics for dashboard
+    summary_lines = []
+    diff_metrics = []
+    statuses = {}
+    saturation = {side: generator_saturation(report) for side, report in (("before", before), ("after", after))}
+    saturation = {side: reason for side, reason in saturation.items() if reason}
+    for side, reason in saturation.items():
+        run = "baseline" if side == "before" else "test"
+        summary_lines.append(f"⚠️ Note: the load generator was saturated during the {run} run ({reason}).")
+    workload = workload_differences(before, after)
+    if workload:
+        changed = ", ".join(f"{key} {val['before']} → {val['after']}" for key, val in workload.items())
+        summary_lines.append(f"⚠️ Note: runs used different load models ({changed}); latency is not directly comparable.")
+    for key, val in results.items():
+        before_val = val.get("before")
+        after_val = val.get("after")
+        change = val.get("change_percent")
+        if change is not None or key == "error_rate":
+            status = metric_status(key, change, after_val, before_val)
+            if statistics is not None and key in LATENCY_KEYS:
+                # Latency verdicts come from the significance test instead of ±20% thresholds.
+                status = ""
+            if saturation:
+                status = discount_status(key, status)
+            statuses[key] = status
+            detail = f" ({change:+.2f}% change)" if change is not None else ""
+            summary_lines.append(f"{key}: {before_val} → {after_val}{detail} {status}")
+        else:
+            summary_lines.append(f"{key}: {before_val} → {after_val} (no change computed)")
+        diff_metrics.append({
+            "Metric": key,
+            "Before": before_val,
+            "After": after_val,
+            "% Change": change
+        })
+    if statistics is not None:
+        if saturation:
+            statistics["status"] = discount_status("latency_distribution", statistics["status"])
+        summary_lines.append(format_statistics(statistics))
+        statuses["latency_distribution"] = statistics["status"]
+    routes = compare_routes(before, after, mode != "threshold", alpha, confidence, iterations)
+    for name, route in (routes or {}).items():
+        if saturation and "metrics" in route:
+            route["status"] = "; ".join(discount_status(f"route:{name}", part) for part in route["status"].split("; "))
+        summary_lines.append(format_route(name, route))
+        if "metrics" in route:
+            statuses[f"route:{name}"] = route["status"]
+    # Explains a latency change rather than judging it, so it adds no status.
+    request_phases = compare_phases(before.get("phase_timings"), after.get("phase_timings"))
+    if request_phases is not None:
+        summary_lines.append(describe_phases(request_phases))
+    conclusion = conclude(statuses)
+    analysis = "\n".join(summary_lines) + "\n\n" + conclusion if summary_lines else "No significant differences found."
+    result = {
+        "analysis": analysis,
+        "conclusion": conclusion,
+        "diff_metrics": diff_metrics
+    }
+    if before_phases and after_phases:
+        result["phases"] = {"before": before_phases, "after": after_phases}
+    if statistics is not None:
+        result["statistics"] = statistics
+    if workload:
+        result["workload_differences"] = workload
+    if routes:
+        result["routes"] = routes
+    if request_phases is not None:
+        result["request_phases"] = request_phases
+    if saturation:
+        result["generator_saturation"] = saturation
+    return result
+
+
+def prepare_report(report, warmup_seconds=None):
+    add_window_metrics(report, warmup_seconds)
+    add_sample_metrics(report)
+    return report
+
+
+def numeric_metrics(report):
+    metrics = {}
+    for key, value in report.items():
+        if key in METADATA_KEYS or key.startswith("_") or isinstance(value, bool):
+            continue
+        value = safe_float(value) if not isinstance(value, (dict, list)) else None
+        if value is not None:
+            metrics[key] = value
+    return metrics
+
+
+def build_matrix(candidate, baselines, warmup_seconds=None, metrics=None, mode="auto", alpha=DEFAULT_ALPHA,
+                 confidence=DEFAULT_CONFIDENCE, iterations=DEFAULT_BOOTSTRAP_ITERATIONS):
+    """Diff one candidate against N baselines; every report is prepared exactly once.
+
+    Latency verdicts come from the significance test, as in build_analysis;
+    a baseline without comparable histograms falls back to ±20% thresholds.
+    """
+    candidate = prepare_report(candidate, warmup_seconds)
+    baselines = [prepare_report(report, warmup_seconds) for report in baselines]
+    after = numeric_metrics(candidate)
+    befores = [numeric_metrics(report) for report in baselines]
+    keys = list(metrics) if metrics else [key for key in after if any(key in before for before in befores)]
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    if np is not None:
+        before_matrix = np.array([[before.get(key, np.nan) for key in keys] for before in befores], dtype=float).reshape(len(befores), len(keys))
+        after_row = np.array([after.get(key, np.nan) for key in keys], dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change_matrix = np.round((after_row - before_matrix) / before_matrix * 100, 2)
+        change_matrix[~np.isfinite(change_matrix)] = np.nan
+        before_rows = [[None if np.isnan(v) else float(v) for v in row] for row in before_matrix]
+        change_rows = [[None if np.isnan(v) else float(v) for v in row] for row in change_matrix]
+    else:
+        before_rows = [[before.get(key) for key in keys] for before in befores]
+        change_rows = [
+            [safe_divide(b, after[key]) if b is not None and key in after else None for key, b in zip(keys, row)]
+            for row in before_rows
+        ]
+
+    verdicts = []
+    statistics = []
+    for index, change_row in enumerate(change_rows):
+        baseline = baselines[index]
+        if client_mode(baseline) != client_mode(candidate):
+            change_rows[index] = [None] * len(keys)
+            verdicts.append(f"⛔ Skipped: baseline used the '{client_mode(baseline)}' client, test used '{client_mode(candidate)}'")
+            statistics.append(None)
+            continue
+        comparison = None
+        if mode != "threshold":
+            comparison = statistical_comparison(baseline, candidate, alpha, confidence, iterations)
+            if comparison is None and mode == "statistical":
+                raise ValueError("Statistical mode needs latency histograms (or raw samples) in every run.")
+        statistics.append(comparison)
+        saturated = generator_saturation(baseline) or generator_saturation(candidate)
+        statuses = {}
+        for key, change, before_val in zip(keys, change_row, before_rows[index]):
+            if change is None and not (key == "error_rate" and before_val is not None and key in after):
+                continue
+            if comparison is not None and key in LATENCY_KEYS:
+                # Latency verdicts come from the significance test instead of ±20% thresholds.
+                continue
+            status = metric_status(key, change, after.get(key), before_val)
+            statuses[key] = discount_status(key, status) if saturated else status
+        if comparison is not None:
+            status = comparison["status"]
+            statuses["latency_distribution"] = discount_status("latency_distribution", status) if saturated else status
+        verdicts.append(conclude(statuses))
+    regressed = sum(1 for verdict in verdicts if is_regression(verdict))
+    analysis = f"Test run flagged against {regressed} of {len(verdicts)} distinct baseline(s)."
+    thresholds = sum(1 for verdict, comparison in zip(verdicts, statistics)
+                     if comparison is None and not verdict.startswith("⛔"))
+    if thresholds and mode != "threshold":
+        analysis += (f" Latency was judged by ±20% thresholds against {thresholds} baseline(s) "
+                     "without comparable latency histograms.")
+    return {
+        "metrics": keys,
+        "test": {key: after.get(key) for key in keys},
+        "baselines": before_rows,
+        "change_percent": change_rows,
+        "verdicts": verdicts,
+        "statistics": statistics,
+        "analysis": analysis,
+    }
@@ -1,7 +1,104 @@
+import argparse
 import asyncio
+import os
 import sys
 import json
-from mcp.server.fastmcp import FastMCP, ToolCallContext, json_schema, handle_tool_call
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from pathlib import Path
+from mcp.server.fastmcp import FastMCP, ToolCallContext, JSONRPCError, json_schema, handle_tool_call
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from utils.perf_stats import DEFAULT_ALPHA, DEFAULT_CONFIDENCE, DEFAULT_BOOTSTRAP_ITERATIONS
+from utils.run_catalog import RunCatalog, SERIES_METRICS
+from utils.trend import TrendEngine, DEFAULT_WINDOW, DEFAULT_THRESHOLD
+from utils.timeseries import timeseries_path
+from utils.run_schema import migrate
+from analysis import build_analysis, build_matrix, catalog_path, load_report, load_report_for, resolve_report
+from result_cache import ResultCache, file_fingerprint, content_fingerprint, make_key, DEFAULT_MAX_ENTRIES, DEFAULT_MAX_DISK_BYTES
+
+# Bump whenever build_analysis output changes so cached results are not reused.
+ANALYZER_VERSION = "12"
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / "data" / "cache" / "analysis"
+result_cache = ResultCache()
+
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get("MCP_MAX_CONCURRENCY", "8"))
+io_executor = ThreadPoolExecutor(max_workers=DEFAULT_MAX_CONCURRENCY, thread_name_prefix="mcp-io")
+cpu_executor = None  # a ProcessPoolExecutor when started with --cpu-workers, else io_executor
+
+
+async def run_in(executor, func, *args):
+    future = asyncio.get_running_loop().run_in_executor(executor, func, *args)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        # An executor cannot interrupt a call that has started. The cancelled
+        # request keeps its concurrency slot until the call ends, so abandoned
+        # work cannot hold every worker while new requests are admitted.
+        while not future.done():
+            try:
+                await asyncio.wait({future})
+            except asyncio.CancelledError:
+                pass
+        raise
+
+
+async def run_blocking(func, *args):
+    return await run_in(io_executor, func, *args)
+
+
+async def run_cpu(func, *args):
+    return await run_in(cpu_executor or io_executor, func, *args)
+
+
+def report_fingerprint(path):
+    # The time-series sidecar is fingerprinted too; it feeds the steady-state metrics.
+    return [file_fingerprint(path), file_fingerprint(timeseries_path(path))]
+
+
+def analysis_cache_key(params):
+    if ("baseline_report" in params or "baseline_run_id" in params) and ("test_report" in params or "test_run_id" in params):
+        inputs = [
+            report_fingerprint(resolve_report(params, "baseline_report", "baseline_run_id")),
+            report_fingerprint(resolve_report(params, "test_report", "test_run_id")),
+        ]
+    else:
+        inputs = [content_fingerprint(params.get("beforeMetrics")), content_fingerprint(params.get("afterMetrics"))]
+    options = [params.get(key) for key in ("warmup_seconds", "mode", "alpha", "confidence", "bootstrap_iterations")]
+    return make_key("analyze_performance_diff", ANALYZER_VERSION, inputs, options)
+
+
+def list_catalog_runs(params):
+    catalog = RunCatalog()
+    filters = {key: params.get(key) for key in ("endpoint", "since", "until", "tag")}
+    return {
+        "total": catalog.count(**filters),
+        "runs": catalog.query(limit=params.get("limit", 50), offset=params.get("offset", 0), **filters),
+    }
+
+
+_trend_engine = None
+_trend_lock = threading.Lock()
+
+
+def analyze_trend(params):
+    global _trend_engine
+    with _trend_lock:
+        if _trend_engine is None:
+            _trend_engine = TrendEngine()
+    options = {}
+    if params.get("window") is not None:
+        options["window"] = int(params["window"])
+    if params.get("threshold") is not None:
+        options["threshold"] = float(params["threshold"])
+    return _trend_engine.analyze(
+        params.get("metric") or "p95_response_time",
+        params.get("endpoint"),
+        include_series=bool(params.get("include_series")),
+        tail=params.get("tail"),
+        **options,
+    )
+
 
 # Define the tool class
 class PerfInsightTools:
@@ -23,209 +120,419 @@ class PerfInsightTools:
             "test_report": {
                 "type": "string",
                 "description": "Path to the test Locust run JSON file"
-            }
+            },
+            "baseline_run_id": {
+                "type": "string",
+                "description": "Run catalog id of the baseline run (alternative to baseline_report)"
+            },
+            "test_run_id": {
+                "type": "string",
+                "description": "Run catalog id of the test run (alternative to test_report)"
+            },
+            "warmup_seconds": {
+                "type": "number",
+                "description": "Seconds at the start of each run treated as warm-up (default: 10% of the run)"
+            },
+            "mode": {
+                "type": "string",
+                "enum": ["auto", "statistical", "threshold"],
+                "description": "Latency verdict: significance tests on histograms ('statistical'), fixed ±20% thresholds ('threshold'), or statistical when histograms exist ('auto', default)"
+            },
+            "alpha": {"type": "number", "description": "Significance level for Mann-Whitney (default 0.01)"},
+            "confidence": {"type": "number", "description": "Bootstrap confidence level (default 0.95)"},
+            "bootstrap_iterations": {"type": "integer", "description": "Bootstrap resamples, capped by a fixed compute budget (default 500)"}
         },
         "anyOf": [
             {"required": ["beforeMetrics", "afterMetrics"]},
-            {"required": ["baseline_report", "test_report"]}
+            {"required": ["baseline_report", "test_report"]},
+            {"required": ["baseline_run_id", "test_run_id"]}
         ]
     })
     @handle_tool_call("analyze_performance_diff", "Analyze performance difference between two metric snapshots")
     async def analyze_performance_diff(self, ctx: ToolCallContext, params: dict) -> dict:
+        try:
+            if "baseline_report" in params and "test_report" in params:
+                # Two stat() calls: cheap enough to stay on the event loop so hits return immediately.
+                cache_key = analysis_cache_key(params)
+            else:
+                # Catalog lookups and hashing inline metrics are kept off the event loop.
+                cache_key = await run_blocking(analysis_cache_key, params)
+        except Exception:
+            cache_key = None
+        if cache_key is not None:
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         before = after = None
-        if "baseline_report" in params and "test_report" in params:
+        has_baseline = "baseline_report" in params or "baseline_run_id" in params
+        has_test = "test_report" in params or "test_run_id" in params
+        if has_baseline and has_test:
             try:
-                with open(params["baseline_report"], "r") as f:
-                    before = json.load(f)
-                with open(params["test_report"], "r") as f:
-                    after = json.load(f)
+                before, after = await asyncio.gather(
+                    run_blocking(load_report_for, params, "baseline_report", "baseline_run_id"),
+                    run_blocking(load_report_for, params, "test_report", "test_run_id"),
+                )
             except Exception as e:
                 raise ValueError(f"Failed to load input files: {e}")
         elif "beforeMetrics" in params and "afterMetrics" in params:
-            before = params["beforeMetrics"]
-            after = params["afterMetrics"]
+            # Inline metrics may use the old run_logger field names too.
+            before = migrate(params["beforeMetrics"]) if isinstance(params["beforeMetrics"], dict) else params["beforeMetrics"]
+            after = migrate(params["afterMetrics"]) if isinstance(params["afterMetrics"], dict) else params["afterMetrics"]
         else:
-            raise ValueError("You must provide either 'beforeMetrics' and 'afterMetrics' objects, or 'baseline_report' and 'test_report' file paths.")
+            raise ValueError("You must provide either 'beforeMetrics' and 'afterMetrics' objects, 'baseline_report' and 'test_report' file paths, or 'baseline_run_id' and 'test_run_id' catalog ids.")
         if not isinstance(before, dict) or not isinstance(after, dict):
             raise ValueError("'beforeMetrics' and 'afterMetrics' must be objects (dicts).")
 
-        def safe_float(val):
-            try:
-                return float(val)
-            except (ValueError, TypeError):
-                return None
+        result = await run_cpu(
+            build_analysis, before, after, params.get("warmup_seconds"), params.get("mode", "auto"),
+            params.get("alpha", DEFAULT_ALPHA), params.get("confidence", DEFAULT_CONFIDENCE),
+            params.get("bootstrap_iterations", DEFAULT_BOOTSTRAP_ITERATIONS),
+        )
+        if cache_key is not None:
+            result_cache.put(cache_key, result)
+        return result
 
-        def safe_divide(a, b):
-            try:
-                return round(((b - a) / a) * 100, 2)
-            except Exception:
-                return None
-
-        results = {}
-        for key in before:
-            if key in after:
-                a = safe_float(before[key])
-                b = safe_float(after[key])
-                change = safe_divide(a, b) if a is not None and b is not None else None
-                results[key] = {
-                    "before": before[key],
-                    "after": after[key],
-                    "change_percent": change
-                }
-
-        # Compose a human-readable analysis summary and diff_metrics for dashboard
-        summary_lines = []
-        diff_metrics = []
-        for key, val in results.items():
-            before_val = val.get("before")
-            after_val = val.get("after")
-            change = val.get("change_percent")
-            status = ""
-            if change is not None:
-                if key in ["avg_response_time", "p95_response_time"]:
-                    if change > 20:
-                        status = "⚠️ Warning: Significant increase"
-                    elif change < -20:
-                        status = "✅ Stable: Significant improvement"
-                    else:
-                        status = "🟢 Stable"
-                elif key == "error_rate":
-                    if after_val > 5:
-                        status = "🚨 Threat: High error rate"
-                    elif after_val > 0:
-                        status = "⚠️ Warning: Some errors"
-                    else:
-                        status = "🟢 Stable"
-                elif key == "total_requests":
-                    status = ""
-                summary_lines.append(f"{key}: {before_val} → {after_val} ({change:+.2f}% change) {status}")
-                diff_metrics.append({
-                    "Metric": key,
-                    "Before": before_val,
-                    "After": after_val,
-                    "% Change": change
-                })
-            else:
-                summary_lines.append(f"{key}: {before_val} → {after_val} (no change computed)")
-                diff_metrics.append({
-                    "Metric": key,
-                    "Before": before_val,
-                    "After": after_val,
-                    "% Change": None
-                })
-        conclusion = ""
-        if any("Threat" in line for line in summary_lines):
-            conclusion = "🚨 Conclusion: There is a performance threat that needs immediate attention."
-        elif any("Warning" in line for line in summary_lines):
-            conclusion = "⚠️ Conclusion: There are warnings. Please review the metrics."
-        elif any("improvement" in line for line in summary_lines):
-            conclusion = "✅ Conclusion: Performance has improved."
-        else:
-            conclusion = "🟢 Conclusion: System is stable."
-        analysis = "\n".join(summary_lines) + "\n\n" + conclusion if summary_lines else "No significant differences found."
-        return {
-            "analysis": analysis,
-            "diff_metrics": diff_metrics
+    @json_schema({
+        "type": "object",
+        "properties": {
+            "test_report": {"type": "string", "description": "Path to the candidate run JSON file"},
+            "test_run_id": {"type": "string", "description": "Run catalog id of the candidate run"},
+            "baseline_reports": {"type": "array", "items": {"type": "string"}, "description": "Paths to baseline run JSON files"},
+            "baseline_run_ids": {"type": "array", "items": {"type": "string"}, "description": "Run catalog ids of baseline runs"},
+            "metrics": {"type": "array", "items": {"type": "string"}, "description": "Metric keys to include (default: all shared numeric metrics)"},
+            "warmup_seconds": {"type": "number", "description": "Seconds at the start of each run treated as warm-up"},
+            "mode": {
+                "type": "string",
+                "enum": ["auto", "statistical", "threshold"],
+                "description": "Latency verdict, as for analyze_performance_diff (default 'auto')"
+            }
+        },
+        "anyOf": [
+            {"required": ["test_report"]},
+            {"required": ["test_run_id"]}
+        ]
+    })
+    @handle_tool_call("analyze_performance_matrix", "Compare one test run against many baseline runs in a single pass")
+    async def analyze_performance_matrix(self, ctx: ToolCallContext, params: dict) -> dict:
+        test_path = await run_blocking(resolve_report, params, "test_report", "test_run_id")
+        baseline_paths = list(params.get("baseline_reports") or [])
+        for run_id in params.get("baseline_run_ids") or []:
+            baseline_paths.append(await run_blocking(catalog_path, run_id))
+        if not baseline_paths:
+            raise ValueError("Provide at least one of 'baseline_reports' or 'baseline_run_ids'.")
+
+        # Each distinct file is read and parsed once, however often it is referenced.
+        distinct = list(dict.fromkeys(str(Path(p).resolve()) for p in [test_path] + baseline_paths))
+        try:
+            loaded = await asyncio.gather(*[run_blocking(load_report, path) for path in distinct])
+        except Exception as e:
+            raise ValueError(f"Failed to load input files: {e}")
+        reports = dict(zip(distinct, loaded))
+        test_key = str(Path(test_path).resolve())
+        baseline_keys = [str(Path(p).resolve()) for p in baseline_paths]
+        unique_baselines = list(dict.fromkeys(baseline_keys))
+        # A candidate that doubles as a baseline gets its own dict so
+        # prepare_report() is not applied twice to the same object.
+        matrix = await run_cpu(
+            build_matrix,
+            reports[test_key],
+            [dict(reports[key]) if key == test_key else reports[key] for key in unique_baselines],
+            params.get("warmup_seconds"),
+            params.get("metrics"),
+            params.get("mode", "auto"),
+        )
+        # Expand back to the caller's order, including repeated baselines.
+        rows = {key: index for index, key in enumerate(unique_baselines)}
+        for field in ("baselines", "change_percent", "verdicts", "statistics"):
+            matrix[field] = [matrix[field][rows[key]] for key in baseline_keys]
+        matrix["baseline_reports"] = baseline_paths
+        matrix["test_report"] = str(test_path)
+        return matrix
+
+    @json_schema({
+        "type": "object",
+        "properties": {
+            "clear": {"type": "boolean", "description": "Drop every cached result after reporting the counters"}
         }
+    })
+    @handle_tool_call("cache_stats", "Report hit/miss counters of the analysis result cache")
+    async def cache_stats(self, ctx: ToolCallContext, params: dict) -> dict:
+        stats = result_cache.stats()
+        stats["analyzer_version"] = ANALYZER_VERSION
+        if params.get("clear"):
+            await run_blocking(result_cache.clear)
+            stats["cleared"] = True
+        return stats
 
-# Tool registration
-async def main():
-    mcp = FastMCP(PerfInsightTools)
+    @json_schema({
+        "type": "object",
+        "properties": {
+            "endpoint": {"type": "string", "description": "Only runs against this endpoint"},
+            "since": {"type": "string", "description": "ISO date/time lower bound (inclusive)"},
+            "until": {"type": "string", "description": "ISO date/time upper bound (inclusive)"},
+            "tag": {"type": "string", "description": "Only runs carrying this tag"},
+            "limit": {"type": "integer", "description": "Page size (default 50)"},
+            "offset": {"type": "integer", "description": "Rows to skip (default 0)"}
+        }
+    })
+    @handle_tool_call("list_runs", "List stored runs from the run catalog, newest first")
+    async def list_runs(self, ctx: ToolCallContext, params: dict) -> dict:
+        return await run_blocking(list_catalog_runs, params)
+
+    @json_schema({
+        "type": "object",
+        "properties": {
+            "endpoint": {"type": "string", "description": "Only runs against this endpoint (default: all runs)"},
+            "metric": {"type": "string", "enum": SERIES_METRICS, "description": "Catalog metric to track (default p95_response_time)"},
+            "window": {"type": "integer", "description": f"Runs in the rolling anomaly baseline (default {DEFAULT_WINDOW})"},
+            "threshold": {"type": "number", "description": f"CUSUM decision threshold in robust standard deviations (default {DEFAULT_THRESHOLD})"},
+            "include_series": {"type": "boolean", "description": "Also return the per-run values, baselines and scores"},
+            "tail": {"type": "integer", "description": "Limit the returned series to the most recent N runs"}
+        }
+    })
+    @handle_tool_call("analyze_performance_trend", "Detect level shifts and anomalous runs across the run history")
+    async def analyze_performance_trend(self, ctx: ToolCallContext, params: dict) -> dict:
+        return await run_blocking(analyze_trend, params)
+
+# JSON-RPC service
+SERVER_INFO = {"name": "perfInsight", "version": "0.2.0"}
+
+
+def jsonrpc_result(request_id, result):
+    return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+
+def jsonrpc_error(request_id, code, message):
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+async def handle_request(mcp, request):
+    """Dispatch one JSON-RPC request; returns None for notifications."""
+    if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+        return jsonrpc_error(request.get("id") if isinstance(request, dict) else None, -32600, "Invalid Request")
+    method = request["method"]
+    request_id = request.get("id")
+    is_notification = "id" not in request
+    try:
+        if method == "initialize":
+            result = {
+                "protocolVersion": "2024-11-05",
+                "capabilities": {"tools": {}},
+                "serverInfo": SERVER_INFO
+            }
+        elif method == "ping":
+            result = {}
+        elif method.startswith("notifications/"):
+            return None
+        elif method == "tools/list":
+            result = {"tools": await mcp.list_tools()}
+        elif method == "call_tool":
+            params = request.get("params", {})
+            result = await mcp.call_tool(params.get("call_id"), params.get("tool_name"), params.get("input_data"))
+        elif method == "tools/call":
+            params = request.get("params", {})
+            result = await mcp.call_tool(request_id, params.get("name"), params.get("arguments", {}))
+        else:
+            return None if is_notification else jsonrpc_error(request_id, -32601, "Method not found")
+    except JSONRPCError as e:
+        return None if is_notification else jsonrpc_error(request_id, e.code, e.message)
+    except Exception as e:
+        return None if is_notification else jsonrpc_error(request_id, -32000, str(e))
+    return None if is_notification else jsonrpc_result(request_id, result)
+
+
+CANCEL_METHODS = ("$/cancelRequest", "notifications/cancelled")
+# Cheap control methods bypass the concurrency limit so health checks never
+# queue behind slow analyses.
+UNLIMITED_METHODS = ("initialize", "ping", "tools/list")
+REQUEST_CANCELLED = -32800
+
+
+class Dispatcher:
+    """Runs each request of one connection as its own task.
+
+    Responses are written as soon as each task finishes, so they can arrive
+    out of order; clients correlate them by JSON-RPC id. A batch (JSON array)
+    runs its members concurrently and is answered with a single array.
+    """
+
+    def __init__(self, mcp, write_message, limiter):
+        self.mcp = mcp
+        self.write_message = write_message
+        self.limiter = limiter
+        self.in_flight = {}
+        self.responders = set()
+        self._write_lock = asyncio.Lock()
+
+    async def write(self, message):
+        async with self._write_lock:
+            await self.write_message(message)
+
+    def dispatch(self, request):
+        if isinstance(request, list):
+            self._track(self._respond_batch(request))
+            return
+        work = self._start(request)
+        if work is not None:
+            self._track(self._respond(request, work))
+
+    def _start(self, request):
+        if isinstance(request, dict) and request.get("method") in CANCEL_METHODS:
+            self.cancel(request.get("params") or {})
+            return None
+        work = asyncio.create_task(self._handle(request))
+        request_id = request.get("id") if isinstance(request, dict) else None
+        if request_id is not None:
+            self.in_flight[request_id] = work
+            work.add_done_callback(lambda _: self.in_flight.pop(request_id, None))
+        return work
+
+    def _track(self, coro):
+        responder = asyncio.create_task(coro)
+        self.responders.add(responder)
+        responder.add_done_callback(self.responders.discard)
+
+    def cancel(self, params):
+        request_id = params.get("id", params.get("requestId"))
+        task = self.in_flight.get(request_id)
+        if task is not None:
+            task.cancel()
+
+    async def _handle(self, request):
+        if isinstance(request, dict) and request.get("method") in UNLIMITED_METHODS:
+            return await handle_request(self.mcp, request)
+        async with self.limiter:
+            return await handle_request(self.mcp, request)
+
+    async def _await_response(self, request, work):
+        try:
+            return await work
+        except asyncio.CancelledError:
+            # Work already handed to an executor has finished by now (see run_in);
+            # its result is dropped and no further stages run.
+            is_notification = not isinstance(request, dict) or "id" not in request
+            return None if is_notification else jsonrpc_error(request.get("id"), REQUEST_CANCELLED, "Request cancelled")
+
+    async def _respond(self, request, work):
+        response = await self._await_response(request, work)
+        if response is not None:
+            await self.write(response)
+
+    async def _respond_batch(self, requests):
+        if not requests:
+            await self.write(jsonrpc_error(None, -32600, "Invalid Request: empty batch"))
+            return
+        started = [(request, self._start(request)) for request in requests]
+        responses = await asyncio.gather(*[
+            self._await_response(request, work) for request, work in started if work is not None
+        ])
+        responses = [response for response in responses if response is not None]
+        # A batch made only of notifications gets no reply at all.
+        if responses:
+            await self.write(responses)
+
+    async def drain(self):
+        if self.responders:
+            await asyncio.gather(*list(self.responders), return_exceptions=True)
+
+
+async def serve_connection(mcp, read_line, write_message, limiter):
+    """Serve newline-delimited JSON-RPC until the peer closes the stream."""
+    dispatcher = Dispatcher(mcp, write_message, limiter)
+    while True:
+        line = await read_line()
+        if not line:
+            break
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            await dispatcher.write(jsonrpc_error(None, -32700, f"Parse error: {e}"))
+            continue
+        dispatcher.dispatch(request)
+    await dispatcher.drain()
+
+
+async def serve_stdio(mcp, limiter):
     queue = asyncio.Queue()
     loop = asyncio.get_running_loop()
 
+    # A reader thread keeps stdin handling identical on Windows, where
+    # asyncio cannot attach a pipe reader to stdin.
     def stdin_reader():
         for line in sys.stdin:
             asyncio.run_coroutine_threadsafe(queue.put(line), loop)
+        asyncio.run_coroutine_threadsafe(queue.put(""), loop)
 
-    import threading
     threading.Thread(target=stdin_reader, daemon=True).start()
 
-    while True:
-        line = await queue.get()
-        if not line:
-            break
+    async def write_message(message):
+        sys.stdout.write(json.dumps(message) + "\n")
+        sys.stdout.flush()
+
+    await serve_connection(mcp, queue.get, write_message, limiter)
+
+
+async def serve_socket(mcp, limiter, socket_path=None, port=None):
+    async def on_connect(reader, writer):
+        async def read_line():
+            return (await reader.readline()).decode("utf-8")
+
+        async def write_message(message):
+            writer.write((json.dumps(message) + "\n").encode("utf-8"))
+            await writer.drain()
+
         try:
-            request = json.loads(line)
-            if request.get("method") == "initialize":
-                response = {
-                    "jsonrpc": "2.0",
-                    "id": request["id"],
-                    "result": {
-                        "protocolVersion": "2024-11-05",
-                        "capabilities": {"tools": {}},
-                        "serverInfo": {"name": "perfInsight", "version": "0.1.0"}
-                    }
-                }
-            elif request.get("method") == "tools/list":
-                tools = await mcp.list_tools()
-                response = {
-                    "jsonrpc": "2.0",
-                    "id": request["id"],
-                    "result": {"tools": tools}
-                }
-            elif request.get("method") == "call_tool":
-                params = request.get("params", {})
-                call_id = params.get("call_id")
-                tool_name = params.get("tool_name")
-                input_data = params.get("input_data")
-                result = await mcp.call_tool(call_id, tool_name, input_data)
-                response = {
-                    "jsonrpc": "2.0",
-                    "id": request["id"],
-                    "result": result
-                }
-            elif request.get("method") == "tools/call":
-                params = request.get("params", {})
-                tool_name = params.get("name")
-                arguments = params.get("arguments", {})
-                if "baseline_report" in arguments and "test_report" in arguments:
-                    try:
-                        with open(arguments["baseline_report"], "r") as f:
-                            before_metrics = json.load(f)
-                        with open(arguments["test_report"], "r") as f:
-                            after_metrics = json.load(f)
-                        input_data = {
-                            "beforeMetrics": before_metrics,
-                            "afterMetrics": after_metrics
-                        }
-                    except Exception as e:
-                        error_response = {
-                            "jsonrpc": "2.0",
-                            "id": request.get("id"),
-                            "error": {"code": -32001, "message": f"Failed to load input files: {e}"}
-                        }
-                        sys.stdout.write(json.dumps(error_response) + "\n")
-                        sys.stdout.flush()
-                        break
-                else:
-                    input_data = arguments
-                result = await mcp.call_tool(request["id"], tool_name, input_data)
-                response = {
-                    "jsonrpc": "2.0",
-                    "id": request["id"],
-                    "result": result
-                }
-                sys.stdout.write(json.dumps(response) + "\n")
-                sys.stdout.flush()
-                break  # 🔥 Exit loop after one response
-            else:
-                response = {
-                    "jsonrpc": "2.0",
-                    "id": request.get("id"),
-                    "error": {"code": -32601, "message": "Method not found"}
-                }
-                sys.stdout.write(json.dumps(response) + "\n")
-                sys.stdout.flush()
-        except Exception as e:
-            error_response = {
-                "jsonrpc": "2.0",
-                "id": request.get("id"),
-                "error": {"code": -32000, "message": str(e)}
-            }
-            sys.stdout.write(json.dumps(error_response) + "\n")
-            sys.stdout.flush()
-            break  # 🔥 Exit on failure too
+            await serve_connection(mcp, read_line, write_message, limiter)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    if socket_path:
+        server = await asyncio.start_unix_server(on_connect, path=socket_path)
+    else:
+        server = await asyncio.start_server(on_connect, host="127.0.0.1", port=port)
+    async with server:
+        await server.serve_forever()
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="perfInsight MCP server (JSON-RPC over stdio or a local socket)")
+    parser.add_argument("--socket", help="Serve on this UNIX socket path instead of stdio")
+    parser.add_argument("--port", type=int, help="Serve on 127.0.0.1:PORT instead of stdio")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="Maximum tool calls running at once (default: MCP_MAX_CONCURRENCY or 8)")
+    parser.add_argument("--cpu-workers", type=int, default=0,
+                        help="Run CPU-heavy analysis in a pool of this many processes (default: thread pool)")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="Analysis results kept in the in-memory LRU cache")
+    parser.add_argument("--disk-cache", nargs="?", const=str(DEFAULT_CACHE_DIR), default=os.environ.get("MCP_CACHE_DIR"),
+                        help="Also cache results on disk (default dir: data/cache/analysis)")
+    parser.add_argument("--disk-cache-mb", type=float, default=DEFAULT_MAX_DISK_BYTES / (1024 * 1024),
+                        help="Size budget of the on-disk cache before least-recently-used entries are evicted")
+    args = parser.parse_args(argv)
+
+    global io_executor, cpu_executor, result_cache
+    result_cache = ResultCache(args.cache_size, args.disk_cache, int(args.disk_cache_mb * 1024 * 1024))
+    io_executor = ThreadPoolExecutor(max_workers=max(1, args.max_concurrency), thread_name_prefix="mcp-io")
+    if args.cpu_workers > 0:
+        cpu_executor = ProcessPoolExecutor(max_workers=args.cpu_workers)
+    limiter = asyncio.Semaphore(max(1, args.max_concurrency))
+
+    mcp = FastMCP(PerfInsightTools)
+    try:
+        if args.socket or args.port:
+            await serve_socket(mcp, limiter, socket_path=args.socket, port=args.port)
+        else:
+            await serve_stdio(mcp, limiter)
+    finally:
+        io_executor.shutdown(wait=False, cancel_futures=True)
+        if cpu_executor is not None:
+            cpu_executor.shutdown(wait=False, cancel_futures=True)
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -38,7 +38,6 @@ def handle_tool_call(name, description):
 
         wrapper._tool_name = name
         wrapper._tool_description = description
-        wrapper._tool_input_schema = getattr(func, "_tool_schema", {"type": "object"})
         return wrapper
     return decorator
 
@@ -61,7 +60,9 @@ class FastMCP(MCPServer):
             {
                 "name": method._tool_name,
                 "description": method._tool_description,
-                "inputSchema": method._tool_input_schema,
+                # Read when listing: @json_schema may sit outside @handle_tool_call and
+                # only set the schema on the wrapper after it was created.
+                "inputSchema": getattr(method, "_tool_schema", {"type": "object"}),
             }
             for method in self.tool_methods.values()
         ]
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_DISK_BYTES = 64 * 1024 * 1024
+
+
+def file_fingerprint(path):
+    """Cheap identity of a file's contents: resolved path, mtime and size."""
+    path = Path(path).resolve()
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return [str(path), None, None]
+    return [str(path), st.st_mtime_ns, st.st_size]
+
+
+def content_fingerprint(value):
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def make_key(*parts):
+    return content_fingerprint(list(parts))
+
+
+class ResultCache:
+    """Two-tier result cache: in-memory LRU in front of an optional size-capped directory."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, disk_dir=None, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.max_entries = max_entries
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._disk_sizes = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.evictions_memory = 0
+        self.evictions_disk = 0
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            entries = sorted(self.disk_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+            for entry in entries:
+                self._disk_sizes[entry.stem] = entry.stat().st_size
+                self._disk_bytes += self._disk_sizes[entry.stem]
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits_memory += 1
+                return self._memory[key]
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits_disk += 1
+            self._store_memory(key, value)
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._store_memory(key, value)
+        self._write_disk(key, value)
+
+    def _store_memory(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions_memory += 1
+
+    def _read_disk(self, key):
+        if self.disk_dir is None:
+            return None
+        with self._lock:
+            if key not in self._disk_sizes:
+                return None
+            self._disk_sizes.move_to_end(key)
+        path = self.disk_dir / f"{key}.json"
+        try:
+            value = json.loads(path.read_text(encoding="utf-8"))
+            os.utime(path)
+            return value
+        except (OSError, ValueError):
+            with self._lock:
+                self._disk_bytes -= self._disk_sizes.pop(key, 0)
+            return None
+
+    def _write_disk(self, key, value):
+        if self.disk_dir is None:
+            return
+        path = self.disk_dir / f"{key}.json"
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            tmp_path.write_text(json.dumps(value, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        with self._lock:
+            self._disk_bytes -= self._disk_sizes.get(key, 0)
+            self._disk_sizes[key] = path.stat().st_size
+            self._disk_bytes += self._disk_sizes[key]
+            self._disk_sizes.move_to_end(key)
+            evicted = []
+            while self._disk_bytes > self.max_disk_bytes and len(self._disk_sizes) > 1:
+                old_key, size = self._disk_sizes.popitem(last=False)
+                self._disk_bytes -= size
+                evicted.append(old_key)
+            self.evictions_disk += len(evicted)
+        for old_key in evicted:
+            (self.disk_dir / f"{old_key}.json").unlink(missing_ok=True)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            keys, self._disk_sizes = list(self._disk_sizes), OrderedDict()
+            self._disk_bytes = 0
+        if self.disk_dir is not None:
+            for key in keys:
+                (self.disk_dir / f"{key}.json").unlink(missing_ok=True)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_rate": round((self.hits_memory + self.hits_disk) / lookups, 4) if lookups else None,
+                "evictions_memory": self.evictions_memory,
+                "evictions_disk": self.evictions_disk,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "disk_entries": len(self._disk_sizes),
+                "disk_bytes": self._disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes if self.disk_dir is not None else None,
+                "disk_dir": str(self.disk_dir) if self.disk_dir is not None else None,
+            }
@@ -0,0 +1,349 @@
+import argparse
+import asyncio
+import functools
+import json
+import math
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request, Response
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = int(os.environ.get("MOCK_TARGET_PORT", "8099"))
+# Worker processes read the full configuration from this variable.
+CONFIG_ENV = "MOCK_TARGET_CONFIG"
+CONTROL_PREFIX = "/_mock"
+DISTRIBUTIONS = ("constant", "uniform", "normal", "lognormal", "exponential", "pareto")
+MAX_PAYLOAD_BYTES = 16 * 1024 * 1024
+PAYLOAD_CACHE_ENTRIES = 64
+
+
+class Profile:
+    """How the target answers one route: latency distribution, injected errors and body size.
+
+    ``latency_ms`` is the mean for constant/uniform/normal/exponential, the
+    median for lognormal (spread ``sigma``) and the minimum for pareto
+    (tail index ``alpha``). Once the step regression starts, latency is
+    multiplied by ``regress_factor`` plus ``regress_add_ms`` and, if set,
+    the error rate becomes ``regress_error_rate``.
+    """
+
+    __slots__ = (
+        "distribution", "latency_ms", "jitter_ms", "sigma", "alpha", "error_rate", "error_status", "payload_bytes",
+        "regress_after_s", "regress_after_requests", "regress_factor", "regress_add_ms", "regress_error_rate",
+    )
+
+    def __init__(self, distribution="constant", latency_ms=50.0, jitter_ms=10.0, sigma=0.5, alpha=3.0,
+                 error_rate=0.0, error_status=500, payload_bytes=256, regress_after_s=None,
+                 regress_after_requests=None, regress_factor=1.0, regress_add_ms=0.0, regress_error_rate=None):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution '{distribution}'. Choose one of: {', '.join(DISTRIBUTIONS)}")
+        self.distribution = distribution
+        self.latency_ms = float(latency_ms)
+        self.jitter_ms = float(jitter_ms)
+        self.sigma = float(sigma)
+        self.alpha = float(alpha)
+        self.error_rate = float(error_rate)
+        self.error_status = int(error_status)
+        self.payload_bytes = int(payload_bytes)
+        self.regress_after_s = None if regress_after_s is None else float(regress_after_s)
+        self.regress_after_requests = None if regress_after_requests is None else int(regress_after_requests)
+        self.regress_factor = float(regress_factor)
+        self.regress_add_ms = float(regress_add_ms)
+        self.regress_error_rate = None if regress_error_rate is None else float(regress_error_rate)
+        if self.latency_ms < 0 or self.jitter_ms < 0 or self.sigma < 0 or self.alpha <= 0:
+            raise ValueError("Latency parameters must be non-negative (alpha positive)")
+        for rate in (self.error_rate, self.regress_error_rate):
+            if rate is not None and not 0.0 <= rate <= 1.0:
+                raise ValueError("Error rates are fractions between 0 and 1")
+        if not 0 <= self.payload_bytes <= MAX_PAYLOAD_BYTES:
+            raise ValueError(f"payload_bytes must be between 0 and {MAX_PAYLOAD_BYTES}")
+
+    def draw_latency_ms(self, rng, base=None):
+        base = self.latency_ms if base is None else base
+        if self.distribution == "uniform":
+            value = rng.uniform(base - self.jitter_ms, base + self.jitter_ms)
+        elif self.distribution == "normal":
+            value = rng.gauss(base, self.jitter_ms)
+        elif self.distribution == "lognormal":
+            value = base * math.exp(rng.gauss(0.0, self.sigma))
+        elif self.distribution == "exponential":
+            value = rng.expovariate(1.0 / base) if base > 0 else 0.0
+        elif self.distribution == "pareto":
+            value = base * rng.paretovariate(self.alpha)
+        else:
+            value = base
+        return max(0.0, value)
+
+    def has_regression(self):
+        return self.regress_after_s is not None or self.regress_after_requests is not None
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def updated(self, **changes):
+        unknown = set(changes) - set(self.__slots__)
+        if unknown:
+            raise ValueError(f"Unknown profile keys: {', '.join(sorted(unknown))}")
+        return Profile(**{**self.to_dict(), **changes})
+
+
+class MockTarget:
+    """Routing, regression schedule and counters shared by all requests of one server process.
+
+    Routes are matched by longest path prefix, falling back to the default
+    profile. The step regression of a profile starts ``regress_after_s``
+    seconds after ``started_at`` or after ``regress_after_requests`` requests
+    to that route; the control API can also force it on or off.
+    """
+
+    def __init__(self, default=None, routes=None, started_at=None, seed=None):
+        self.default = default or Profile()
+        self.routes = dict(routes or {})
+        self.started_at = time.time() if started_at is None else started_at
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.regression_forced = None
+        self.requests = 0
+        self.errors = 0
+        self.regressed_requests = 0
+        self.route_requests = {}
+        self.in_flight = 0
+        self.in_flight_max = 0
+        self._prefixes = []
+        self._index_routes()
+
+    @classmethod
+    def from_config(cls, config):
+        unknown = set(config) - {"default", "routes", "started_at", "seed"}
+        if unknown:
+            raise ValueError(f"Unknown mock target config keys: {', '.join(sorted(unknown))}")
+        routes = {}
+        for prefix, spec in (config.get("routes") or {}).items():
+            if not prefix.startswith("/"):
+                raise ValueError(f"Route prefix '{prefix}' must start with '/'")
+            routes[prefix] = Profile(**spec)
+        return cls(Profile(**(config.get("default") or {})), routes, config.get("started_at"), config.get("seed"))
+
+    def to_config(self):
+        return {
+            "default": self.default.to_dict(),
+            "routes": {prefix: profile.to_dict() for prefix, profile in self.routes.items()},
+            "started_at": self.started_at,
+            "seed": self.seed,
+        }
+
+    def _index_routes(self):
+        self._prefixes = sorted(self.routes, key=len, reverse=True)
+
+    def profile_for(self, path):
+        for prefix in self._prefixes:
+            if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                return prefix, self.routes[prefix]
+        return None, self.default
+
+    def update(self, prefix=None, **changes):
+        if prefix is None:
+            self.default = self.default.updated(**changes)
+        else:
+            self.routes[prefix] = self.routes.get(prefix, self.default).updated(**changes)
+            self._index_routes()
+
+    def is_regressed(self, profile, route_count, now):
+        if self.regression_forced is not None:
+            return self.regression_forced
+        if profile.regress_after_s is not None and now - self.started_at >= profile.regress_after_s:
+            return True
+        return profile.regress_after_requests is not None and route_count > profile.regress_after_requests
+
+    def plan(self, path, query=None):
+        """``(delay_seconds, status, payload_bytes, regressed)`` for one request.
+
+        ``latency_ms``, ``status`` and ``bytes`` query parameters override the
+        profile for that request, as does httpbin's ``/delay/<seconds>``.
+        """
+        query = query or {}
+        prefix, profile = self.profile_for(path)
+        self.requests += 1
+        route_count = self.route_requests[prefix] = self.route_requests.get(prefix, 0) + 1
+        regressed = self.is_regressed(profile, route_count, time.time())
+
+        base = None
+        if "latency_ms" in query:
+            base = float(query["latency_ms"])
+        elif path.startswith("/delay/"):
+            base = float(path.rsplit("/", 1)[1]) * 1000
+        latency = profile.draw_latency_ms(self.rng, base)
+        error_rate = profile.error_rate
+        if regressed:
+            self.regressed_requests += 1
+            latency = latency * profile.regress_factor + profile.regress_add_ms
+            if profile.regress_error_rate is not None:
+                error_rate = profile.regress_error_rate
+
+        if "status" in query:
+            status = int(query["status"])
+        elif error_rate and self.rng.random() < error_rate:
+            status = profile.error_status
+        else:
+            status = 200
+        if status >= 400:
+            self.errors += 1
+        size = min(int(query.get("bytes", profile.payload_bytes)), MAX_PAYLOAD_BYTES)
+        return latency / 1000.0, status, size, regressed
+
+    def request_started(self):
+        self.in_flight += 1
+        self.in_flight_max = max(self.in_flight_max, self.in_flight)
+
+    def request_finished(self):
+        self.in_flight -= 1
+
+    def stats(self):
+        return {
+            "pid": os.getpid(),
+            "uptime_s": round(time.time() - self.started_at, 3),
+            "requests": self.requests,
+            "errors": self.errors,
+            "regressed_requests": self.regressed_requests,
+            "regression_forced": self.regression_forced,
+            "in_flight": self.in_flight,
+            "in_flight_max": self.in_flight_max,
+        }
+
+
+@functools.lru_cache(maxsize=PAYLOAD_CACHE_ENTRIES)
+def payload(size):
+    return b"x" * size
+
+
+def load_config(path):
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def create_app(target=None):
+    """FastAPI app answering every path from ``target`` (built from ``MOCK_TARGET_CONFIG`` if omitted)."""
+    if target is None:
+        target = MockTarget.from_config(json.loads(os.environ.get(CONFIG_ENV) or "{}"))
+    app = FastAPI(title="perf mock target", docs_url=None, redoc_url=None, openapi_url=None)
+    app.state.target = target
+
+    @app.get(f"{CONTROL_PREFIX}/health")
+    async def health():
+        return {"status": "ok", **target.stats()}
+
+    @app.get(f"{CONTROL_PREFIX}/config")
+    async def get_config():
+        return target.to_config()
+
+    @app.post(f"{CONTROL_PREFIX}/config")
+    async def update_config(request: Request):
+        changes = await request.json()
+        if not isinstance(changes, dict):
+            raise HTTPException(400, "Expected a JSON object of profile fields")
+        prefix = changes.pop("route", None)
+        try:
+            target.update(prefix, **changes)
+        except (TypeError, ValueError) as e:
+            raise HTTPException(400, str(e))
+        return target.to_config()
+
+    @app.post(f"{CONTROL_PREFIX}/regression")
+    async def force_regression(request: Request):
+        # {"active": true} forces the regression on, false off, null back to the schedule.
+        body = await request.body()
+        try:
+            settings = json.loads(body) if body else {}
+        except ValueError:
+            settings = None
+        if not isinstance(settings, dict):
+            raise HTTPException(400, 'Expected a JSON object such as {"active": true}')
+        active = settings.get("active", True)
+        target.regression_forced = None if active is None else bool(active)
+        return target.stats()
+
+    @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"])
+    async def serve(path: str, request: Request):
+        try:
+            delay, status, size, regressed = target.plan(f"/{path}", request.query_params)
+        except ValueError as e:
+            raise HTTPException(400, f"Bad override: {e}")
+        target.request_started()
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+        finally:
+            target.request_finished()
+        return Response(
+            content=payload(size), status_code=status, media_type="application/octet-stream",
+            headers={"X-Mock-Regressed": "1" if regressed else "0"},
+        )
+
+    return app
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Local mock target for load-testing the load-testing tooling")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on (default: MOCK_TARGET_PORT or 8099)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Server processes; request-count regressions and control calls are per process")
+    parser.add_argument("--config", help="JSON file with a 'default' profile and per-prefix 'routes' profiles")
+    parser.add_argument("--seed", type=int, help="Seed the latency and error draws for repeatable runs")
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS)
+    parser.add_argument("--latency-ms", type=float)
+    parser.add_argument("--jitter-ms", type=float, help="Spread of the uniform and normal distributions")
+    parser.add_argument("--sigma", type=float, help="Log-space standard deviation of the lognormal distribution")
+    parser.add_argument("--alpha", type=float, help="Tail index of the pareto distribution (lower = heavier tail)")
+    parser.add_argument("--error-rate", type=float, help="Fraction of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int)
+    parser.add_argument("--payload-bytes", type=int)
+    parser.add_argument("--regress-after-s", type=float, help="Start the step regression this many seconds after startup")
+    parser.add_argument("--regress-after-requests", type=int, help="Start the step regression after this many requests")
+    parser.add_argument("--regress-factor", type=float, help="Latency multiplier once regressed")
+    parser.add_argument("--regress-add-ms", type=float, help="Latency added once regressed")
+    parser.add_argument("--regress-error-rate", type=float, help="Error rate once regressed")
+    return parser
+
+
+def config_from_args(args):
+    config = load_config(args.config) if args.config else {}
+    default = dict(config.get("default") or {})
+    for name in Profile.__slots__:
+        value = getattr(args, name, None)
+        if value is not None:
+            default[name] = value
+    config["default"] = default
+    if args.seed is not None:
+        config["seed"] = args.seed
+    # Shared by every worker so time-based regressions start together.
+    config["started_at"] = time.time()
+    return config
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    config = config_from_args(args)
+    try:
+        target = MockTarget.from_config(config)
+    except (TypeError, ValueError) as e:
+        print(f"Invalid mock target configuration: {e}", file=sys.stderr)
+        sys.exit(2)
+    print(f"Mock target on http://{args.host}:{args.port} ({args.workers} worker(s)); "
+          f"default profile: {json.dumps(target.default.to_dict())}", flush=True)
+    options = {"host": args.host, "port": args.port, "access_log": False, "log_level": "warning", "backlog": 4096}
+    if args.workers > 1:
+        os.environ[CONFIG_ENV] = json.dumps(config)
+        uvicorn.run("mock_target.server:create_app", factory=True, workers=args.workers, **options)
+    else:
+        uvicorn.run(create_app(target), **options)
+
+
+if __name__ == "__main__":
+    main()
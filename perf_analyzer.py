@@ -0,0 +1,329 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Everything heavier than the standard library is imported inside the command
+# that needs it, so `list` never loads the analyzer and nothing loads Streamlit.
+REPO_ROOT = Path(__file__).resolve().parent
+RUNS_DIR = REPO_ROOT / "data" / "runs"
+LOCUSTFILE = REPO_ROOT / "locust_tests" / "test_scenario.py"
+
+EXIT_OK = 0
+EXIT_REGRESSION = 1
+EXIT_ERROR = 2
+
+
+def load_analysis():
+    sys.path.insert(0, str(REPO_ROOT / "mcp_server"))
+    import analysis
+    return analysis
+
+
+def resolve_run(ref):
+    """A run file path, a catalog run id, ``latest`` or ``tag:NAME`` (newest run carrying that tag)."""
+    from utils.run_schema import is_run_file
+    path = Path(ref)
+    if is_run_file(path) or path.exists():
+        if not path.exists():
+            raise ValueError(f"Run file '{ref}' does not exist")
+        return path
+    from utils.run_catalog import RunCatalog
+    catalog = RunCatalog()
+    if ref == "latest" or ref.startswith("tag:"):
+        rows = catalog.query(tag=ref[4:] if ref.startswith("tag:") else None, limit=1)
+        if not rows:
+            raise ValueError(f"No run in the catalog matches '{ref}'")
+        return Path(rows[0]["path"])
+    run = catalog.get(ref)
+    if run is None:
+        raise ValueError(f"Run '{ref}' is neither a file nor in the run catalog")
+    return Path(run["path"])
+
+
+def compare_runs(baseline_ref, test_refs, warmup_seconds=None, mode="auto"):
+    """Diff every test run against one baseline; the baseline file is read once."""
+    analysis = load_analysis()
+    baseline_path = resolve_run(baseline_ref)
+    baseline = analysis.load_report(baseline_path)
+    results = []
+    for ref in test_refs:
+        entry = {"baseline": str(baseline_path), "test": ref}
+        try:
+            test_path = resolve_run(ref)
+            entry["test"] = str(test_path)
+            # build_analysis consumes the private keys it reads, so each comparison gets its own copy.
+            result = analysis.build_analysis(dict(baseline), analysis.load_report(test_path), warmup_seconds, mode)
+        except (OSError, ValueError) as e:
+            entry["error"] = str(e)
+        else:
+            entry.update(result)
+            entry["regression"] = analysis.is_regression(result["conclusion"])
+        results.append(entry)
+    return results
+
+
+def print_comparisons(results, as_json, verbose):
+    if as_json:
+        print(json.dumps(results, indent=2, default=str))
+        return
+    for entry in results:
+        name = Path(entry["test"]).name
+        if "error" in entry:
+            print(f"ERROR {name}: {entry['error']}")
+            continue
+        print(f"{'FAIL' if entry['regression'] else 'PASS'} {name}: {entry['conclusion']}")
+        if verbose or entry["regression"]:
+            for line in entry["analysis"].split("\n\n")[0].splitlines():
+                print(f"    {line}")
+
+
+def exit_code(results):
+    if any("error" in entry for entry in results):
+        return EXIT_ERROR
+    return EXIT_REGRESSION if any(entry["regression"] for entry in results) else EXIT_OK
+
+
+def cmd_compare(args):
+    results = compare_runs(args.baseline, args.tests, args.warmup_seconds, args.mode)
+    print_comparisons(results, args.json, verbose=True)
+    return EXIT_ERROR if any("error" in entry for entry in results) else EXIT_OK
+
+
+def cmd_gate(args):
+    results = compare_runs(args.baseline, args.tests, args.warmup_seconds, args.mode)
+    print_comparisons(results, args.json, args.verbose)
+    return exit_code(results)
+
+
+def cmd_matrix(args):
+    """Diff one test run against several baselines; exits 1 if it regressed against any of them."""
+    analysis = load_analysis()
+    test_path = resolve_run(args.test)
+    baseline_paths = list(dict.fromkeys(resolve_run(ref) for ref in args.baselines))
+    matrix = analysis.build_matrix(
+        analysis.load_report(test_path), [analysis.load_report(path) for path in baseline_paths],
+        args.warmup_seconds, args.metrics.split(",") if args.metrics else None, args.mode,
+    )
+    regressed = [analysis.is_regression(verdict) for verdict in matrix["verdicts"]]
+    if args.json:
+        print(json.dumps({"test_report": str(test_path), "baseline_reports": [str(p) for p in baseline_paths], **matrix}, indent=2))
+    else:
+        rows = zip(baseline_paths, matrix["verdicts"], matrix["change_percent"], matrix["statistics"], regressed)
+        for path, verdict, changes, statistics, failed in rows:
+            print(f"{'FAIL' if failed else 'PASS'} {Path(path).name}: {verdict}")
+            moved = [f"{key} {change:+.2f}%" for key, change in zip(matrix["metrics"], changes) if change]
+            if moved:
+                print(f"    {', '.join(moved)}")
+            if statistics is not None:
+                print(f"    {analysis.format_statistics(statistics)}")
+            elif not verdict.startswith("⛔") and args.mode != "threshold":
+                print("    latency judged by ±20% thresholds (no comparable latency histograms)")
+        print(matrix["analysis"])
+    return EXIT_REGRESSION if any(regressed) else EXIT_OK
+
+
+def cmd_list(args):
+    from utils.run_catalog import RunCatalog
+    catalog = RunCatalog()
+    if args.import_dir:
+        catalog.import_directory(args.import_dir)
+    filters = {"endpoint": args.endpoint, "since": args.since, "until": args.until, "tag": args.tag}
+    rows = catalog.query(limit=args.limit, offset=args.offset, **filters)
+    if args.json:
+        print(json.dumps({"total": catalog.count(**filters), "runs": rows}, indent=2))
+        return EXIT_OK
+    print(f"{'run_id':<20} {'started_at':<20} {'p95 ms':>9} {'err %':>6} {'requests':>9}  endpoint / tags")
+    for row in rows:
+        p95 = "-" if row["p95_response_time"] is None else f"{row['p95_response_time']:.1f}"
+        errors = "-" if row["error_rate"] is None else f"{row['error_rate']:.2f}"
+        tags = f" [{', '.join(row['tags'])}]" if row["tags"] else ""
+        print(f"{row['run_id']:<20} {row['started_at'] or '-':<20} {p95:>9} {errors:>6} "
+              f"{row['total_requests'] or 0:>9}  {row['endpoint'] or '-'}{tags}")
+    return EXIT_OK
+
+
+def cmd_retention(args):
+    from utils.retention import RetentionManager, RetentionPolicy
+    overrides = {
+        "compress_after_days": args.compress_days, "compact_after_days": args.compact_days,
+        "rollup_after_days": args.rollup_days, "max_age_days": args.max_age_days,
+        "max_bytes": args.max_mb * 1024 * 1024 if args.max_mb is not None else None, "pin_tags": args.pin_tags,
+    }
+    policy = RetentionPolicy(**{key: value for key, value in overrides.items() if value is not None})
+    report = RetentionManager(policy, RUNS_DIR).run(dry_run=args.dry_run, max_passes=args.max_passes)
+    if args.json:
+        print(json.dumps({"policy": policy.to_dict(), **report}, indent=2))
+    else:
+        if "skipped" in report:
+            print(f"Skipped: {report['skipped']}")
+        verb = "Would have" if args.dry_run else "Have"
+        print(f"{verb} rolled up {report['rolled_up']} run(s) into {report['rollups']}, compacted {report['compacted']}, "
+              f"compressed {report['compressed']} and pruned {report['pruned']}"
+              + ("" if args.dry_run else f", freeing {report['bytes_freed'] / 1024 / 1024:.1f} MB") + ".")
+        for error in report["errors"]:
+            print(f"    {error}", file=sys.stderr)
+    return EXIT_ERROR if report["errors"] else EXIT_OK
+
+
+def locust_command(args):
+    command = [
+        sys.executable, "-u", "-m", "locust", "-f", str(LOCUSTFILE), "--headless",
+        "-u", str(args.users), "-r", str(args.spawn_rate), "-t", f"{args.duration}s", "--host", args.host,
+    ]
+    if args.workers > 1:
+        command += ["--processes", str(args.workers)]
+    return command
+
+
+def locust_env(args, run_id):
+    env = os.environ.copy()
+    env.update({
+        "PYTHONUNBUFFERED": "1",
+        "LOCUST_RUN_ID": run_id,
+        "LOCUST_ENDPOINT": args.endpoint,
+        "LOCUST_SCENARIO": args.scenario or "",
+        "LOCUST_TAGS": args.tags or "",
+        "LOCUST_LOAD_MODE": args.load_mode,
+        "LOCUST_TARGET_RPS": str(args.target_rps or ""),
+        "LOCUST_CLIENT": args.client,
+        "LOCUST_PROCESSES": str(args.workers),
+        "LOCUST_RAW_SAMPLES": "1" if args.raw_samples else "",
+    })
+    # Step settings left off the command line keep their LOCUST_* values from the environment.
+    for name, value in (("LOCUST_STEP_RPS", args.step_rps), ("LOCUST_STEP_SECONDS", args.step_seconds),
+                        ("LOCUST_MAX_RPS", args.max_rps)):
+        if value is not None:
+            env[name] = str(value)
+    return env
+
+
+def cmd_run(args):
+    run_files = []
+    for index in range(args.repeat):
+        run_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+        if args.repeat > 1:
+            run_id = f"{run_id}-{index + 1}"
+        print(f"Running load test {run_id} against {args.host}", file=sys.stderr, flush=True)
+        returncode = subprocess.call(locust_command(args), env=locust_env(args, run_id), cwd=REPO_ROOT)
+        from utils.run_schema import run_file_path
+        run_file = run_file_path(RUNS_DIR, run_id)
+        if not run_file.exists():
+            print(f"Load test {run_id} produced no run file (exit code {returncode})", file=sys.stderr)
+            return EXIT_ERROR
+        print(run_file)
+        run_files.append(str(run_file))
+    if not args.gate:
+        return EXIT_OK
+    results = compare_runs(args.gate, run_files, args.warmup_seconds, args.mode)
+    print_comparisons(results, args.json, args.verbose)
+    return exit_code(results)
+
+
+def add_comparison_options(parser):
+    parser.add_argument("--warmup-seconds", type=float, help="Seconds at the start of each run treated as warm-up")
+    parser.add_argument("--mode", choices=["auto", "statistical", "threshold"], default="auto",
+                        help="Latency verdict: significance tests, fixed ±20%% thresholds, or statistical when possible")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Headless load testing and regression analysis. Runs are given as a file path, "
+                    "a catalog run id, 'latest' or 'tag:NAME'.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run a headless Locust test, optionally gating it against a baseline")
+    run.add_argument("--host", required=True, help="Base URL of the target")
+    run.add_argument("--endpoint", default="/", help="Endpoint path when no scenario file is given")
+    run.add_argument("--scenario", help="Weighted multi-endpoint scenario file (JSON or YAML)")
+    run.add_argument("-u", "--users", type=int, default=10)
+    run.add_argument("-r", "--spawn-rate", type=float, default=5)
+    run.add_argument("-t", "--duration", type=int, default=30, help="Seconds")
+    run.add_argument("--load-mode", choices=["closed", "open", "step"], default="closed")
+    run.add_argument("--target-rps", type=float, help="Arrival rate for the open model, starting rate for the step model")
+    run.add_argument("--step-rps", type=float, help="Step model: arrival rate added at every step")
+    run.add_argument("--step-seconds", type=float, help="Step model: seconds between steps")
+    run.add_argument("--max-rps", type=float, help="Cap on the arrival rate of the open and step models")
+    run.add_argument("--client", choices=["http", "fast", "timed"], default="http",
+                     help="timed records DNS/connect/TLS/TTFB/download per request")
+    run.add_argument("--workers", type=int, default=1, help="Locust worker processes")
+    run.add_argument("--raw-samples", action="store_true")
+    run.add_argument("--tags", help="Comma-separated catalog tags")
+    run.add_argument("--repeat", type=int, default=1, help="Run the test this many times in a row")
+    run.add_argument("--gate", metavar="BASELINE", help="Exit non-zero if any new run regressed against this baseline")
+    run.add_argument("-v", "--verbose", action="store_true", help="Print the full analysis of passing runs too")
+    add_comparison_options(run)
+    run.set_defaults(func=cmd_run)
+
+    compare = commands.add_parser("compare", help="Print the analysis of one or more test runs against a baseline")
+    compare.add_argument("baseline")
+    compare.add_argument("tests", nargs="+")
+    add_comparison_options(compare)
+    compare.set_defaults(func=cmd_compare)
+
+    gate = commands.add_parser(
+        "gate", help="Exit 1 if any test run regressed against the baseline (2 on bad input), for CI",
+    )
+    gate.add_argument("baseline")
+    gate.add_argument("tests", nargs="+")
+    gate.add_argument("-v", "--verbose", action="store_true", help="Print the full analysis of passing runs too")
+    add_comparison_options(gate)
+    gate.set_defaults(func=cmd_gate)
+
+    matrix = commands.add_parser(
+        "matrix", help="Diff one test run against several baselines at once (exit 1 if it regressed against any)",
+    )
+    matrix.add_argument("test")
+    matrix.add_argument("baselines", nargs="+")
+    matrix.add_argument("--metrics", help="Comma-separated metric keys (default: every metric the runs share)")
+    add_comparison_options(matrix)
+    matrix.set_defaults(func=cmd_matrix)
+
+    listing = commands.add_parser("list", help="List runs from the run catalog, newest first")
+    listing.add_argument("--endpoint")
+    listing.add_argument("--tag")
+    listing.add_argument("--since", help="ISO date/time lower bound")
+    listing.add_argument("--until", help="ISO date/time upper bound")
+    listing.add_argument("--limit", type=int, default=20)
+    listing.add_argument("--offset", type=int, default=0)
+    listing.add_argument("--import-dir", type=Path, help="Index run files from this directory first")
+    listing.add_argument("--json", action="store_true")
+    listing.set_defaults(func=cmd_list)
+
+    retention = commands.add_parser(
+        "retention", help="Compress, compact, roll up and prune old runs; defaults come from PERF_RETENTION_*",
+    )
+    retention.add_argument("--dry-run", action="store_true", help="Report what would be done (one batch) without changing anything")
+    retention.add_argument("--compress-days", type=float, help="Compress runs older than this (0 = never)")
+    retention.add_argument("--compact-days", type=float, help="Downsample windows and fold raw samples of runs older than this")
+    retention.add_argument("--rollup-days", type=float, help="Merge runs older than this into one rollup per day")
+    retention.add_argument("--max-age-days", type=float, help="Delete runs older than this")
+    retention.add_argument("--max-mb", type=float, help="Delete the oldest runs while the store is larger than this")
+    retention.add_argument("--pin-tags", help="Comma-separated tags whose runs are never compacted or deleted ('*' = any tag)")
+    retention.add_argument("--max-passes", type=int, help="Stop after this many bounded passes")
+    retention.add_argument("--json", action="store_true")
+    retention.set_defaults(func=cmd_retention)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "run" and args.load_mode != "closed" and not args.target_rps:
+        # Locust would fail at import and leave only "produced no run file".
+        parser.error(f"--load-mode {args.load_mode} needs --target-rps")
+    try:
+        return args.func(args)
+    except (OSError, ValueError, RuntimeError) as e:
+        # RuntimeError: an optional dependency (msgpack, zstandard, NumPy) is missing.
+        print(f"{parser.prog}: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    sys.exit(main())
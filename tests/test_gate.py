@@ -0,0 +1,44 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import perf_analyzer
+
+
+def write_run(directory, run_id, error_rate):
+    path = directory / f"{run_id}.json"
+    path.write_text(json.dumps({
+        "run_id": run_id,
+        "timestamp": "2026-01-01T00:00:00",
+        "endpoint": "/api",
+        "total_requests": 1000,
+        "error_rate": error_rate,
+        "avg_response_time": 40.0,
+        "p95_response_time": 80.0,
+    }))
+    return str(path)
+
+
+@pytest.mark.parametrize("before, after, expected", [
+    (0.0, 60.0, perf_analyzer.EXIT_REGRESSION),
+    (0.0, 2.0, perf_analyzer.EXIT_REGRESSION),
+    (0.0, 0.3, perf_analyzer.EXIT_OK),
+    (0.1, 0.1, perf_analyzer.EXIT_OK),
+    (3.0, 2.0, perf_analyzer.EXIT_OK),
+])
+def test_gate_judges_error_rate_against_baseline(tmp_path, capsys, before, after, expected):
+    baseline = write_run(tmp_path, "baseline", before)
+    test = write_run(tmp_path, "test", after)
+    assert perf_analyzer.main(["gate", baseline, test, "--mode", "threshold"]) == expected
+    verdict = "FAIL" if expected == perf_analyzer.EXIT_REGRESSION else "PASS"
+    assert capsys.readouterr().out.startswith(verdict)
+
+
+@pytest.mark.parametrize("load_mode", ["open", "step"])
+def test_run_rejects_paced_load_without_target_rps(load_mode):
+    with pytest.raises(SystemExit) as exit_info:
+        perf_analyzer.main(["run", "--host", "http://127.0.0.1:1", "--load-mode", load_mode])
+    assert exit_info.value.code == perf_analyzer.EXIT_ERROR
@@ -0,0 +1,65 @@
+import math
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from utils.histogram import LatencyHistogram
+
+QUANTILES = (50, 90, 95, 99, 99.9)
+
+
+def latency_samples(count, seed, median_ms=40.0):
+    rng = random.Random(seed)
+    return [rng.lognormvariate(0.0, 0.8) * median_ms for _ in range(count)]
+
+
+def exact_quantile(samples, q):
+    ordered = sorted(samples)
+    return ordered[max(1, math.ceil(q / 100 * len(ordered))) - 1]
+
+
+def assert_within_relative_error(histogram, samples):
+    values = histogram.percentiles(QUANTILES)
+    for q in QUANTILES:
+        exact = exact_quantile(samples, q)
+        assert abs(values[q] - exact) <= exact * histogram.relative_error * 1.0001, q
+
+
+def test_percentiles_are_within_the_relative_error_of_exact_quantiles():
+    samples = latency_samples(20_000, seed=1)
+    histogram = LatencyHistogram.from_samples(samples)
+    assert histogram.count == len(samples)
+    assert histogram.min == min(samples) and histogram.max == max(samples)
+    assert histogram.mean == pytest.approx(sum(samples) / len(samples))
+    assert_within_relative_error(histogram, samples)
+
+
+def test_merged_histograms_match_the_exact_quantiles_of_all_samples():
+    parts = [latency_samples(5_000, seed=seed, median_ms=median) for seed, median in ((2, 20.0), (3, 40.0), (4, 400.0))]
+    merged = LatencyHistogram()
+    for part in parts:
+        merged.merge(LatencyHistogram.from_samples(part))
+    samples = [value for part in parts for value in part]
+    whole = LatencyHistogram.from_samples(samples)
+    assert merged.counts == whole.counts
+    assert merged.percentiles(QUANTILES) == whole.percentiles(QUANTILES)
+    assert_within_relative_error(merged, samples)
+
+
+def test_merge_survives_a_round_trip_through_to_dict():
+    histogram = LatencyHistogram.from_samples(latency_samples(1_000, seed=5))
+    restored = LatencyHistogram.from_dict(histogram.to_dict())
+    assert restored.counts == histogram.counts
+    assert restored.percentiles(QUANTILES) == histogram.percentiles(QUANTILES)
+
+
+def test_merge_rejects_a_different_bucket_layout():
+    with pytest.raises(ValueError):
+        LatencyHistogram().merge(LatencyHistogram(relative_error=0.02))
+
+
+def test_empty_histogram_has_no_percentiles():
+    assert LatencyHistogram().percentiles((50, 99)) == {50: None, 99: None}
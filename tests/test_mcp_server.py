@@ -0,0 +1,85 @@
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "mcp_server"))
+from claude_perf_mcp import REQUEST_CANCELLED, Dispatcher, FastMCP, PerfInsightTools, handle_request, run_blocking
+
+
+def call(request_id, name):
+    return {"jsonrpc": "2.0", "id": request_id, "method": "tools/call", "params": {"name": name}}
+
+
+def test_tools_list_advertises_each_tool_schema():
+    response = asyncio.run(handle_request(FastMCP(PerfInsightTools), {"jsonrpc": "2.0", "id": 1, "method": "tools/list"}))
+    schemas = {tool["name"]: tool["inputSchema"] for tool in response["result"]["tools"]}
+    assert "baseline_report" in schemas["analyze_performance_diff"]["properties"]
+    assert "baseline_run_ids" in schemas["analyze_performance_matrix"]["properties"]
+    assert all(schema.get("properties") for schema in schemas.values())
+
+
+def test_cancelled_request_keeps_its_slot_until_the_executor_call_ends():
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return {"slow": True}
+
+    class Tools:
+        async def call_tool(self, call_id, name, arguments):
+            return await run_blocking(slow) if name == "slow" else {"fast": True}
+
+    async def scenario():
+        written = []
+
+        async def write(message):
+            written.append(message)
+
+        limiter = asyncio.Semaphore(1)
+        dispatcher = Dispatcher(Tools(), write, limiter)
+        dispatcher.dispatch(call(1, "slow"))
+        await asyncio.to_thread(started.wait, 5)
+        dispatcher.dispatch({"jsonrpc": "2.0", "method": "$/cancelRequest", "params": {"id": 1}})
+        dispatcher.dispatch(call(2, "fast"))
+        await asyncio.sleep(0.05)
+        # The abandoned call still runs, so the next request waits for the slot.
+        assert limiter.locked() and written == []
+        release.set()
+        await dispatcher.drain()
+        return {message["id"]: message for message in written}
+
+    responses = asyncio.run(scenario())
+    assert responses[1]["error"]["code"] == REQUEST_CANCELLED
+    assert responses[2]["result"] == {"fast": True}
+
+
+def test_batch_is_answered_with_one_array_and_notifications_get_no_reply():
+    async def scenario(*batches):
+        written = []
+
+        async def write(message):
+            written.append(message)
+
+        dispatcher = Dispatcher(FastMCP(PerfInsightTools), write, asyncio.Semaphore(2))
+        for batch in batches:
+            dispatcher.dispatch(batch)
+        await dispatcher.drain()
+        return written
+
+    [reply] = asyncio.run(scenario([
+        {"jsonrpc": "2.0", "id": "a", "method": "ping"},
+        {"jsonrpc": "2.0", "id": "b", "method": "no/such/method"},
+        {"jsonrpc": "2.0", "method": "notifications/initialized"},
+    ]))
+    assert isinstance(reply, list)
+    responses = {response["id"]: response for response in reply}
+    assert set(responses) == {"a", "b"}
+    assert "result" in responses["a"] and responses["b"]["error"]["code"] == -32601
+
+    [reply] = asyncio.run(scenario([]))
+    assert reply["id"] is None and reply["error"]["code"] == -32600
+    assert asyncio.run(scenario([{"jsonrpc": "2.0", "method": "notifications/initialized"}])) == []
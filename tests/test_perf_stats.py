@@ -0,0 +1,48 @@
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from utils.histogram import LatencyHistogram
+from utils.perf_stats import compare_histograms, kolmogorov_smirnov, mann_whitney
+
+
+def lognormal_histogram(count, seed, scale=1.0):
+    rng = random.Random(seed)
+    return LatencyHistogram.from_samples(rng.lognormvariate(0.0, 0.5) * 40.0 * scale for _ in range(count))
+
+
+def test_same_distribution_is_not_significant():
+    result = compare_histograms(lognormal_histogram(5_000, 1), lognormal_histogram(5_000, 2))
+    assert not result["significant"]
+    assert result["effect_size"] == "negligible"
+    assert result["status"] == "🟢 Stable: No significant difference"
+    p95 = result["p95_change"]
+    assert p95["ci_low"] < 0 < p95["ci_high"]
+
+
+def test_slower_distribution_is_a_significant_regression():
+    result = compare_histograms(lognormal_histogram(5_000, 1), lognormal_histogram(5_000, 2, scale=1.3))
+    assert result["significant"] and result["cliffs_delta"] > 0
+    assert result["status"].startswith("⚠️ Warning: Statistically significant latency regression")
+    # The p95 of a lognormal scales with it: the CI must cover the true +30%.
+    assert result["p95_change"]["ci_low"] < 30 < result["p95_change"]["ci_high"]
+
+
+def test_faster_distribution_is_a_significant_improvement():
+    result = compare_histograms(lognormal_histogram(5_000, 1), lognormal_histogram(5_000, 2, scale=0.7))
+    assert result["significant"] and result["cliffs_delta"] < 0
+    assert result["status"].startswith("✅ Stable: Statistically significant improvement")
+
+
+def test_fully_separated_samples_have_extreme_statistics():
+    before = LatencyHistogram.from_samples([10, 11, 12, 13, 14] * 20)
+    after = LatencyHistogram.from_samples([50, 51, 52, 53, 54] * 20)
+    _, _, p_value, delta = mann_whitney(before, after)
+    assert delta == 1.0 and p_value < 1e-10
+    ks_d, ks_p = kolmogorov_smirnov(before, after)
+    assert ks_d == 1.0 and ks_p < 1e-10
+
+
+def test_empty_histogram_gives_no_comparison():
+    assert compare_histograms(LatencyHistogram(), lognormal_histogram(100, 1)) is None
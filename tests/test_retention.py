@@ -0,0 +1,126 @@
+import random
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from utils.histogram import LatencyHistogram
+from utils.retention import COMPACTED, COMPRESSED, ROLLED_UP, RetentionManager, RetentionPolicy
+from utils.run_catalog import RunCatalog
+from utils.run_schema import RunRecord, read_run, run_file_path, write_run
+
+NOW = datetime(2026, 6, 1, 12, 0, 0)
+COUNTS = ("rolled_up", "rollups", "compacted", "compressed", "pruned")
+
+
+def write_record(runs_dir, run_id, age_days, tags=(), requests=1_000, seed=0):
+    rng = random.Random(seed)
+    histogram = LatencyHistogram.from_samples(rng.lognormvariate(0.0, 0.5) * 40.0 for _ in range(requests))
+    record = RunRecord(
+        run_id=run_id,
+        timestamp=(NOW - timedelta(days=age_days)).isoformat(timespec="seconds"),
+        endpoint="/api",
+        total_requests=requests,
+        error_rate=1.0,
+        latency_histogram=histogram.to_dict(),
+        avg_response_time=histogram.mean,
+        p95_response_time=histogram.percentile(95),
+        tags=list(tags),
+    )
+    write_run(run_file_path(runs_dir, run_id), record)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    runs_dir = tmp_path / "runs"
+    runs_dir.mkdir()
+    return RetentionManager(RetentionPolicy(), runs_dir, RunCatalog(tmp_path / "catalog.sqlite3"))
+
+
+def stages(manager):
+    with sqlite3.connect(manager.catalog.db_path) as db:
+        return dict(db.execute("SELECT run_id, stage FROM run_retention"))
+
+
+def counts(report):
+    return {key: report[key] for key in COUNTS}
+
+
+def test_pass_applies_each_stage_and_dry_run_predicts_it(manager):
+    for run_id, age, tags in (("old-1", 100, ()), ("old-2", 100, ()), ("pinned", 100, ("baseline",)),
+                              ("month", 40, ()), ("recent", 1, ())):
+        write_record(manager.runs_dir, run_id, age, tags, seed=len(run_id) + age)
+
+    predicted = manager.run_pass(dry_run=True, now=NOW)
+    assert stages(manager) == {}
+    report = manager.run_pass(now=NOW)
+    assert counts(report) == counts(predicted) == {
+        "rolled_up": 2, "rollups": 1, "compacted": 1, "compressed": 1, "pruned": 0,
+    }
+    assert report["done"] and report["bytes_freed"] > 0
+
+    recorded = stages(manager)
+    rollup_id = next(run_id for run_id, stage in recorded.items() if stage == ROLLED_UP)
+    assert recorded["month"] == COMPACTED and recorded["pinned"] == COMPRESSED
+    assert "recent" not in recorded
+    assert manager.catalog.get("old-1") is None and manager.catalog.get("old-2") is None
+    assert manager.catalog.get("pinned")["path"].endswith(".json.gz")
+
+    rollup = read_run(manager.catalog.get(rollup_id)["path"])
+    assert rollup.total_requests == 2_000 and rollup.rollup["run_ids"] == ["old-1", "old-2"]
+    assert LatencyHistogram.from_dict(rollup.latency_histogram).count == 2_000
+
+    assert counts(manager.run_pass(now=NOW)) == dict.fromkeys(COUNTS, 0)
+
+
+def test_rollup_rerun_after_an_interrupted_pass_counts_each_run_once(manager):
+    for index in range(3):
+        write_record(manager.runs_dir, f"old-{index}", 100, seed=index)
+    delete = manager._delete
+    deleted = []
+
+    def interrupted_delete(row, record=None):
+        if deleted:
+            raise KeyboardInterrupt
+        deleted.append(row["run_id"])
+        return delete(row, record)
+
+    manager._delete = interrupted_delete
+    with pytest.raises(KeyboardInterrupt):
+        manager.run_pass(now=NOW)
+    manager._delete = delete
+    assert not manager.lock_path.exists()
+
+    report = manager.run_pass(now=NOW)
+    assert report["rolled_up"] == 2
+    runs = manager.catalog.query()
+    assert len(runs) == 1
+    rollup = read_run(runs[0]["path"])
+    assert rollup.total_requests == 3_000
+    assert rollup.rollup["runs"] == 3 and rollup.rollup["run_ids"] == ["old-0", "old-1", "old-2"]
+    assert LatencyHistogram.from_dict(rollup.latency_histogram).count == 3_000
+
+
+def test_late_runs_are_merged_into_the_existing_rollup(manager):
+    write_record(manager.runs_dir, "old-0", 100, seed=0)
+    manager.run_pass(now=NOW)
+    write_record(manager.runs_dir, "old-1", 100, seed=1)
+    manager.run_pass(now=NOW)
+    runs = manager.catalog.query()
+    assert len(runs) == 1
+    rollup = read_run(runs[0]["path"])
+    assert rollup.total_requests == 2_000 and rollup.rollup["run_ids"] == ["old-0", "old-1"]
+
+
+def test_size_budget_prunes_oldest_unpinned_runs_first(manager):
+    for index, age in enumerate((50, 20, 3)):
+        write_record(manager.runs_dir, f"run-{index}", age, seed=index)
+    write_record(manager.runs_dir, "pinned", 60, ("pinned",), seed=9)
+    manager.policy = RetentionPolicy(compress_after_days=0, compact_after_days=0, rollup_after_days=0, max_bytes=1)
+    predicted = manager.run_pass(dry_run=True, now=NOW)
+    report = manager.run_pass(now=NOW)
+    assert report["pruned"] == predicted["pruned"] == 3
+    assert [row["run_id"] for row in manager.catalog.query()] == ["pinned"]
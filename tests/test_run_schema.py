@@ -0,0 +1,76 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from utils.run_schema import (
+    JSON, JSON_GZ, MSGPACK, MSGPACK_ZSTD, SCHEMA_VERSION, RunRecord, migrate, read_run, read_run_dict,
+    run_file_path, write_run,
+)
+
+# What utils/run_logger.py wrote before the schema existed.
+RUN_LOGGER_V1 = {
+    "timestamp": "20250101-120000",
+    "avg_latency_ms": 41.5,
+    "p95_latency_ms": 88.0,
+    "errors": 5,
+    "total_requests": 200,
+}
+FORMAT_PACKAGES = {MSGPACK: ("msgpack",), MSGPACK_ZSTD: ("msgpack", "zstandard")}
+
+
+def test_version_1_fields_are_renamed_and_derived():
+    data = migrate(RUN_LOGGER_V1, run_id="20250101-120000")
+    assert data["avg_response_time"] == 41.5 and data["p95_response_time"] == 88.0
+    assert data["error_rate"] == 2.5
+    assert "avg_latency_ms" not in data and "errors" not in data
+    assert data["run_id"] == "20250101-120000" and data["schema_version"] == SCHEMA_VERSION
+    assert RUN_LOGGER_V1["errors"] == 5, "migrate must not change its input"
+
+
+def test_migration_keeps_an_explicit_error_rate_and_partial_dicts():
+    assert migrate({"errors": 5, "total_requests": 200, "error_rate": 1.0})["error_rate"] == 1.0
+    assert migrate({"avg_latency_ms": 10})["avg_response_time"] == 10
+
+
+def test_newer_schema_version_is_refused():
+    with pytest.raises(ValueError):
+        migrate({"run_id": "x", "schema_version": SCHEMA_VERSION + 1})
+    with pytest.raises(ValueError):
+        migrate(["not", "a", "run"])
+
+
+def test_old_file_is_migrated_on_read_with_its_run_id_from_the_file_name(tmp_path):
+    path = tmp_path / "run_20250101-120000.json"
+    path.write_text(json.dumps(RUN_LOGGER_V1))
+    record = read_run(path)
+    assert record.run_id == "20250101-120000"
+    assert record.p95_response_time == 88.0 and record.error_rate == 2.5
+
+
+@pytest.mark.parametrize("fmt", [JSON, JSON_GZ, MSGPACK, MSGPACK_ZSTD])
+def test_every_format_round_trips_unknown_keys(tmp_path, fmt):
+    for package in FORMAT_PACKAGES.get(fmt, ()):
+        pytest.importorskip(package)
+    data = {
+        "run_id": "r1", "total_requests": 10, "p95_response_time": 12.5, "tags": ["nightly"],
+        "endpoints": {"home": {"path": "/", "total_requests": 10, "error_rate": 0.0}},
+        "added_by_a_newer_version": {"nested": [1, 2]},
+    }
+    path = run_file_path(tmp_path, "r1", fmt)
+    write_run(path, RunRecord.from_dict(data))
+    restored = read_run_dict(path)
+    assert restored["added_by_a_newer_version"] == {"nested": [1, 2]}
+    assert restored["endpoints"]["home"]["path"] == "/"
+    assert restored["p95_response_time"] == 12.5 and restored["tags"] == ["nightly"]
+    # Fields left unset are not written out.
+    assert "generator" not in restored
+
+
+def test_unknown_suffix_is_refused(tmp_path):
+    with pytest.raises(ValueError):
+        write_run(tmp_path / "run_x.txt", RunRecord(run_id="x"))
+    with pytest.raises(ValueError):
+        run_file_path(tmp_path, "x", "yaml")
@@ -0,0 +1,50 @@
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from utils.trend import SeriesState
+
+
+def feed(values):
+    state = SeriesState()
+    for index, value in enumerate(values):
+        state.add(index + 1, f"run-{index}", f"2026-01-01T00:{index // 60:02d}:{index % 60:02d}", value)
+    return state
+
+
+def noisy_level(rng, count, level, noise=2.0):
+    return [rng.gauss(level, noise) for _ in range(count)]
+
+
+def test_level_shift_is_found_near_where_it_was_injected():
+    rng = random.Random(1)
+    state = feed(noisy_level(rng, 80, 100.0) + noisy_level(rng, 80, 130.0))
+    assert len(state.change_points) == 1
+    change = state.change_points[0]
+    # CUSUM dates the change from where its sum started growing, which can be a few runs early.
+    assert 70 <= change["index"] <= 83
+    assert change["direction"] == "up"
+    assert 25 < change["shift_percent"] < 35
+
+
+def test_downward_shift_is_found_too():
+    rng = random.Random(2)
+    state = feed(noisy_level(rng, 80, 100.0) + noisy_level(rng, 80, 70.0))
+    assert [change["direction"] for change in state.change_points] == ["down"]
+    assert 70 <= state.change_points[0]["index"] <= 83
+
+
+def test_flat_series_has_no_change_point():
+    state = feed(noisy_level(random.Random(3), 300, 100.0))
+    assert state.change_points == []
+
+
+def test_single_spike_is_an_anomaly_not_a_change_point():
+    values = noisy_level(random.Random(4), 100, 100.0)
+    values[60] = 400.0
+    state = feed(values)
+    assert state.change_points == []
+    assert 60 in state.anomalies
+    # The outlier is kept out of the rolling baseline.
+    assert abs(state.baseline[61] - 100.0) < 5
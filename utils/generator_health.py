@@ -0,0 +1,111 @@
+import time
+
+from utils.histogram import LatencyHistogram
+
+SAMPLE_INTERVAL = 1.0
+# A sample counts as saturated when the process is this busy or the event loop this late.
+CPU_SATURATION_PERCENT = 90.0
+LAG_SATURATION_MS = 50.0
+# A process counts as saturated when this share of its samples were.
+SATURATED_FRACTION = 0.1
+
+
+class GeneratorHealth:
+    """Cumulative load-generator health for one Locust process.
+
+    ``sample`` is called from a greenlet that sleeps ``interval`` seconds:
+    how late it wakes up is the event-loop lag, and process CPU time over
+    wall time is the generator's CPU use (100% = one core, the most a
+    single gevent process can use).
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.in_flight = 0
+        self.in_flight_max = 0
+        self.samples = 0
+        self.saturated_samples = 0
+        self.cpu_total = 0.0
+        self.cpu_max = 0.0
+        self.lag = LatencyHistogram()
+        self._last_wall = None
+        self._last_cpu = None
+
+    def request_started(self):
+        self.in_flight += 1
+        if self.in_flight > self.in_flight_max:
+            self.in_flight_max = self.in_flight
+
+    def request_finished(self):
+        self.in_flight -= 1
+
+    def start(self):
+        self._last_wall = time.monotonic()
+        self._last_cpu = time.process_time()
+
+    def sample(self):
+        wall, cpu = time.monotonic(), time.process_time()
+        if self._last_wall is None:
+            self._last_wall, self._last_cpu = wall, cpu
+            return None
+        elapsed = wall - self._last_wall
+        if elapsed <= 0:
+            return None
+        cpu_percent = (cpu - self._last_cpu) / elapsed * 100
+        lag_ms = max(0.0, (elapsed - self.interval) * 1000)
+        self._last_wall, self._last_cpu = wall, cpu
+        self.samples += 1
+        self.cpu_total += cpu_percent
+        self.cpu_max = max(self.cpu_max, cpu_percent)
+        self.lag.record(lag_ms)
+        if cpu_percent >= CPU_SATURATION_PERCENT or lag_ms >= LAG_SATURATION_MS:
+            self.saturated_samples += 1
+        return {"cpu_percent": round(cpu_percent, 1), "lag_ms": round(lag_ms, 2), "in_flight": self.in_flight}
+
+    def to_dict(self):
+        return {
+            "samples": self.samples,
+            "saturated_samples": self.saturated_samples,
+            "cpu_total": self.cpu_total,
+            "cpu_max": self.cpu_max,
+            "in_flight_max": self.in_flight_max,
+            "lag_histogram": self.lag.to_dict(),
+        }
+
+
+def summarize_health(processes):
+    """Combine per-process ``GeneratorHealth.to_dict()`` payloads into the run file's ``generator`` block."""
+    processes = [p for p in processes if p and p.get("samples")]
+    if not processes:
+        return None
+    lag = LatencyHistogram()
+    per_process = []
+    for payload in processes:
+        process_lag = LatencyHistogram.from_dict(payload["lag_histogram"])
+        lag.merge(process_lag)
+        fraction = payload["saturated_samples"] / payload["samples"]
+        per_process.append({
+            "samples": payload["samples"],
+            "cpu_percent_avg": round(payload["cpu_total"] / payload["samples"], 1),
+            "cpu_percent_max": round(payload["cpu_max"], 1),
+            "lag_ms_p95": round(process_lag.percentile(95), 2),
+            "lag_ms_max": round(process_lag.max, 2),
+            "in_flight_max": payload["in_flight_max"],
+            "saturated_fraction": round(fraction, 3),
+            "saturated": fraction >= SATURATED_FRACTION,
+        })
+    samples = sum(p["samples"] for p in processes)
+    return {
+        "processes": per_process,
+        "cpu_percent_avg": round(sum(p["cpu_total"] for p in processes) / samples, 1),
+        "cpu_percent_max": max(p["cpu_percent_max"] for p in per_process),
+        "lag_ms_p95": round(lag.percentile(95), 2),
+        "lag_ms_max": round(lag.max, 2),
+        "in_flight_max": sum(p["in_flight_max"] for p in processes),
+        "saturated": any(p["saturated"] for p in per_process),
+        "thresholds": {
+            "cpu_percent": CPU_SATURATION_PERCENT,
+            "lag_ms": LAG_SATURATION_MS,
+            "saturated_fraction": SATURATED_FRACTION,
+        },
+    }
@@ -0,0 +1,146 @@
+import math
+
+DEFAULT_PERCENTILES = (50, 90, 95, 99, 99.9)
+
+
+def percentile_key(q):
+    return "p" + f"{q:g}".replace(".", "")
+
+
+class LatencyHistogram:
+    """Log-bucketed latency recorder with bounded relative error.
+
+    Bucket ``i`` covers ``[lowest * growth**i, lowest * growth**(i + 1))`` so any
+    value reported back is within ``relative_error`` of a recorded sample,
+    regardless of how many samples were recorded.
+    """
+
+    def __init__(self, lowest=0.01, highest=3_600_000.0, relative_error=0.01):
+        self.lowest = float(lowest)
+        self.highest = float(highest)
+        self.relative_error = float(relative_error)
+        self.growth = (1 + self.relative_error) / (1 - self.relative_error)
+        self._log_growth = math.log(self.growth)
+        self.bucket_count = self._index(self.highest) + 1
+        self.counts = [0] * self.bucket_count
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        if value <= self.lowest:
+            return 0
+        return int(math.log(value / self.lowest) / self._log_growth)
+
+    def _bucket_value(self, index):
+        # lower * (1 + e) is within relative_error of both bucket edges.
+        return self.lowest * self.growth ** index * (1 + self.relative_error)
+
+    def record(self, value, count=1):
+        value = max(float(value), 0.0)
+        index = min(self._index(value), self.bucket_count - 1)
+        self.counts[index] += count
+        self.count += count
+        self.total += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def compatible_with(self, other):
+        return (
+            self.lowest == other.lowest
+            and self.highest == other.highest
+            and self.relative_error == other.relative_error
+        )
+
+    def merge(self, other):
+        if not self.compatible_with(other):
+            raise ValueError("Cannot merge histograms with different bucket layouts")
+        for index, bucket in enumerate(other.counts):
+            if bucket:
+                self.counts[index] += bucket
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        return self
+
+    def reset(self):
+        self.counts = [0] * self.bucket_count
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, q):
+        return self.percentiles([q])[q]
+
+    def percentiles(self, qs=DEFAULT_PERCENTILES):
+        """Return ``{q: value}`` for every requested percentile in one bucket scan."""
+        if not self.count:
+            return {q: None for q in qs}
+        targets = sorted((max(1, math.ceil(q / 100 * self.count)), q) for q in qs)
+        results = {}
+        seen = 0
+        pending = iter(targets)
+        rank, q = next(pending)
+        for index, bucket in enumerate(self.counts):
+            if not bucket:
+                continue
+            seen += bucket
+            while seen >= rank:
+                results[q] = min(max(self._bucket_value(index), self.min), self.max)
+                try:
+                    rank, q = next(pending)
+                except StopIteration:
+                    return results
+        for _, q in targets:
+            results.setdefault(q, self.max)
+        return results
+
+    def summary(self, qs=DEFAULT_PERCENTILES, digits=2):
+        values = self.percentiles(qs)
+        summary = {percentile_key(q): round(v, digits) if v is not None else None for q, v in values.items()}
+        summary["avg"] = round(self.mean, digits) if self.count else None
+        summary["max"] = round(self.max, digits) if self.max is not None else None
+        summary["min"] = round(self.min, digits) if self.min is not None else None
+        summary["count"] = self.count
+        return summary
+
+    def to_dict(self):
+        return {
+            "lowest": self.lowest,
+            "highest": self.highest,
+            "relative_error": self.relative_error,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "buckets": [[index, bucket] for index, bucket in enumerate(self.counts) if bucket],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        hist = cls(data["lowest"], data["highest"], data["relative_error"])
+        for index, bucket in data.get("buckets", []):
+            hist.counts[index] += bucket
+        hist.count = data.get("count", sum(hist.counts))
+        hist.total = data.get("total", 0.0)
+        hist.min = data.get("min")
+        hist.max = data.get("max")
+        return hist
+
+    @classmethod
+    def from_samples(cls, samples, **kwargs):
+        hist = cls(**kwargs)
+        for value in samples:
+            hist.record(value)
+        return hist
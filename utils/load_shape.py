@@ -0,0 +1,62 @@
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+STEP = "step"
+LOAD_MODES = (CLOSED, OPEN, STEP)
+
+
+class ArrivalSchedule:
+    """Hands out intended request start times for an open-model workload.
+
+    Arrivals are paced at ``rate`` requests/second, raised by ``step_rate``
+    every ``step_seconds`` (a step ramp) up to ``max_rate``. Slots are spaced
+    on the schedule's own clock, never on when earlier requests finished, so
+    a slow target builds a backlog instead of lowering the offered load.
+    Latency measured from the slot rather than from the actual send is then
+    free of coordinated omission.
+    """
+
+    def __init__(self, rate, step_rate=0.0, step_seconds=0.0, max_rate=None, start=None):
+        if rate <= 0:
+            raise ValueError("Arrival rate must be positive")
+        self.rate = float(rate)
+        self.step_rate = float(step_rate or 0.0)
+        self.step_seconds = float(step_seconds or 0.0)
+        self.max_rate = float(max_rate) if max_rate else None
+        self.start = time.time() if start is None else start
+        self._next = self.start
+        self.issued = 0
+        self._lock = threading.Lock()
+
+    def rate_at(self, elapsed):
+        rate = self.rate
+        if self.step_rate and self.step_seconds:
+            rate += self.step_rate * int(max(0.0, elapsed) // self.step_seconds)
+        if self.max_rate:
+            rate = min(rate, self.max_rate)
+        return rate
+
+    def next_slot(self):
+        """Claim the next intended start time (epoch seconds); it may already be in the past."""
+        with self._lock:
+            slot = self._next
+            self._next = slot + 1.0 / self.rate_at(slot - self.start)
+            self.issued += 1
+            return slot
+
+    def backlog(self, now=None):
+        """Slots whose intended start time has passed but which nobody has claimed yet."""
+        now = time.time() if now is None else now
+        with self._lock:
+            if now <= self._next:
+                return 0
+            return int((now - self._next) * self.rate_at(now - self.start)) + 1
+
+
+def parse_load_mode(value):
+    mode = (value or CLOSED).strip().lower()
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Unknown load mode '{value}'. Choose one of: {', '.join(LOAD_MODES)}")
+    return mode
@@ -0,0 +1,157 @@
+import math
+
+from utils.histogram import LatencyHistogram
+
+DEFAULT_ALPHA = 0.01
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_BOOTSTRAP_ITERATIONS = 500
+# Smallest tail-latency change worth flagging when the whole distribution barely moves.
+DEFAULT_MIN_CHANGE_PERCENT = 5.0
+# Upper bound on multinomial draws (iterations x occupied buckets) per bootstrap.
+BOOTSTRAP_BUDGET = 2_000_000
+# Cliff's delta magnitude thresholds (Romano et al., 2006).
+EFFECT_SIZES = ((0.147, "negligible"), (0.33, "small"), (0.474, "medium"), (float("inf"), "large"))
+
+
+def effect_magnitude(delta):
+    for bound, label in EFFECT_SIZES:
+        if abs(delta) < bound:
+            return label
+    return "large"
+
+
+def _aligned(before, after):
+    if not before.compatible_with(after):
+        raise ValueError("Histograms must share a bucket layout to be compared")
+    occupied = [i for i, (a, b) in enumerate(zip(before.counts, after.counts)) if a or b]
+    return occupied, [before.counts[i] for i in occupied], [after.counts[i] for i in occupied]
+
+
+def mann_whitney(before, after):
+    """Mann-Whitney U on bucketed data, with tie correction, in O(buckets).
+
+    Returns ``(u, z, p_value, cliffs_delta)``; a positive delta means ``after``
+    tends to be slower than ``before``.
+    """
+    _, a_counts, b_counts = _aligned(before, after)
+    n1, n2 = before.count, after.count
+    n = n1 + n2
+    u = 0.0
+    below = 0
+    tie_term = 0.0
+    for a, b in zip(a_counts, b_counts):
+        # Every 'after' sample beats all 'before' samples in lower buckets and ties with its own bucket.
+        u += b * (below + 0.5 * a)
+        below += a
+        t = a + b
+        tie_term += t ** 3 - t
+    mean_u = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))) if n > 1 else 0.0
+    if variance <= 0:
+        return u, 0.0, 1.0, 0.0
+    z = (u - mean_u) / math.sqrt(variance)
+    p_value = math.erfc(abs(z) / math.sqrt(2))
+    delta = 2 * u / (n1 * n2) - 1
+    return u, z, p_value, delta
+
+
+def kolmogorov_smirnov(before, after):
+    """Two-sample KS statistic over bucket edges and its asymptotic p-value."""
+    _, a_counts, b_counts = _aligned(before, after)
+    n1, n2 = before.count, after.count
+    d = 0.0
+    cum_a = cum_b = 0
+    for a, b in zip(a_counts, b_counts):
+        cum_a += a
+        cum_b += b
+        d = max(d, abs(cum_a / n1 - cum_b / n2))
+    en = math.sqrt(n1 * n2 / (n1 + n2))
+    lam = (en + 0.12 + 0.11 / en) * d
+    if lam < 1e-3:
+        return d, 1.0
+    p_value = 2 * sum((-1) ** (k - 1) * math.exp(-2 * k * k * lam * lam) for k in range(1, 101))
+    return d, min(max(p_value, 0.0), 1.0)
+
+
+def bootstrap_percentile_change(before, after, q=95, iterations=DEFAULT_BOOTSTRAP_ITERATIONS,
+                                confidence=DEFAULT_CONFIDENCE, seed=0):
+    """Bootstrap CI of the relative change (%) of the q-th percentile.
+
+    Resamples bucket counts with a multinomial draw, so the cost depends on the
+    number of occupied buckets rather than on the number of recorded requests.
+    Returns None when NumPy is unavailable.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+    occupied, a_counts, b_counts = _aligned(before, after)
+    values = np.array([before._bucket_value(i) for i in occupied])
+    iterations = max(20, min(iterations, BOOTSTRAP_BUDGET // max(1, len(occupied))))
+    rng = np.random.default_rng(seed)
+
+    def resampled_percentiles(counts, n):
+        counts = np.asarray(counts, dtype=float)
+        draws = rng.multinomial(n, counts / counts.sum(), size=iterations)
+        cumulative = np.cumsum(draws, axis=1)
+        rank = max(1, math.ceil(q / 100 * n))
+        return values[np.argmax(cumulative >= rank, axis=1)]
+
+    base = resampled_percentiles(a_counts, before.count)
+    test = resampled_percentiles(b_counts, after.count)
+    change = (test - base) / base * 100
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(change, [tail, 100 - tail])
+    return {
+        "percentile": q,
+        "change_percent": round(float(np.median(change)), 2),
+        "ci_low": round(float(low), 2),
+        "ci_high": round(float(high), 2),
+        "confidence": confidence,
+        "iterations": int(iterations),
+    }
+
+
+def compare_histograms(before, after, alpha=DEFAULT_ALPHA, confidence=DEFAULT_CONFIDENCE,
+                       iterations=DEFAULT_BOOTSTRAP_ITERATIONS, min_change_percent=DEFAULT_MIN_CHANGE_PERCENT):
+    """Significance-based verdict: a shift is flagged when Mann-Whitney is
+    significant and either the effect size is non-negligible or the bootstrap
+    CI of the p95 change lies entirely beyond ``min_change_percent``."""
+    if isinstance(before, dict):
+        before = LatencyHistogram.from_dict(before)
+    if isinstance(after, dict):
+        after = LatencyHistogram.from_dict(after)
+    if not before.count or not after.count:
+        return None
+    u, z, mw_p, delta = mann_whitney(before, after)
+    ks_d, ks_p = kolmogorov_smirnov(before, after)
+    magnitude = effect_magnitude(delta)
+    significant = mw_p < alpha
+    p95_change = bootstrap_percentile_change(before, after, 95, iterations, confidence)
+    p99_change = bootstrap_percentile_change(before, after, 99, iterations, confidence)
+    tail_slower = p95_change is not None and p95_change["ci_low"] > min_change_percent
+    tail_faster = p95_change is not None and p95_change["ci_high"] < -min_change_percent
+    if significant and ((magnitude != "negligible" and delta > 0) or tail_slower):
+        status = f"⚠️ Warning: Statistically significant latency regression ({magnitude} effect)"
+    elif significant and ((magnitude != "negligible" and delta < 0) or tail_faster):
+        status = f"✅ Stable: Statistically significant improvement ({magnitude} effect)"
+    elif significant:
+        status = "🟢 Stable: Significant but negligible shift"
+    else:
+        status = "🟢 Stable: No significant difference"
+    return {
+        "n_before": before.count,
+        "n_after": after.count,
+        "mann_whitney_u": round(u, 1),
+        "mann_whitney_z": round(z, 3),
+        "mann_whitney_p": mw_p,
+        "ks_statistic": round(ks_d, 4),
+        "ks_p": ks_p,
+        "cliffs_delta": round(delta, 4),
+        "effect_size": magnitude,
+        "alpha": alpha,
+        "significant": significant,
+        "p95_change": p95_change,
+        "p99_change": p99_change,
+        "status": status,
+    }
@@ -0,0 +1,141 @@
+from utils.histogram import LatencyHistogram
+
+# Request phases in the order they happen. dns, connect and tls are 0 on a
+# request that reused a keep-alive connection, so per-request means add up
+# to the mean total latency and a change can be split between phases.
+PHASES = ("dns", "connect", "tls", "ttfb", "download")
+SETUP_PHASES = ("dns", "connect", "tls")
+# Payload sizes share the histogram code with a bucket range suited to bytes.
+BYTES_HISTOGRAM = {"lowest": 1.0, "highest": 1e12, "relative_error": 0.01}
+# The mean latency must move by at least this much (% of the baseline's)
+# before the change is attributed to a phase.
+MIN_ATTRIBUTION_CHANGE = 5.0
+
+
+class PhaseStats:
+    """Mergeable per-phase latency histograms plus payload sizes, written as ``phase_timings``."""
+
+    def __init__(self):
+        self.phases = {phase: LatencyHistogram() for phase in PHASES}
+        self.payload_bytes = LatencyHistogram(**BYTES_HISTOGRAM)
+        self.request_count = 0
+        self.connections = 0
+
+    def record(self, phases, payload_bytes):
+        self.request_count += 1
+        if phases.get("connect"):
+            self.connections += 1
+        for phase, histogram in self.phases.items():
+            histogram.record(phases.get(phase, 0.0))
+        self.payload_bytes.record(payload_bytes)
+
+    def merge(self, other):
+        for phase, histogram in self.phases.items():
+            histogram.merge(other.phases[phase])
+        self.payload_bytes.merge(other.payload_bytes)
+        self.request_count += other.request_count
+        self.connections += other.connections
+        return self
+
+    def reset(self):
+        for histogram in self.phases.values():
+            histogram.reset()
+        self.payload_bytes.reset()
+        self.request_count = 0
+        self.connections = 0
+
+    def summary(self):
+        summary = {phase: histogram.summary(qs=(50, 95, 99)) for phase, histogram in self.phases.items()}
+        summary["payload_bytes"] = self.payload_bytes.summary(qs=(50, 95, 99), digits=0)
+        return summary
+
+    def to_dict(self, with_summary=False):
+        data = {
+            "requests": self.request_count,
+            "connections": self.connections,
+            "phases": {phase: histogram.to_dict() for phase, histogram in self.phases.items()},
+            "payload_bytes": self.payload_bytes.to_dict(),
+        }
+        if with_summary:
+            # Readable numbers for people opening the run file; from_dict ignores them.
+            data["summary"] = self.summary()
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.request_count = data.get("requests", 0)
+        stats.connections = data.get("connections", 0)
+        for phase, histogram in (data.get("phases") or {}).items():
+            if phase in stats.phases and histogram:
+                stats.phases[phase] = LatencyHistogram.from_dict(histogram)
+        if data.get("payload_bytes"):
+            stats.payload_bytes = LatencyHistogram.from_dict(data["payload_bytes"])
+        return stats
+
+
+def compare_phases(before, after):
+    """Split the change in mean latency between request phases.
+
+    ``before`` and ``after`` are ``phase_timings`` blocks. Returns None unless
+    both runs recorded phases. The phase that moved most in the direction of
+    the total change is named in ``attributed_phase`` once the total moved by
+    at least MIN_ATTRIBUTION_CHANGE percent.
+    """
+    if not isinstance(before, dict) or not isinstance(after, dict):
+        return None
+    b, a = PhaseStats.from_dict(before), PhaseStats.from_dict(after)
+    if not b.request_count or not a.request_count:
+        return None
+    rows = []
+    for phase in PHASES:
+        hb, ha = b.phases[phase], a.phases[phase]
+        before_p95, after_p95 = hb.percentile(95), ha.percentile(95)
+        rows.append({
+            "phase": phase,
+            "before_avg": round(hb.mean, 3),
+            "after_avg": round(ha.mean, 3),
+            "delta_ms": round(ha.mean - hb.mean, 3),
+            "before_p95": round(before_p95, 3),
+            "after_p95": round(after_p95, 3),
+        })
+    before_total = sum(row["before_avg"] for row in rows)
+    total_delta = sum(row["delta_ms"] for row in rows)
+    for row in rows:
+        row["share_percent"] = round(row["delta_ms"] / total_delta * 100, 1) if total_delta else None
+    result = {
+        "phases": rows,
+        "before_total_avg": round(before_total, 3),
+        "total_delta_ms": round(total_delta, 3),
+        "connection_reuse": {
+            "before": round(1 - b.connections / b.request_count, 4),
+            "after": round(1 - a.connections / a.request_count, 4),
+        },
+        "payload_bytes": {"before_avg": round(b.payload_bytes.mean or 0), "after_avg": round(a.payload_bytes.mean or 0)},
+        "attributed_phase": None,
+    }
+    if before_total and abs(total_delta) / before_total * 100 >= MIN_ATTRIBUTION_CHANGE:
+        sign = 1 if total_delta > 0 else -1
+        top = max(rows, key=lambda row: row["delta_ms"] * sign)
+        result["attributed_phase"] = top["phase"]
+    return result
+
+
+def describe_phases(comparison):
+    """One line naming the phase a latency change came from, with the supporting numbers."""
+    phase = comparison["attributed_phase"]
+    total = comparison["total_delta_ms"]
+    if phase is None:
+        deltas = ", ".join(f"{row['phase']} {row['delta_ms']:+.2f}" for row in comparison["phases"])
+        return f"request_phases: mean latency moved {total:+.2f} ms, too little to attribute to a phase ({deltas} ms)"
+    row = next(row for row in comparison["phases"] if row["phase"] == phase)
+    line = (f"request_phases: {total:+.2f} ms mean latency change attributed to {phase} "
+            f"({row['before_avg']} → {row['after_avg']} ms, {row['share_percent']:.0f}% of the change; "
+            f"p95 {row['before_p95']} → {row['after_p95']} ms)")
+    if phase in SETUP_PHASES:
+        reuse = comparison["connection_reuse"]
+        line += f"; connection reuse {reuse['before']:.0%} → {reuse['after']:.0%}"
+    elif phase == "download":
+        size = comparison["payload_bytes"]
+        line += f"; mean payload {size['before_avg']} → {size['after_avg']} bytes"
+    return line
@@ -0,0 +1,570 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from utils.histogram import LatencyHistogram
+from utils.phase_timing import PhaseStats
+from utils.run_catalog import RunCatalog, ROLLUP_TAG, DEFAULT_RUNS_DIR, parse_tags
+from utils.run_schema import JSON_GZ, RunRecord, EndpointSummary, read_run, run_file_path, write_run
+from utils.run_stats import RunStats
+from utils.sample_store import SampleStore, resolve_samples_dir
+from utils.timeseries import load_windows, window_record, timeseries_path
+
+# Every age is in days and 0 turns that step off. Runs carrying a pinned tag
+# are compressed (lossless) but never compacted, rolled up or pruned; "*"
+# pins every tagged run.
+COMPRESS_AFTER_DAYS = float(os.environ.get("PERF_RETENTION_COMPRESS_DAYS", "7"))
+COMPACT_AFTER_DAYS = float(os.environ.get("PERF_RETENTION_COMPACT_DAYS", "30"))
+ROLLUP_AFTER_DAYS = float(os.environ.get("PERF_RETENTION_ROLLUP_DAYS", "90"))
+MAX_AGE_DAYS = float(os.environ.get("PERF_RETENTION_MAX_AGE_DAYS", "0"))
+MAX_MB = float(os.environ.get("PERF_RETENTION_MAX_MB", "0"))
+PIN_TAGS = os.environ.get("PERF_RETENTION_PIN_TAGS", "baseline,pinned")
+COLD_FORMAT = os.environ.get("PERF_RETENTION_FORMAT", JSON_GZ)
+COMPACT_WINDOW_SECONDS = float(os.environ.get("PERF_RETENTION_WINDOW_SECONDS", "60"))
+# PERF_RETENTION=0 stops the dashboard from running retention in the background.
+ENABLED = os.environ.get("PERF_RETENTION", "1").lower() not in ("0", "false", "no")
+# Runs handled per pass, so one pass never holds up the caller for long.
+BATCH_SIZE = int(os.environ.get("PERF_RETENTION_BATCH", "200"))
+INTERVAL_SECONDS = float(os.environ.get("PERF_RETENTION_INTERVAL", "3600"))
+# Compacted windows are never so coarse that a run has fewer than this many,
+# so warm-up and steady state can still be told apart.
+MIN_COMPACTED_WINDOWS = 20
+LOCK_STALE_SECONDS = 3600
+
+# Retention stage of each run, kept in the catalog.
+COMPRESSED = "compressed"
+COMPACTED = "compacted"
+ROLLED_UP = "rollup"
+KEPT = "kept"
+UNREADABLE = "unreadable"
+
+
+class RetentionPolicy:
+    def __init__(self, compress_after_days=COMPRESS_AFTER_DAYS, compact_after_days=COMPACT_AFTER_DAYS,
+                 rollup_after_days=ROLLUP_AFTER_DAYS, max_age_days=MAX_AGE_DAYS, max_bytes=MAX_MB * 1024 * 1024,
+                 pin_tags=PIN_TAGS, cold_format=COLD_FORMAT, compact_window_seconds=COMPACT_WINDOW_SECONDS):
+        self.compress_after_days = compress_after_days
+        self.compact_after_days = compact_after_days
+        self.rollup_after_days = rollup_after_days
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.pin_tags = set(parse_tags(pin_tags))
+        self.cold_format = cold_format
+        self.compact_window_seconds = compact_window_seconds
+
+    def is_pinned(self, tags):
+        tags = set(tags) - {ROLLUP_TAG}
+        return bool(tags & self.pin_tags or ("*" in self.pin_tags and tags))
+
+    def to_dict(self):
+        return {
+            "compress_after_days": self.compress_after_days,
+            "compact_after_days": self.compact_after_days,
+            "rollup_after_days": self.rollup_after_days,
+            "max_age_days": self.max_age_days,
+            "max_bytes": self.max_bytes,
+            "pin_tags": sorted(self.pin_tags),
+            "cold_format": self.cold_format,
+            "compact_window_seconds": self.compact_window_seconds,
+        }
+
+
+def cutoff(days, now=None):
+    if not days:
+        return None
+    return ((now or datetime.now()) - timedelta(days=days)).isoformat(timespec="seconds")
+
+
+def path_size(path):
+    if path is None:
+        return 0
+    path = Path(path)
+    if path.is_file():
+        return path.stat().st_size
+    if path.is_dir():
+        return sum(entry.stat().st_size for entry in path.rglob("*") if entry.is_file())
+    return 0
+
+
+def windows_file(run_file, record):
+    if not record.timeseries_file:
+        return None
+    return Path(run_file).parent / record.timeseries_file
+
+
+def compact_windows(windows, target_seconds):
+    """Merge consecutive windows into windows of about ``target_seconds``.
+
+    The window length is a multiple of the original one, shortened when the
+    run would otherwise end up with fewer than MIN_COMPACTED_WINDOWS windows.
+    """
+    if not windows:
+        return [], None
+    interval = windows[0]["interval"]
+    span = windows[-1]["t"] + windows[-1]["interval"] - windows[0]["t"]
+    target = min(target_seconds, span / MIN_COMPACTED_WINDOWS)
+    factor = max(1, int(target // interval))
+    if factor == 1:
+        return windows, interval
+    compacted = []
+    start = windows[0]["t"]
+    for offset in range(0, len(windows), factor):
+        group = windows[offset:offset + factor]
+        stats = RunStats()
+        for window in group:
+            stats.merge(RunStats.from_dict({
+                "request_count": window.get("requests", 0),
+                "error_count": window.get("errors", 0),
+                "latency_histogram": window.get("latency_histogram"),
+            }))
+        compacted.append(window_record(round(start + offset * interval, 6), sum(w["interval"] for w in group), stats))
+    return compacted, interval * factor
+
+
+def write_windows_gz(path, windows):
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        for window in windows:
+            f.write(json.dumps(window, separators=(",", ":")) + "\n")
+    os.replace(tmp_path, path)
+
+
+def merge_histograms(histograms):
+    histograms = [h for h in histograms if h]
+    if not histograms:
+        return None
+    merged = LatencyHistogram.from_dict(histograms[0])
+    for histogram in histograms[1:]:
+        merged.merge(LatencyHistogram.from_dict(histogram))
+    return merged
+
+
+def rollup_key(record):
+    return (
+        (record.timestamp or "")[:10], record.endpoint, record.scenario_file,
+        record.client_mode, record.load_mode, record.latency_basis,
+    )
+
+
+def rollup_id(key):
+    digest = hashlib.sha1(repr(key[1:]).encode("utf-8")).hexdigest()[:8]
+    return f"{ROLLUP_TAG}-{key[0]}-{digest}"
+
+
+def merge_records(run_id, records):
+    """One rollup record with the merged histograms and request-weighted error rate of ``records``."""
+    first = min(records, key=lambda r: r.timestamp or "")
+    total = sum(r.total_requests for r in records)
+    errors = sum(r.total_requests * (r.error_rate or 0) / 100 for r in records)
+    histogram = merge_histograms([r.latency_histogram for r in records]) or LatencyHistogram()
+    latency = histogram.summary()
+    source_runs, run_ids = 0, []
+    for record in records:
+        # A rollup merged again (runs of its day arrived late) counts the runs it already holds.
+        source_runs += record.rollup["runs"] if record.rollup else 1
+        run_ids += record.rollup["run_ids"] if record.rollup else [record.run_id]
+    rollup = RunRecord(
+        run_id=run_id,
+        timestamp=first.timestamp,
+        endpoint=first.endpoint,
+        total_requests=total,
+        error_rate=round(errors / total * 100, 2) if total else 0.0,
+        avg_response_time=latency["avg"],
+        p50_response_time=latency["p50"],
+        p90_response_time=latency["p90"],
+        p95_response_time=latency["p95"],
+        p99_response_time=latency["p99"],
+        p999_response_time=latency["p999"],
+        max_response_time=latency["max"],
+        latency_histogram=histogram.to_dict(),
+        workers=max(r.workers for r in records),
+        tags=sorted(set().union(*(r.tags for r in records)) | {ROLLUP_TAG}),
+        load_mode=first.load_mode,
+        latency_basis=first.latency_basis,
+        client_mode=first.client_mode,
+        scenario_file=first.scenario_file,
+        rollup={
+            "runs": source_runs,
+            "run_ids": sorted(run_ids),
+            "first": min(r.rollup["first"] if r.rollup else r.timestamp for r in records),
+            "last": max(r.rollup["last"] if r.rollup else r.timestamp for r in records),
+        },
+    )
+    if all(r.ok_latency_histogram for r in records):
+        rollup.ok_latency_histogram = merge_histograms([r.ok_latency_histogram for r in records]).to_dict()
+    if all(r.phase_timings for r in records):
+        phases = PhaseStats()
+        for record in records:
+            phases.merge(PhaseStats.from_dict(record.phase_timings))
+        rollup.phase_timings = phases.to_dict(with_summary=True)
+    rollup.endpoints = merge_endpoints(records)
+    return rollup
+
+
+def merge_endpoints(records):
+    routes = {}
+    for record in records:
+        for name, route in (record.endpoints or {}).items():
+            routes.setdefault(name, []).append(route)
+    merged = {}
+    for name, parts in routes.items():
+        histogram = merge_histograms([route.latency_histogram for route in parts]) or LatencyHistogram()
+        latency = histogram.summary(qs=(50, 95, 99))
+        total = sum(route.total_requests for route in parts)
+        errors = sum(route.total_requests * (route.error_rate or 0) / 100 for route in parts)
+        merged[name] = EndpointSummary(
+            method=parts[0].method, path=parts[0].path, weight=parts[0].weight, total_requests=total,
+            error_rate=round(errors / total * 100, 2) if total else 0.0,
+            avg_response_time=latency["avg"], p50_response_time=latency["p50"],
+            p95_response_time=latency["p95"], p99_response_time=latency["p99"],
+            latency_histogram=histogram.to_dict(),
+        )
+    return merged or None
+
+
+class RetentionManager:
+    """Bounded, resumable retention passes over the run store.
+
+    Each pass works oldest first, through at most ``batch_size`` runs:
+
+    1. roll runs older than ``rollup_after_days`` into one run per day and
+       workload, with merged histograms, and delete the originals;
+    2. compact runs older than ``compact_after_days``: coarser time-series
+       windows, raw samples folded into a success-only histogram;
+    3. compress runs older than ``compress_after_days`` to ``cold_format``
+       and gzip their time series;
+    4. prune the oldest runs past ``max_age_days`` or beyond ``max_bytes``.
+
+    Progress is kept as each run's stage in the catalog, so an interrupted
+    pass loses nothing and the next one carries on. A lock file keeps the
+    dashboard's background worker and the CLI from running passes at once.
+    """
+
+    def __init__(self, policy=None, runs_dir=DEFAULT_RUNS_DIR, catalog=None, batch_size=BATCH_SIZE):
+        self.policy = policy or RetentionPolicy()
+        self.runs_dir = Path(runs_dir)
+        self.catalog = catalog or RunCatalog()
+        self.batch_size = batch_size
+        self.lock_path = self.runs_dir.parent / "retention.lock"
+
+    def _acquire(self):
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            if time.time() - self.lock_path.stat().st_mtime > LOCK_STALE_SECONDS:
+                self.lock_path.unlink()
+        except FileNotFoundError:
+            pass
+        try:
+            os.close(os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        return True
+
+    def run_pass(self, dry_run=False, now=None):
+        """One bounded pass; ``done`` is False when work was left for the next pass."""
+        report = {"rolled_up": 0, "rollups": 0, "compacted": 0, "compressed": 0, "pruned": 0,
+                  "bytes_freed": 0, "errors": [], "dry_run": dry_run, "done": True}
+        if not dry_run and not self._acquire():
+            report["skipped"] = "another retention pass is running"
+            return report
+        try:
+            self.catalog.import_directory(self.runs_dir)
+            budget = [self.batch_size]
+            now = now or datetime.now()
+            # Runs already handled (or deleted) by an earlier step of this pass. A real pass
+            # changes their stage so later steps do not select them again; a dry run changes
+            # nothing, so it skips them by id to report what a real pass would do.
+            claimed, removed = set(), set()
+            self._rollup(report, budget, cutoff(self.policy.rollup_after_days, now), dry_run, claimed, removed)
+            self._compact(report, budget, cutoff(self.policy.compact_after_days, now), dry_run, claimed)
+            self._compress(report, budget, cutoff(self.policy.compress_after_days, now), dry_run, claimed)
+            self._prune(report, budget, cutoff(self.policy.max_age_days, now), dry_run, removed)
+            report["done"] = budget[0] > 0
+        finally:
+            if not dry_run:
+                self.lock_path.unlink(missing_ok=True)
+        return report
+
+    def run(self, dry_run=False, max_passes=None):
+        """Passes until nothing is left (or ``max_passes``); returns the summed report."""
+        total = None
+        passes = 0
+        while True:
+            report = self.run_pass(dry_run)
+            passes += 1
+            if total is None:
+                total = report
+            else:
+                for key in ("rolled_up", "rollups", "compacted", "compressed", "pruned", "bytes_freed"):
+                    total[key] += report[key]
+                total["errors"] += report["errors"]
+                total["done"] = report["done"]
+            # A dry run changes nothing, so a second pass would see the same runs.
+            if report["done"] or "skipped" in report or dry_run or (max_passes and passes >= max_passes):
+                total["passes"] = passes
+                return total
+
+    def _candidates(self, before, stages, budget, pinned_too=False, skip=()):
+        if before is None or budget[0] <= 0:
+            return []
+        exclude = () if pinned_too else self.policy.pin_tags
+        rows = self.catalog.retention_candidates(before, stages, exclude, limit=budget[0] + len(skip))
+        rows = [row for row in rows if row["run_id"] not in skip][:budget[0]]
+        budget[0] -= len(rows)
+        return rows
+
+    def _load(self, row, report, dry_run=False):
+        """The run's record, or None after recording why it cannot be processed."""
+        path = Path(row["path"])
+        if not path.exists():
+            # Deleted behind the catalog's back.
+            if not dry_run:
+                self.catalog.remove_run(row["run_id"])
+            return None
+        try:
+            return read_run(path)
+        except (OSError, ValueError, RuntimeError) as e:
+            report["errors"].append(f"{path.name}: {e}")
+            # Left alone from now on (only pruning still applies), so it cannot block later passes.
+            if not dry_run:
+                self.catalog.set_retention_stage(row["run_id"], UNREADABLE)
+            return None
+
+    def _cold_windows_path(self, run_file, record):
+        target = timeseries_path(run_file_path(Path(run_file).parent, record.run_id, self.policy.cold_format))
+        return target.with_name(target.name + ".gz")
+
+    def _write_windows(self, run_file, record, windows):
+        """Replace the run's time series with ``windows``, gzipped; returns the bytes saved."""
+        source = windows_file(run_file, record)
+        target = self._cold_windows_path(run_file, record)
+        freed = path_size(source)
+        write_windows_gz(target, windows)
+        if target != source:
+            source.unlink()
+        record.timeseries_file = target.name
+        return freed - path_size(target)
+
+    def _rewrite(self, old_path, record, stage):
+        """Write ``record`` in the cold format, drop the old file and point the catalog at the new one."""
+        new_path = run_file_path(old_path.parent, record.run_id, self.policy.cold_format)
+        before = path_size(old_path)
+        write_run(new_path, record)
+        if new_path != old_path:
+            old_path.unlink(missing_ok=True)
+        self.catalog.add_run(new_path, record.to_dict())
+        self.catalog.set_retention_stage(record.run_id, stage)
+        return before - path_size(new_path)
+
+    def _delete(self, row, record=None):
+        path = Path(row["path"])
+        freed = 0
+        if record is not None:
+            for artifact in (windows_file(path, record), resolve_samples_dir(path, record.to_dict())):
+                if artifact is not None and artifact.exists():
+                    freed += path_size(artifact)
+                    shutil.rmtree(artifact) if artifact.is_dir() else artifact.unlink()
+        if path.exists():
+            freed += path_size(path)
+            path.unlink()
+        self.catalog.remove_run(row["run_id"])
+        return freed
+
+    def _rollup(self, report, budget, before, dry_run, claimed, removed):
+        groups = {}
+        for row in self._candidates(before, (None, COMPRESSED, COMPACTED), budget):
+            claimed.add(row["run_id"])
+            record = self._load(row, report, dry_run)
+            if record is None:
+                continue
+            if not record.latency_histogram:
+                # Nothing to merge (files from before histograms existed); keep the run as it is.
+                report["compressed"] += 1
+                if not dry_run:
+                    report["bytes_freed"] += self._rewrite(Path(row["path"]), record, KEPT)
+                continue
+            groups.setdefault(rollup_key(record), []).append((row, record))
+        for key, members in groups.items():
+            report["rolled_up"] += len(members)
+            report["rollups"] += 1
+            removed.update(row["run_id"] for row, _ in members)
+            if dry_run:
+                continue
+            run_id = rollup_id(key)
+            existing = self.catalog.get(run_id)
+            existing_path = Path(existing["path"]) if existing is not None else None
+            existing_size = path_size(existing_path)
+            try:
+                existing_record = read_run(existing_path) if existing_size else None
+                # A pass interrupted while deleting the members leaves runs that the rollup
+                # already holds; those are only deleted, never merged a second time.
+                merged_ids = set(existing_record.rollup["run_ids"]) if existing_record and existing_record.rollup else set()
+                records = [record for _, record in members if record.run_id not in merged_ids]
+                if records:
+                    if existing_record is not None:
+                        # More runs of a day that was already rolled up.
+                        records.append(existing_record)
+                    rollup = merge_records(run_id, records)
+                    rollup_path = run_file_path(self.runs_dir, run_id, self.policy.cold_format)
+                    write_run(rollup_path, rollup)
+            except (OSError, ValueError) as e:
+                report["errors"].append(f"{run_id}: {e}")
+                for row, _ in members:
+                    self.catalog.set_retention_stage(row["run_id"], UNREADABLE)
+                continue
+            if records:
+                if existing_size and existing_path != rollup_path:
+                    existing_path.unlink()
+                self.catalog.add_run(rollup_path, rollup.to_dict())
+                self.catalog.set_retention_stage(run_id, ROLLED_UP)
+                report["bytes_freed"] -= path_size(rollup_path) - existing_size
+            for row, record in members:
+                report["bytes_freed"] += self._delete(row, record)
+
+    def _compact(self, report, budget, before, dry_run, claimed):
+        for row in self._candidates(before, (None, COMPRESSED), budget, skip=claimed):
+            claimed.add(row["run_id"])
+            record = self._load(row, report, dry_run)
+            if record is None:
+                continue
+            report["compacted"] += 1
+            if dry_run:
+                continue
+            path = Path(row["path"])
+            freed = 0
+            source = windows_file(path, record)
+            if source is not None and source.exists():
+                windows, interval = compact_windows(load_windows(source), self.policy.compact_window_seconds)
+                freed += self._write_windows(path, record, windows)
+                record.window_seconds = interval
+            samples_dir = resolve_samples_dir(path, record.to_dict())
+            if samples_dir is not None and samples_dir.exists():
+                try:
+                    ok_histogram = SampleStore(samples_dir).latency_histogram(ok_only=True)
+                except RuntimeError as e:
+                    # NumPy missing: keep the samples rather than lose the success-only latencies.
+                    report["errors"].append(f"{path.name}: {e}")
+                else:
+                    record.ok_latency_histogram = ok_histogram.to_dict() if ok_histogram.count else None
+                    freed += path_size(samples_dir)
+                    shutil.rmtree(samples_dir)
+                    record.samples_dir = None
+            record.retention = {
+                "compacted_at": datetime.now().isoformat(timespec="seconds"),
+                "window_seconds": record.window_seconds,
+            }
+            report["bytes_freed"] += freed + self._rewrite(path, record, COMPACTED)
+
+    def _compress(self, report, budget, before, dry_run, claimed):
+        # Lossless, so pinned runs are compressed too.
+        for row in self._candidates(before, (None,), budget, pinned_too=True, skip=claimed):
+            claimed.add(row["run_id"])
+            record = self._load(row, report, dry_run)
+            if record is None:
+                continue
+            report["compressed"] += 1
+            if dry_run:
+                continue
+            path = Path(row["path"])
+            freed = 0
+            source = windows_file(path, record)
+            if source is not None and source.exists():
+                freed += self._write_windows(path, record, load_windows(source))
+            report["bytes_freed"] += freed + self._rewrite(path, record, COMPRESSED)
+
+    def store_size(self):
+        return path_size(self.runs_dir) + path_size(self.runs_dir.parent / "samples")
+
+    def _run_size(self, row, record):
+        size = path_size(row["path"])
+        if record is not None:
+            for artifact in (windows_file(row["path"], record), resolve_samples_dir(row["path"], record.to_dict())):
+                size += path_size(artifact) if artifact is not None else 0
+        return size
+
+    def _prune(self, report, budget, before, dry_run, removed):
+        stages = (None, COMPRESSED, COMPACTED, ROLLED_UP, KEPT, UNREADABLE)
+        # Size of the runs a dry run would already have deleted by age.
+        pending = 0
+        for row in self._candidates(before, stages, budget, skip=removed):
+            removed.add(row["run_id"])
+            report["pruned"] += 1
+            record = self._load(row, report, dry_run)
+            if dry_run:
+                pending += self._run_size(row, record)
+            else:
+                report["bytes_freed"] += self._delete(row, record)
+        if not self.policy.max_bytes or budget[0] <= 0:
+            return
+        excess = self.store_size() - pending - self.policy.max_bytes
+        offset = 0
+        while excess > 0 and budget[0] > 0:
+            rows = self.catalog.retention_candidates(None, stages, self.policy.pin_tags, limit=budget[0], offset=offset)
+            if not rows:
+                break
+            for row in rows:
+                if dry_run:
+                    # Nothing is deleted, so the next query starts after the rows seen so far.
+                    offset += 1
+                if row["run_id"] in removed:
+                    continue
+                if excess <= 0 or budget[0] <= 0:
+                    break
+                budget[0] -= 1
+                record = self._load(row, report, dry_run) if Path(row["path"]).exists() else None
+                excess -= self._run_size(row, record)
+                report["pruned"] += 1
+                if not dry_run:
+                    report["bytes_freed"] += self._delete(row, record)
+
+
+class RetentionWorker:
+    """Daemon thread running one retention pass every ``interval`` seconds.
+
+    A pass that ran out of batch budget is followed straight away by the
+    next, so a backlog drains in bounded steps without holding the catalog
+    for long.
+    """
+
+    def __init__(self, manager=None, interval=INTERVAL_SECONDS):
+        self.manager = manager or RetentionManager()
+        self.interval = interval
+        self.last_report = None
+        self.last_error = None
+        self.last_run_at = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="retention", daemon=True)
+            self._thread.start()
+        return self
+
+    def run_now(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.last_report = self.manager.run_pass()
+                self.last_error = None
+            except Exception as e:
+                self.last_report, self.last_error = None, str(e)
+                print(f"Retention pass failed: {e}", file=sys.stderr)
+            self.last_run_at = datetime.now().isoformat(timespec="seconds")
+            more = self.last_report is not None and not self.last_report["done"]
+            self._wake.wait(1.0 if more else self.interval)
+            self._wake.clear()
@@ -0,0 +1,320 @@
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+# Also run as a script (`python utils/run_catalog.py import`), so the repo root must be importable.
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from utils.run_schema import list_run_files, read_run_dict, run_id_from_path
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+DEFAULT_RUNS_DIR = DATA_DIR / "runs"
+DEFAULT_DB_PATH = DATA_DIR / "catalog.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    started_at TEXT,
+    endpoint TEXT,
+    avg_response_time REAL,
+    p95_response_time REAL,
+    p99_response_time REAL,
+    error_rate REAL,
+    total_requests INTEGER,
+    file_mtime REAL,
+    indexed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_started_at ON runs(started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_endpoint_started_at ON runs(endpoint, started_at);
+CREATE TABLE IF NOT EXISTS run_tags (
+    run_id TEXT NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (run_id, tag)
+);
+CREATE INDEX IF NOT EXISTS idx_run_tags_tag ON run_tags(tag, run_id);
+CREATE TABLE IF NOT EXISTS run_retention (
+    run_id TEXT PRIMARY KEY REFERENCES runs(run_id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    updated_at TEXT
+);
+"""
+
+COLUMNS = [
+    "run_id", "path", "started_at", "endpoint", "avg_response_time", "p95_response_time",
+    "p99_response_time", "error_rate", "total_requests", "file_mtime", "indexed_at",
+]
+
+SERIES_METRICS = ["avg_response_time", "p95_response_time", "p99_response_time", "error_rate", "total_requests"]
+# Retention merges old runs into one run per day carrying this tag.
+ROLLUP_TAG = "rollup"
+
+
+def parse_tags(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return sorted({tag.strip() for tag in value if tag and tag.strip()})
+
+
+def normalize_timestamp(value):
+    if not value:
+        return None
+    for parse in (datetime.fromisoformat, lambda v: datetime.strptime(v[:15], "%Y%m%d-%H%M%S")):
+        try:
+            return parse(value).isoformat(timespec="seconds")
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def summarize_run(path, data):
+    """Map a run file (either writer's field names) onto catalog columns."""
+    path = Path(path)
+    total = data.get("total_requests")
+    error_rate = data.get("error_rate")
+    if error_rate is None and data.get("errors") is not None and total:
+        error_rate = round(data["errors"] / total * 100, 2)
+    return {
+        "run_id": str(data.get("run_id") or run_id_from_path(path)),
+        "path": str(path.resolve()),
+        "started_at": normalize_timestamp(data.get("timestamp")) or normalize_timestamp(run_id_from_path(path)),
+        "endpoint": data.get("endpoint"),
+        "avg_response_time": data.get("avg_response_time", data.get("avg_latency_ms")),
+        "p95_response_time": data.get("p95_response_time", data.get("p95_latency_ms")),
+        "p99_response_time": data.get("p99_response_time"),
+        "error_rate": error_rate,
+        "total_requests": total,
+        "file_mtime": path.stat().st_mtime if path.exists() else None,
+        "indexed_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+class RunCatalog:
+    """Indexed SQLite store of run metadata and summary metrics."""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def add_run(self, path, data=None, tags=()):
+        if data is None:
+            data = read_run_dict(path)
+        row = summarize_run(path, data)
+        tags = parse_tags(tags) or parse_tags(data.get("tags"))
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM runs WHERE path = ? AND run_id != ?", (row["path"], row["run_id"]))
+            conn.execute(
+                f"INSERT INTO runs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)}) "
+                f"ON CONFLICT(run_id) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in COLUMNS[1:])}",
+                [row[c] for c in COLUMNS],
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO run_tags (run_id, tag) VALUES (?, ?)",
+                [(row["run_id"], tag) for tag in tags],
+            )
+        return row["run_id"]
+
+    def tag_run(self, run_id, tags):
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO run_tags (run_id, tag) VALUES (?, ?)",
+                [(run_id, tag) for tag in parse_tags(tags)],
+            )
+
+    def untag_run(self, run_id, tags):
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM run_tags WHERE run_id = ? AND tag = ?",
+                [(run_id, tag) for tag in parse_tags(tags)],
+            )
+
+    def remove_run(self, run_id):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM runs")
+
+    def _where(self, endpoint=None, since=None, until=None, tag=None):
+        clauses, args = [], []
+        if endpoint:
+            clauses.append("endpoint = ?")
+            args.append(endpoint)
+        if since:
+            clauses.append("started_at >= ?")
+            args.append(normalize_timestamp(str(since)) or str(since))
+        if until:
+            clauses.append("started_at <= ?")
+            args.append(normalize_timestamp(str(until)) or str(until))
+        if tag:
+            clauses.append("run_id IN (SELECT run_id FROM run_tags WHERE tag = ?)")
+            args.append(tag)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def query(self, endpoint=None, since=None, until=None, tag=None, limit=50, offset=0):
+        where, args = self._where(endpoint, since, until, tag)
+        sql = (
+            "SELECT runs.*, (SELECT group_concat(tag, ',') FROM run_tags WHERE run_tags.run_id = runs.run_id) AS tags "
+            f"FROM runs{where} ORDER BY started_at DESC, run_id DESC LIMIT ? OFFSET ?"
+        )
+        with self._connect() as conn:
+            rows = conn.execute(sql, args + [int(limit), int(offset)]).fetchall()
+        return [self._row(row) for row in rows]
+
+    def count(self, endpoint=None, since=None, until=None, tag=None):
+        where, args = self._where(endpoint, since, until, tag)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM runs{where}", args).fetchone()[0]
+
+    def get(self, run_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT runs.*, (SELECT group_concat(tag, ',') FROM run_tags WHERE run_tags.run_id = runs.run_id) AS tags "
+                "FROM runs WHERE run_id = ?",
+                (run_id,),
+            ).fetchone()
+        return self._row(row) if row else None
+
+    @staticmethod
+    def _check_metric(metric):
+        if metric not in SERIES_METRICS:
+            raise ValueError(f"Unknown metric '{metric}'. Choose one of: {', '.join(SERIES_METRICS)}")
+
+    def metric_series(self, metric, endpoint=None, after_rowid=0):
+        """Return ``(rowid, run_id, started_at, value)`` rows added after ``after_rowid``, oldest first.
+
+        Rollups are left out: they are indexed long after the runs they
+        replace, so they would land at the end of the series as a new point.
+        """
+        self._check_metric(metric)
+        sql = (f"SELECT rowid, run_id, started_at, {metric} FROM runs WHERE rowid > ? AND {metric} IS NOT NULL "
+               "AND run_id NOT IN (SELECT run_id FROM run_tags WHERE tag = ?)")
+        args = [after_rowid, ROLLUP_TAG]
+        if endpoint:
+            sql += " AND endpoint = ?"
+            args.append(endpoint)
+        with self._connect() as conn:
+            return conn.execute(sql + " ORDER BY rowid", args).fetchall()
+
+    def series_count(self, metric, endpoint=None):
+        self._check_metric(metric)
+        sql = f"SELECT COUNT(*) FROM runs WHERE {metric} IS NOT NULL AND run_id NOT IN (SELECT run_id FROM run_tags WHERE tag = ?)"
+        args = [ROLLUP_TAG]
+        if endpoint:
+            sql += " AND endpoint = ?"
+            args.append(endpoint)
+        with self._connect() as conn:
+            return conn.execute(sql, args).fetchone()[0]
+
+    def endpoints(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT DISTINCT endpoint FROM runs WHERE endpoint IS NOT NULL ORDER BY endpoint").fetchall()
+        return [row[0] for row in rows]
+
+    def tags(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT DISTINCT tag FROM run_tags ORDER BY tag").fetchall()
+        return [row[0] for row in rows]
+
+    def set_retention_stage(self, run_id, stage):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO run_retention (run_id, stage, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(run_id) DO UPDATE SET stage = excluded.stage, updated_at = excluded.updated_at",
+                (run_id, stage, datetime.now().isoformat(timespec="seconds")),
+            )
+
+    def retention_candidates(self, before=None, stages=(None,), exclude_tags=(), limit=100, offset=0):
+        """Runs started before ``before``, oldest first, whose retention stage is one of ``stages`` (None = untouched).
+
+        Runs carrying any of ``exclude_tags`` are left out; ``"*"`` leaves out
+        every run with a tag other than the rollup tag.
+        """
+        clauses, args = [], []
+        if before:
+            clauses.append("runs.started_at < ?")
+            args.append(before)
+        exclude_tags = parse_tags(exclude_tags)
+        if "*" in exclude_tags:
+            clauses.append("runs.run_id NOT IN (SELECT run_id FROM run_tags WHERE tag != ?)")
+            args.append(ROLLUP_TAG)
+        elif exclude_tags:
+            clauses.append(f"runs.run_id NOT IN (SELECT run_id FROM run_tags WHERE tag IN ({', '.join('?' for _ in exclude_tags)}))")
+            args.extend(exclude_tags)
+        stage_clauses = ["run_retention.stage IS NULL"] if None in stages else []
+        named = [stage for stage in stages if stage is not None]
+        if named:
+            stage_clauses.append(f"run_retention.stage IN ({', '.join('?' for _ in named)})")
+            args.extend(named)
+        clauses.append(f"({' OR '.join(stage_clauses)})")
+        sql = (
+            "SELECT runs.*, run_retention.stage AS retention_stage, "
+            "(SELECT group_concat(tag, ',') FROM run_tags WHERE run_tags.run_id = runs.run_id) AS tags "
+            "FROM runs LEFT JOIN run_retention ON run_retention.run_id = runs.run_id "
+            f"WHERE {' AND '.join(clauses)} ORDER BY runs.started_at, runs.run_id LIMIT ? OFFSET ?"
+        )
+        with self._connect() as conn:
+            rows = conn.execute(sql, args + [int(limit), int(offset)]).fetchall()
+        return [self._row(row) for row in rows]
+
+    @staticmethod
+    def _row(row):
+        data = dict(row)
+        data["tags"] = parse_tags(data.get("tags"))
+        return data
+
+    def import_directory(self, runs_dir=DEFAULT_RUNS_DIR):
+        """One-shot import of existing run JSON files; unchanged files are skipped."""
+        with self._connect() as conn:
+            known = dict(conn.execute("SELECT path, file_mtime FROM runs").fetchall())
+        imported = 0
+        for path in list_run_files(runs_dir):
+            resolved = str(path.resolve())
+            if known.get(resolved) == path.stat().st_mtime:
+                continue
+            try:
+                self.add_run(path)
+            except (OSError, ValueError) as e:
+                print(f"Skipping {path}: {e}", file=sys.stderr)
+                continue
+            imported += 1
+        return imported
+
+
+def record_run(path, data, tags=(), db_path=DEFAULT_DB_PATH):
+    try:
+        return RunCatalog(db_path).add_run(path, data, tags)
+    except sqlite3.Error as e:
+        # The JSON file is the source of truth; a locked or broken catalog can
+        # be rebuilt with `python utils/run_catalog.py import`.
+        print(f"Failed to index run {path}: {e}", file=sys.stderr)
+        return None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "import":
+        print("Usage: python utils/run_catalog.py import [runs_dir]")
+        sys.exit(1)
+    runs_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_RUNS_DIR
+    count = RunCatalog().import_directory(runs_dir)
+    print(f"Indexed {count} run file(s) from {runs_dir} into {DEFAULT_DB_PATH}")
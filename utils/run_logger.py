@@ -1,24 +1,34 @@
-import json
-from pathlib import Path
 from datetime import datetime
 
-def save_run_data(response_times, error_count, request_count, output_dir="data/runs"):
+from utils.histogram import LatencyHistogram
+from utils.run_catalog import record_run, parse_tags
+from utils.run_schema import RunRecord, run_file_path, write_run
+
+def save_run_data(response_times, error_count, request_count, output_dir="data/runs", tags=(), fmt=None):
     if not response_times:
         return
 
-    avg_latency = sum(response_times) / len(response_times)
-    p95_latency = sorted(response_times)[int(0.95 * len(response_times)) - 1]
+    histogram = response_times if isinstance(response_times, LatencyHistogram) else LatencyHistogram.from_samples(response_times)
+    if not histogram.count:
+        return
+    latency = histogram.summary()
     timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
 
-    data = {
-        "timestamp": timestamp,
-        "avg_latency_ms": round(avg_latency, 2),
-        "p95_latency_ms": round(p95_latency, 2),
-        "total_requests": request_count,
-        "errors": error_count,
-    }
+    record = RunRecord(
+        run_id=timestamp,
+        timestamp=timestamp,
+        avg_response_time=latency["avg"],
+        p50_response_time=latency["p50"],
+        p95_response_time=latency["p95"],
+        p99_response_time=latency["p99"],
+        max_response_time=latency["max"],
+        total_requests=request_count,
+        error_rate=round(error_count / request_count * 100, 2) if request_count else 0.0,
+        tags=parse_tags(tags),
+        latency_histogram=histogram.to_dict(),
+    )
 
-    output_path = Path(output_dir)
-    output_path.mkdir(parents=True, exist_ok=True)
-    with open(output_path / f"run_{timestamp}.json", "w") as f:
-        json.dump(data, f, indent=2)
+    run_file = run_file_path(output_dir, timestamp, fmt)
+    write_run(run_file, record)
+    record_run(run_file, record.to_dict(), tags)
+    return run_file
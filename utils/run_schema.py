@@ -0,0 +1,275 @@
+import dataclasses
+import gzip
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+# Version 1 is every file written before the schema existed (no
+# "schema_version" key): run_logger's avg_latency_ms / p95_latency_ms /
+# errors, or the Locust writer's field names without a version.
+SCHEMA_VERSION = 2
+
+# Run file formats, named after their file suffix. "json" stays the default
+# so files remain human-readable; "json.gz" is what retention compresses cold
+# runs to; the msgpack formats need the msgpack package (and zstandard for ".zst").
+JSON = "json"
+JSON_GZ = "json.gz"
+MSGPACK = "msgpack"
+MSGPACK_ZSTD = "msgpack.zst"
+RUN_FORMATS = (JSON, JSON_GZ, MSGPACK, MSGPACK_ZSTD)
+DEFAULT_RUN_FORMAT = os.environ.get("PERF_RUN_FORMAT", JSON)
+ZSTD_LEVEL = 3
+
+LEGACY_FIELDS = {"avg_latency_ms": "avg_response_time", "p95_latency_ms": "p95_response_time"}
+
+
+@dataclass(slots=True)
+class EndpointSummary:
+    """Stats of one scenario route, stored under ``endpoints`` in the run file."""
+
+    method: str = "GET"
+    path: str = ""
+    weight: float = 1.0
+    total_requests: int = 0
+    error_rate: float = 0.0
+    avg_response_time: Optional[float] = None
+    p50_response_time: Optional[float] = None
+    p95_response_time: Optional[float] = None
+    p99_response_time: Optional[float] = None
+    latency_histogram: Optional[dict] = None
+    extra: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data):
+        return _from_dict(cls, data)
+
+    def to_dict(self):
+        return _to_dict(self)
+
+
+@dataclass(slots=True)
+class RunRecord:
+    """One load-test run as written to ``data/runs``.
+
+    Optional fields that are None are left out of the file, and keys this
+    version does not know are kept in ``extra`` and written back unchanged,
+    so newer files survive a round trip through older code.
+    """
+
+    run_id: str
+    timestamp: Optional[str] = None
+    endpoint: Optional[str] = None
+    total_requests: int = 0
+    error_rate: float = 0.0
+    avg_response_time: Optional[float] = None
+    p50_response_time: Optional[float] = None
+    p90_response_time: Optional[float] = None
+    p95_response_time: Optional[float] = None
+    p99_response_time: Optional[float] = None
+    p999_response_time: Optional[float] = None
+    max_response_time: Optional[float] = None
+    latency_histogram: Optional[dict] = None
+    ok_latency_histogram: Optional[dict] = None
+    workers: int = 1
+    tags: list = field(default_factory=list)
+    load_mode: str = "closed"
+    latency_basis: str = "response_elapsed"
+    client_mode: str = "http"
+    client_settings: Optional[dict] = None
+    target_rps: Optional[float] = None
+    step_rps: Optional[float] = None
+    step_seconds: Optional[float] = None
+    max_rps: Optional[float] = None
+    timeseries_file: Optional[str] = None
+    window_seconds: Optional[float] = None
+    samples_dir: Optional[str] = None
+    generator: Optional[dict] = None
+    phase_timings: Optional[dict] = None
+    scenario_file: Optional[str] = None
+    endpoints: Optional[dict] = None
+    aborted: Optional[dict] = None
+    retention: Optional[dict] = None
+    rollup: Optional[dict] = None
+    schema_version: int = SCHEMA_VERSION
+    extra: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data, run_id=None):
+        """Build a record from a run dict of any schema version."""
+        data = migrate(data, run_id)
+        record = _from_dict(cls, data)
+        if record.endpoints:
+            record.endpoints = {
+                name: route if isinstance(route, EndpointSummary) else EndpointSummary.from_dict(route)
+                for name, route in record.endpoints.items()
+            }
+        return record
+
+    def to_dict(self):
+        data = _to_dict(self)
+        if self.endpoints:
+            data["endpoints"] = {name: route.to_dict() for name, route in self.endpoints.items()}
+        return data
+
+
+def _field_names(cls):
+    return [f.name for f in dataclasses.fields(cls) if f.name != "extra"]
+
+
+def _from_dict(cls, data):
+    names = set(_field_names(cls))
+    known = {key: value for key, value in data.items() if key in names}
+    extra = {key: value for key, value in data.items() if key not in names}
+    return cls(**known, extra=extra)
+
+
+def _to_dict(record):
+    data = {}
+    for name in _field_names(type(record)):
+        value = getattr(record, name)
+        if value is not None:
+            data[name] = value
+    data.update(record.extra)
+    return data
+
+
+def migrate(data, run_id=None):
+    """Upgrade a run dict to the current schema; returns a new dict.
+
+    Tolerates partial dicts (inline metrics passed to the analyzer), so
+    only the fields that are present are renamed or derived.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("A run must be a JSON object")
+    version = data.get("schema_version", 1)
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"Run uses schema version {version}; this code understands up to {SCHEMA_VERSION}")
+    data = dict(data)
+    if version < 2:
+        for old, new in LEGACY_FIELDS.items():
+            if old in data:
+                value = data.pop(old)
+                data.setdefault(new, value)
+        if "errors" in data:
+            errors = data.pop("errors")
+            total = data.get("total_requests")
+            if "error_rate" not in data and total:
+                data["error_rate"] = round(errors / total * 100, 2)
+    if run_id is not None and not data.get("run_id"):
+        data["run_id"] = str(run_id)
+    data["schema_version"] = SCHEMA_VERSION
+    return data
+
+
+def run_format(path):
+    name = Path(path).name
+    for fmt in sorted(RUN_FORMATS, key=len, reverse=True):
+        if name.endswith(f".{fmt}"):
+            return fmt
+    return None
+
+
+def run_stem(path):
+    """File name without its run-format suffix: ``run_<id>`` for every format."""
+    name = Path(path).name
+    fmt = run_format(path)
+    return name[: -len(fmt) - 1] if fmt else Path(path).stem
+
+
+def is_run_file(path):
+    return run_format(path) is not None
+
+
+def run_file_path(runs_dir, run_id, fmt=None):
+    fmt = fmt or DEFAULT_RUN_FORMAT
+    if fmt not in RUN_FORMATS:
+        raise ValueError(f"Unknown run format '{fmt}'. Choose one of: {', '.join(RUN_FORMATS)}")
+    return Path(runs_dir) / f"run_{run_id}.{fmt}"
+
+
+def list_run_files(runs_dir):
+    return sorted(path for path in Path(runs_dir).glob("run_*") if is_run_file(path))
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError as e:
+        raise RuntimeError("msgpack run files require the msgpack package (pip install msgpack)") from e
+    return msgpack
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise RuntimeError("Compressed run files require the zstandard package (pip install zstandard)") from e
+    return zstandard
+
+
+def _orjson():
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+def encode_run(data, fmt=JSON):
+    if fmt == JSON:
+        orjson = _orjson()
+        if orjson is not None:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2) + b"\n"
+        return (json.dumps(data, indent=2) + "\n").encode("utf-8")
+    if fmt == JSON_GZ:
+        # Compact separators: nobody reads a compressed file by eye. mtime=0 keeps the bytes reproducible.
+        orjson = _orjson()
+        payload = orjson.dumps(data) if orjson is not None else json.dumps(data, separators=(",", ":")).encode("utf-8")
+        return gzip.compress(payload, compresslevel=6, mtime=0)
+    payload = _msgpack().packb(data, use_bin_type=True)
+    if fmt == MSGPACK_ZSTD:
+        return _zstd().ZstdCompressor(level=ZSTD_LEVEL).compress(payload)
+    return payload
+
+
+def decode_run(payload, fmt=JSON):
+    if fmt == JSON:
+        orjson = _orjson()
+        return orjson.loads(payload) if orjson is not None else json.loads(payload)
+    if fmt == JSON_GZ:
+        return decode_run(gzip.decompress(payload), JSON)
+    if fmt == MSGPACK_ZSTD:
+        payload = _zstd().ZstdDecompressor().decompress(payload)
+    return _msgpack().unpackb(payload, raw=False, strict_map_key=False)
+
+
+def run_id_from_path(path):
+    return run_stem(path).replace("run_", "", 1)
+
+
+def read_run(path):
+    """Run file of any format and schema version as a :class:`RunRecord`."""
+    path = Path(path)
+    return RunRecord.from_dict(decode_run(path.read_bytes(), run_format(path) or JSON), run_id_from_path(path))
+
+
+def read_run_dict(path):
+    """Current-schema dict of a run file, for code that works on plain dicts."""
+    return read_run(path).to_dict()
+
+
+def write_run(path, record):
+    """Write ``record`` (a RunRecord or dict) atomically in the format named by the suffix of ``path``."""
+    path = Path(path)
+    if isinstance(record, dict):
+        record = RunRecord.from_dict(record, run_id_from_path(path))
+    fmt = run_format(path)
+    if fmt is None:
+        raise ValueError(f"'{path.name}' does not end in a run format suffix ({', '.join(RUN_FORMATS)})")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_bytes(encode_run(record.to_dict(), fmt))
+    os.replace(tmp_path, path)
+    return record
@@ -0,0 +1,47 @@
+from utils.histogram import LatencyHistogram
+
+
+class RunStats:
+    """Mergeable per-process request counters plus latency histogram."""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.request_count = 0
+        self.error_count = 0
+
+    def record(self, latency_ms, ok=True):
+        self.request_count += 1
+        self.latency.record(latency_ms)
+        if not ok:
+            self.error_count += 1
+
+    def merge(self, other):
+        self.latency.merge(other.latency)
+        self.request_count += other.request_count
+        self.error_count += other.error_count
+        return self
+
+    def reset(self):
+        self.latency.reset()
+        self.request_count = 0
+        self.error_count = 0
+
+    @property
+    def error_rate(self):
+        return (self.error_count / self.request_count) * 100 if self.request_count > 0 else 0
+
+    def to_dict(self):
+        return {
+            "request_count": self.request_count,
+            "error_count": self.error_count,
+            "latency_histogram": self.latency.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.request_count = data.get("request_count", 0)
+        stats.error_count = data.get("error_count", 0)
+        if data.get("latency_histogram"):
+            stats.latency = LatencyHistogram.from_dict(data["latency_histogram"])
+        return stats
@@ -0,0 +1,201 @@
+import ast
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+from utils.histogram import LatencyHistogram
+
+# column name -> (array typecode, numpy dtype without byte order)
+COLUMNS = {
+    "timestamp": ("d", "f8"),
+    "latency_ms": ("f", "f4"),
+    "status": ("h", "i2"),
+    "bytes": ("q", "i8"),
+    # 1 when the status was one the endpoint expects (its expect_status), as counted by the run.
+    "ok": ("B", "u1"),
+}
+# Columns that segments written by older versions may lack.
+OPTIONAL_COLUMNS = {"ok"}
+SEGMENT_ROWS = 65536
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+BYTE_ORDER = "<" if sys.byteorder == "little" else ">"
+
+
+def samples_dir_for(run_file, run_id):
+    return Path(run_file).resolve().parent.parent / "samples" / str(run_id)
+
+
+def resolve_samples_dir(run_file, data):
+    if not data.get("samples_dir"):
+        return None
+    return Path(run_file).resolve().parent.parent / data["samples_dir"]
+
+
+def write_npy(path, column, values):
+    """Write an ``array.array`` as a 1-D .npy file without importing NumPy."""
+    header = "{'descr': '%s%s', 'fortran_order': False, 'shape': (%d,), }" % (
+        BYTE_ORDER, COLUMNS[column][1], len(values)
+    )
+    # Total header length (magic + length field + dict + newline) is padded to 64 bytes.
+    padding = 64 - (len(NPY_MAGIC) + 2 + len(header) + 1) % 64
+    header = header + " " * padding + "\n"
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(NPY_MAGIC)
+        f.write(struct.pack("<H", len(header)))
+        f.write(header.encode("latin1"))
+        values.tofile(f)
+    os.replace(tmp_path, path)
+
+
+def read_npy_header(path):
+    with open(path, "rb") as f:
+        if f.read(len(NPY_MAGIC))[:6] != NPY_MAGIC[:6]:
+            raise ValueError(f"{path} is not a .npy file")
+        (header_len,) = struct.unpack("<H", f.read(2))
+        return ast.literal_eval(f.read(header_len).decode("latin1"))
+
+
+class SampleWriter:
+    """Append-only writer of typed columnar segments, one .npy file per column.
+
+    Rows are buffered and written as ``seg-<pid>-<seq>.<column>.npy`` every
+    ``segment_rows`` rows, so several Locust processes can share a run directory.
+    """
+
+    def __init__(self, directory, segment_rows=SEGMENT_ROWS):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_rows = segment_rows
+        self.prefix = f"seg-{os.getpid()}"
+        self.sequence = 0
+        self.rows = 0
+        self._reset_buffers()
+
+    def _reset_buffers(self):
+        self.buffers = {column: array(typecode) for column, (typecode, _) in COLUMNS.items()}
+
+    def append(self, timestamp, latency_ms, status, size, ok=None):
+        self.buffers["timestamp"].append(timestamp)
+        self.buffers["latency_ms"].append(latency_ms)
+        self.buffers["status"].append(status)
+        self.buffers["bytes"].append(size)
+        self.buffers["ok"].append(int(200 <= status < 400 if ok is None else bool(ok)))
+        if len(self.buffers["timestamp"]) >= self.segment_rows:
+            self.flush()
+
+    def flush(self):
+        count = len(self.buffers["timestamp"])
+        if not count:
+            return
+        name = f"{self.prefix}-{self.sequence:06d}"
+        # The timestamp column is written last; readers treat it as the commit marker.
+        for column in sorted(COLUMNS, key=lambda c: c == "timestamp"):
+            write_npy(self.directory / f"{name}.{column}.npy", column, self.buffers[column])
+        self.sequence += 1
+        self.rows += count
+        self._reset_buffers()
+
+    def close(self):
+        self.flush()
+
+
+class SampleStore:
+    """Memory-mapped reader over the segments written by :class:`SampleWriter`."""
+
+    def __init__(self, directory):
+        try:
+            import numpy as np
+        except ImportError as e:
+            raise RuntimeError("Reading raw samples requires numpy (pip install numpy)") from e
+        self.np = np
+        self.directory = Path(directory)
+
+    def segments(self):
+        return sorted(p.name[: -len(".timestamp.npy")] for p in self.directory.glob("seg-*.timestamp.npy"))
+
+    def load_segment(self, name, columns=None):
+        segment = {}
+        for column in columns or COLUMNS:
+            path = self.directory / f"{name}.{column}.npy"
+            if column in OPTIONAL_COLUMNS and not path.exists():
+                continue
+            segment[column] = self.np.load(path, mmap_mode="r")
+        return segment
+
+    def iter_segments(self, columns=None, since=None, until=None, ok_only=False):
+        needed = set(columns or COLUMNS)
+        if since is not None or until is not None:
+            needed.add("timestamp")
+        if ok_only:
+            needed |= {"ok", "status"}
+        for name in self.segments():
+            segment = self.load_segment(name, needed)
+            mask = None
+            if since is not None:
+                mask = segment["timestamp"] >= since
+            if until is not None:
+                upper = segment["timestamp"] <= until
+                mask = upper if mask is None else mask & upper
+            if ok_only:
+                if "ok" in segment:
+                    ok = segment["ok"] != 0
+                else:
+                    # Written before the success flag was stored: fall back to 2xx/3xx.
+                    ok = (segment["status"] >= 200) & (segment["status"] < 400)
+                mask = ok if mask is None else mask & ok
+            if mask is not None:
+                segment = {column: values[mask] for column, values in segment.items()}
+            yield segment
+
+    def count(self, **filters):
+        return sum(len(segment["latency_ms"]) for segment in self.iter_segments(["latency_ms"], **filters))
+
+    def latency_histogram(self, **filters):
+        """Bucket every latency into a :class:`LatencyHistogram` with vectorized NumPy."""
+        np = self.np
+        hist = LatencyHistogram()
+        counts = np.zeros(hist.bucket_count, dtype=np.int64)
+        total = 0.0
+        low = high = None
+        for segment in self.iter_segments(["latency_ms"], **filters):
+            values = np.maximum(np.asarray(segment["latency_ms"], dtype=np.float64), 0.0)
+            if not len(values):
+                continue
+            index = np.floor(np.log(np.maximum(values, hist.lowest) / hist.lowest) / hist._log_growth)
+            index = np.clip(index.astype(np.int64), 0, hist.bucket_count - 1)
+            counts += np.bincount(index, minlength=hist.bucket_count)
+            total += float(values.sum())
+            seg_low, seg_high = float(values.min()), float(values.max())
+            low = seg_low if low is None else min(low, seg_low)
+            high = seg_high if high is None else max(high, seg_high)
+        hist.counts = counts.tolist()
+        hist.count = int(counts.sum())
+        hist.total = total
+        hist.min, hist.max = low, high
+        return hist
+
+    def percentiles(self, qs=(50, 90, 95, 99, 99.9), **filters):
+        return self.latency_histogram(**filters).percentiles(qs)
+
+    def histogram(self, column="latency_ms", bins=50, log=True, **filters):
+        """Return ``(counts, edges)`` for ``column`` without materializing it."""
+        np = self.np
+        low = high = None
+        for segment in self.iter_segments([column], **filters):
+            values = segment[column]
+            if len(values):
+                low = float(values.min()) if low is None else min(low, float(values.min()))
+                high = float(values.max()) if high is None else max(high, float(values.max()))
+        if low is None:
+            return np.zeros(bins, dtype=np.int64), np.zeros(bins + 1)
+        if log and low > 0:
+            edges = np.geomspace(low, high if high > low else low * 1.01, bins + 1)
+        else:
+            edges = np.linspace(low, high if high > low else low + 1, bins + 1)
+        counts = np.zeros(bins, dtype=np.int64)
+        for segment in self.iter_segments([column], **filters):
+            counts += np.histogram(segment[column], bins=edges)[0]
+        return counts, edges
@@ -0,0 +1,100 @@
+import bisect
+import itertools
+import json
+import random
+from pathlib import Path
+
+HTTP_METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS")
+
+
+class Endpoint:
+    """One weighted request of a scenario."""
+
+    __slots__ = ("name", "method", "path", "weight", "headers", "body", "json", "expect_status")
+
+    def __init__(self, path, name=None, method="GET", weight=1.0, headers=None, body=None, json=None,
+                 expect_status=None):
+        self.path = path
+        self.name = name or f"{method.upper()} {path}"
+        self.method = method.upper()
+        self.weight = float(weight)
+        self.headers = dict(headers or {})
+        self.body = body
+        self.json = json
+        self.expect_status = list(expect_status) if expect_status else [200]
+        if self.method not in HTTP_METHODS:
+            raise ValueError(f"Endpoint '{self.name}': unsupported method '{method}'")
+        if self.weight <= 0:
+            raise ValueError(f"Endpoint '{self.name}': weight must be positive")
+
+    def request_kwargs(self):
+        kwargs = {"name": self.name}
+        if self.headers:
+            kwargs["headers"] = self.headers
+        if self.json is not None:
+            kwargs["json"] = self.json
+        elif self.body is not None:
+            kwargs["data"] = self.body if isinstance(self.body, (str, bytes)) else json.dumps(self.body)
+        return kwargs
+
+    def describe(self):
+        return {"method": self.method, "path": self.path, "weight": self.weight}
+
+
+class Scenario:
+    """Weighted set of endpoints; :meth:`pick` is O(log n) per request."""
+
+    def __init__(self, endpoints, name=None):
+        if not endpoints:
+            raise ValueError("A scenario needs at least one endpoint")
+        names = [endpoint.name for endpoint in endpoints]
+        duplicates = sorted({n for n in names if names.count(n) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate endpoint names in scenario: {', '.join(duplicates)}")
+        self.endpoints = endpoints
+        self.name = name or endpoints[0].path
+        self._cumulative = list(itertools.accumulate(endpoint.weight for endpoint in endpoints))
+
+    def pick(self, rng=random):
+        return self.endpoints[bisect.bisect_right(self._cumulative, rng.random() * self._cumulative[-1])]
+
+    @property
+    def is_single(self):
+        return len(self.endpoints) == 1
+
+
+def parse_scenario(data, name=None):
+    if isinstance(data, list):
+        data = {"endpoints": data}
+    if not isinstance(data, dict) or not isinstance(data.get("endpoints"), list):
+        raise ValueError("Scenario must be a list of endpoints or an object with an 'endpoints' list")
+    endpoints = []
+    for index, spec in enumerate(data["endpoints"]):
+        if isinstance(spec, str):
+            spec = {"path": spec}
+        if not isinstance(spec, dict) or "path" not in spec:
+            raise ValueError(f"Scenario endpoint #{index + 1} needs a 'path'")
+        unknown = set(spec) - set(Endpoint.__slots__)
+        if unknown:
+            raise ValueError(f"Scenario endpoint #{index + 1}: unknown keys {', '.join(sorted(unknown))}")
+        endpoints.append(Endpoint(**spec))
+    return Scenario(endpoints, data.get("name") or name)
+
+
+def load_scenario(path):
+    """Read a JSON or YAML (requires PyYAML) scenario file."""
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise RuntimeError("YAML scenarios require PyYAML (pip install pyyaml); use a .json file instead") from e
+        data = yaml.safe_load(text)
+    else:
+        data = json.loads(text)
+    return parse_scenario(data, name=path.stem)
+
+
+def single_endpoint_scenario(path):
+    return Scenario([Endpoint(path, name=path)], name=path)
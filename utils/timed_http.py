@@ -0,0 +1,147 @@
+import http.client
+import json
+import socket
+import ssl
+import time
+from urllib.parse import urlencode, urlsplit
+
+
+def _ms(start, end):
+    return (end - start) * 1000
+
+
+class TimedResponse:
+    """Response of :class:`TimedHTTPClient` with the time spent in each request phase (ms)."""
+
+    __slots__ = ("status_code", "reason", "headers", "content", "url", "phases", "elapsed_ms")
+
+    def __init__(self, status_code, reason, headers, content, url, phases, elapsed_ms):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+        self.url = url
+        self.phases = phases
+        self.elapsed_ms = elapsed_ms
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+
+class TimedHTTPClient:
+    """Small HTTP/1.1 client that times DNS, connect, TLS, time to first byte and download.
+
+    Built on ``http.client`` with the socket opened by hand, so every phase
+    is measured separately (under Locust the socket calls are gevent-patched
+    and cooperative). One keep-alive connection is kept per host; a request
+    that reuses it spends 0 ms in dns/connect/tls. ``ttfb`` runs from
+    sending the request to the status line and headers arriving, so it holds
+    the server's think time; ``download`` is reading the body.
+    """
+
+    def __init__(self, base_url, connection_timeout=60.0, network_timeout=60.0, verify=True):
+        self.base_url = base_url.rstrip("/")
+        self.connection_timeout = connection_timeout
+        self.network_timeout = network_timeout
+        self._ssl_context = ssl.create_default_context()
+        if not verify:
+            self._ssl_context.check_hostname = False
+            self._ssl_context.verify_mode = ssl.CERT_NONE
+        self._connections = {}
+
+    def _target(self, path):
+        url = path if path.startswith(("http://", "https://")) else f"{self.base_url}/{path.lstrip('/')}"
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Cannot send a request to '{url}'")
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        return url, (parts.scheme, parts.hostname, port), target
+
+    def _connect(self, key, phases):
+        scheme, host, port = key
+        start = time.perf_counter()
+        addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        resolved = time.perf_counter()
+        sock, error = None, None
+        for family, kind, proto, _, address in addresses:
+            sock = socket.socket(family, kind, proto)
+            sock.settimeout(self.connection_timeout)
+            try:
+                sock.connect(address)
+                break
+            except OSError as e:
+                sock.close()
+                sock, error = None, e
+        if sock is None:
+            raise error or OSError(f"Could not resolve {host}")
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connected = time.perf_counter()
+        if scheme == "https":
+            sock = self._ssl_context.wrap_socket(sock, server_hostname=host)
+        handshaken = time.perf_counter()
+        sock.settimeout(self.network_timeout)
+        connection = http.client.HTTPConnection(host, port, timeout=self.network_timeout)
+        connection.sock = sock
+        phases.update(dns=_ms(start, resolved), connect=_ms(resolved, connected), tls=_ms(connected, handshaken))
+        return connection
+
+    def _exchange(self, connection, method, target, body, headers, phases):
+        sent = time.perf_counter()
+        connection.request(method, target, body=body, headers=headers)
+        response = connection.getresponse()
+        first_byte = time.perf_counter()
+        content = response.read()
+        done = time.perf_counter()
+        phases.update(ttfb=_ms(sent, first_byte), download=_ms(first_byte, done))
+        return response, content
+
+    def request(self, method, path, headers=None, json=None, data=None, params=None):
+        url, key, target = self._target(path)
+        if params:
+            target += ("&" if "?" in target else "?") + urlencode(params)
+        headers = dict(headers or {})
+        body = data.encode("utf-8") if isinstance(data, str) else data
+        if json is not None:
+            body = _json_body(json)
+            headers.setdefault("Content-Type", "application/json")
+        scheme, host, port = key
+        default_port = 443 if scheme == "https" else 80
+        headers.setdefault("Host", host if port == default_port else f"{host}:{port}")
+        headers.setdefault("Accept-Encoding", "identity")
+
+        start = time.perf_counter()
+        phases = {"dns": 0.0, "connect": 0.0, "tls": 0.0}
+        connection = self._connections.pop(key, None)
+        try:
+            if connection is not None:
+                try:
+                    response, content = self._exchange(connection, method, target, body, headers, phases)
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    # The server closed the idle keep-alive connection; retry once on a new one.
+                    connection.close()
+                    connection = None
+            if connection is None:
+                start = time.perf_counter()
+                connection = self._connect(key, phases)
+                response, content = self._exchange(connection, method, target, body, headers, phases)
+        except BaseException:
+            if connection is not None:
+                connection.close()
+            raise
+        elapsed_ms = _ms(start, time.perf_counter())
+        if response.will_close or headers.get("Connection", "").lower() == "close":
+            connection.close()
+        else:
+            self._connections[key] = connection
+        return TimedResponse(response.status, response.reason, dict(response.getheaders()), content, url, phases, elapsed_ms)
+
+    def close(self):
+        for connection in self._connections.values():
+            connection.close()
+        self._connections = {}
+
+
+def _json_body(value):
+    return json.dumps(value).encode("utf-8")
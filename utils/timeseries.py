@@ -0,0 +1,240 @@
+import gzip
+import json
+import math
+from pathlib import Path
+
+from utils.histogram import LatencyHistogram
+from utils.run_stats import RunStats
+from utils.run_schema import run_stem
+
+DEFAULT_INTERVAL = 1.0
+DEFAULT_WARMUP_FRACTION = 0.1
+
+
+def timeseries_path(run_file):
+    run_file = Path(run_file)
+    return run_file.with_name(f"{run_stem(run_file)}.windows.ndjson")
+
+
+class WindowAggregator:
+    """Buckets requests into fixed wall-clock windows keyed by window start."""
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = float(interval)
+        self.windows = {}
+        self.next_start = None
+
+    def window_start(self, now):
+        return round(math.floor(now / self.interval) * self.interval, 6)
+
+    def record(self, latency_ms, ok, now):
+        start = self.window_start(now)
+        stats = self.windows.get(start)
+        if stats is None:
+            stats = self.windows[start] = RunStats()
+        stats.record(latency_ms, ok)
+
+    def merge(self, payload):
+        for start, data in payload.items():
+            start = float(start)
+            incoming = RunStats.from_dict(data)
+            if start in self.windows:
+                self.windows[start].merge(incoming)
+            else:
+                self.windows[start] = incoming
+
+    def drain(self):
+        payload = {str(start): stats.to_dict() for start, stats in self.windows.items()}
+        self.windows = {}
+        return payload
+
+    def pop_closed(self, now, grace=0.0):
+        """Pop every window that ended at least ``grace`` seconds before ``now``.
+
+        Empty windows between the first and last recorded window are emitted
+        too, so stalls show up as zero-throughput records instead of gaps.
+        """
+        cutoff = now - grace - self.interval
+        records = []
+        if self.next_start is not None:
+            # Windows reported after they were already written out; emitted
+            # again under the same start and coalesced by load_windows().
+            for start in sorted(s for s in self.windows if s < self.next_start):
+                records.append(window_record(start, self.interval, self.windows.pop(start)))
+        starts = [start for start in self.windows if start <= cutoff]
+        if self.next_start is not None and self.next_start <= cutoff:
+            starts.append(self.next_start)
+        if not starts:
+            return records
+        first = self.next_start if self.next_start is not None else min(starts)
+        last = max(starts)
+        start = first
+        while start <= last + 1e-9:
+            stats = self.windows.pop(start, None) or RunStats()
+            records.append(window_record(start, self.interval, stats))
+            start = round(start + self.interval, 6)
+        self.next_start = start
+        return records
+
+    def pop_all(self):
+        if not self.windows:
+            return []
+        return self.pop_closed(max(self.windows) + self.interval)
+
+
+def window_record(start, interval, stats):
+    latency = stats.latency.summary(qs=(50, 95, 99))
+    return {
+        "t": start,
+        "interval": interval,
+        "requests": stats.request_count,
+        "errors": stats.error_count,
+        "rps": round(stats.request_count / interval, 2),
+        "error_rate": round(stats.error_rate, 2),
+        "avg": latency["avg"],
+        "p50": latency["p50"],
+        "p95": latency["p95"],
+        "p99": latency["p99"],
+        "latency_histogram": stats.latency.to_dict() if stats.latency.count else None,
+    }
+
+
+class TimeSeriesWriter:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def write(self, records):
+        for record in records:
+            self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        if records:
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def read_windows(path):
+    path = Path(path)
+    if not path.exists():
+        return
+    # Retention gzips the time series of cold runs.
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A run still in progress may have a partially written last line.
+                continue
+
+
+def load_windows(path):
+    windows = {}
+    for record in read_windows(path):
+        previous = windows.get(record["t"])
+        windows[record["t"]] = coalesce_windows(previous, record) if previous else record
+    return [windows[t] for t in sorted(windows)]
+
+
+class WindowTail:
+    """Incrementally follows a time-series file that is still being written.
+
+    Each :meth:`poll` reads only the bytes appended since the previous call;
+    a trailing partial line is kept until its newline arrives. Re-emitted
+    late windows are coalesced as in :func:`load_windows`.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.offset = 0
+        self._partial = b""
+        self._windows = {}
+
+    def poll(self):
+        """Return the windows whose record changed since the last call."""
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return []
+        self.offset += len(chunk)
+        lines = (self._partial + chunk).split(b"\n")
+        self._partial = lines.pop()
+        changed = {}
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            previous = self._windows.get(record["t"])
+            record = coalesce_windows(previous, record) if previous else record
+            self._windows[record["t"]] = changed[record["t"]] = record
+        return [changed[t] for t in sorted(changed)]
+
+    def windows(self):
+        return [self._windows[t] for t in sorted(self._windows)]
+
+
+def coalesce_windows(first, second):
+    stats = RunStats()
+    for record in (first, second):
+        stats.merge(RunStats.from_dict({
+            "request_count": record.get("requests", 0),
+            "error_count": record.get("errors", 0),
+            "latency_histogram": record.get("latency_histogram"),
+        }))
+    return window_record(first["t"], first["interval"], stats)
+
+
+def split_warmup(windows, warmup_seconds=None):
+    if not windows:
+        return [], []
+    start = windows[0]["t"]
+    if warmup_seconds is None:
+        span = windows[-1]["t"] + windows[-1]["interval"] - start
+        warmup_seconds = max(windows[0]["interval"], span * DEFAULT_WARMUP_FRACTION)
+    warmup = [w for w in windows if w["t"] < start + warmup_seconds]
+    steady = [w for w in windows if w["t"] >= start + warmup_seconds]
+    return warmup, steady
+
+
+def merge_window_histograms(windows):
+    merged = LatencyHistogram()
+    for window in windows:
+        if window.get("latency_histogram"):
+            merged.merge(LatencyHistogram.from_dict(window["latency_histogram"]))
+    return merged
+
+
+def summarize_windows(windows):
+    if not windows:
+        return None
+    stats = RunStats()
+    for window in windows:
+        stats.request_count += window.get("requests", 0)
+        stats.error_count += window.get("errors", 0)
+        if window.get("latency_histogram"):
+            stats.latency.merge(LatencyHistogram.from_dict(window["latency_histogram"]))
+    span = sum(w["interval"] for w in windows)
+    latency = stats.latency.summary(qs=(50, 95, 99))
+    rps = [w["rps"] for w in windows]
+    mean_rps = sum(rps) / len(rps)
+    return {
+        "windows": len(windows),
+        "seconds": span,
+        "throughput_rps": round(stats.request_count / span, 2) if span else 0,
+        "throughput_cv": round((sum((r - mean_rps) ** 2 for r in rps) / len(rps)) ** 0.5 / mean_rps, 3) if mean_rps else None,
+        "error_rate": round(stats.error_rate, 2),
+        "avg_response_time": latency["avg"],
+        "p50_response_time": latency["p50"],
+        "p95_response_time": latency["p95"],
+        "p99_response_time": latency["p99"],
+    }
@@ -0,0 +1,198 @@
+import bisect
+import threading
+
+from utils.run_catalog import RunCatalog
+
+DEFAULT_WINDOW = 20
+# CUSUM slack and decision threshold, in robust standard deviations.
+DEFAULT_DRIFT = 0.75
+DEFAULT_THRESHOLD = 10.0
+DEFAULT_ANOMALY_SCORE = 3.5
+# Points used to estimate each segment's CUSUM reference level.
+REFERENCE_POINTS = 100
+MAD_SCALE = 1.4826
+
+
+def median(sorted_values):
+    n = len(sorted_values)
+    mid = n // 2
+    return sorted_values[mid] if n % 2 else (sorted_values[mid - 1] + sorted_values[mid]) / 2
+
+
+def robust_location(sorted_values):
+    """Median and MAD-based standard deviation; never returns a zero scale."""
+    center = median(sorted_values)
+    mad = median(sorted(abs(v - center) for v in sorted_values))
+    return center, MAD_SCALE * mad or abs(center) * 0.01 or 1.0
+
+
+class SeriesState:
+    """Incremental rolling-baseline anomaly scoring plus two-sided CUSUM for one metric series.
+
+    Anomaly scores are robust z-scores against the median/MAD of the previous
+    ``window`` points. The CUSUM reference is estimated from the start of each
+    segment (at most ``REFERENCE_POINTS`` points) and re-estimated after every
+    detected change, so a new point costs O(window) however long the history is.
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW, drift=DEFAULT_DRIFT, threshold=DEFAULT_THRESHOLD,
+                 anomaly_score=DEFAULT_ANOMALY_SCORE):
+        self.window = window
+        self.drift = drift
+        self.threshold = threshold
+        self.anomaly_score = anomaly_score
+        self.last_rowid = 0
+        self.run_ids = []
+        self.started_at = []
+        self.values = []
+        self.scores = []
+        self.baseline = []
+        self.change_points = []
+        self.anomalies = []
+        self._recent = []
+        self._sorted = []
+        self._segment_start = 0
+        self._reference = None
+        self._pos = 0.0
+        self._neg = 0.0
+        self._pos_start = None
+        self._neg_start = None
+
+    def _push_recent(self, value):
+        self._recent.append(value)
+        bisect.insort(self._sorted, value)
+        if len(self._recent) > self.window:
+            old = self._recent.pop(0)
+            del self._sorted[bisect.bisect_left(self._sorted, old)]
+
+    def _rolling_stats(self):
+        if len(self._sorted) < max(3, self.window // 2):
+            return None, None
+        return robust_location(self._sorted)
+
+    def add(self, rowid, run_id, started_at, value):
+        index = len(self.values)
+        self.last_rowid = rowid
+        self.run_ids.append(run_id)
+        self.started_at.append(started_at)
+        self.values.append(value)
+
+        center, scale = self._rolling_stats()
+        self.baseline.append(center)
+        score = None if center is None else (value - center) / scale
+        self.scores.append(None if score is None else round(score, 3))
+        anomalous = score is not None and abs(score) >= self.anomaly_score
+        if anomalous:
+            self.anomalies.append(index)
+        else:
+            # Outliers are reported but kept out of the baseline so one bad run does not move it.
+            self._push_recent(value)
+
+        segment_length = index - self._segment_start + 1
+        if segment_length < self.window:
+            return
+        if segment_length <= REFERENCE_POINTS:
+            # Keep refining the reference while the segment is young; a noisy level estimate
+            # is the main source of false alarms right after a change.
+            self._reference = robust_location(sorted(self.values[self._segment_start:]))
+        ref_center, ref_scale = self._reference
+        # Winsorize so a single spike is an anomaly, not a level shift.
+        z = max(-self.anomaly_score, min(self.anomaly_score, (value - ref_center) / ref_scale))
+        self._pos = max(0.0, self._pos + z - self.drift)
+        self._neg = max(0.0, self._neg - z - self.drift)
+        if self._pos == 0:
+            self._pos_start = None
+        elif self._pos_start is None:
+            self._pos_start = index
+        if self._neg == 0:
+            self._neg_start = None
+        elif self._neg_start is None:
+            self._neg_start = index
+
+        if self._pos > self.threshold or self._neg > self.threshold:
+            start = self._pos_start if self._pos > self.threshold else self._neg_start
+            self._record_change(start)
+            self._recent, self._sorted = [], []
+            for v in self.values[start:]:
+                self._push_recent(v)
+            self._reference = None
+            self._pos = self._neg = 0.0
+            self._pos_start = self._neg_start = None
+
+    def _record_change(self, start):
+        before = self.values[self._segment_start:start]
+        after = self.values[start:]
+        before_mean = sum(before) / len(before)
+        after_mean = sum(after) / len(after)
+        self.change_points.append({
+            "index": start,
+            "run_id": self.run_ids[start],
+            "started_at": self.started_at[start],
+            "before_mean": round(before_mean, 3),
+            "after_mean": round(after_mean, 3),
+            "shift_percent": round((after_mean - before_mean) / before_mean * 100, 2) if before_mean else None,
+            "direction": "up" if after_mean > before_mean else "down",
+        })
+        self._segment_start = start
+
+    def report(self, include_series=False, tail=None):
+        latest = None
+        if self.values:
+            latest = {
+                "run_id": self.run_ids[-1],
+                "started_at": self.started_at[-1],
+                "value": self.values[-1],
+                "baseline": self.baseline[-1],
+                "score": self.scores[-1],
+            }
+        result = {
+            "points": len(self.values),
+            "change_points": self.change_points,
+            "anomalies": [
+                {"index": i, "run_id": self.run_ids[i], "started_at": self.started_at[i],
+                 "value": self.values[i], "score": self.scores[i]}
+                for i in self.anomalies
+            ],
+            "latest": latest,
+        }
+        if include_series:
+            start = max(0, len(self.values) - tail) if tail else 0
+            result["series"] = {
+                "index": list(range(start, len(self.values))),
+                "run_id": self.run_ids[start:],
+                "started_at": self.started_at[start:],
+                "value": self.values[start:],
+                "baseline": self.baseline[start:],
+                "score": self.scores[start:],
+            }
+        return result
+
+
+class TrendEngine:
+    """Keeps one SeriesState per (endpoint, metric, options) and feeds it only runs added since the last call."""
+
+    def __init__(self, catalog=None):
+        self.catalog = catalog or RunCatalog()
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def update(self, metric="p95_response_time", endpoint=None, **series_options):
+        key = (endpoint, metric, tuple(sorted(series_options.items())))
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = SeriesState(**series_options)
+            rows = self.catalog.metric_series(metric, endpoint, state.last_rowid)
+            if len(state.values) + len(rows) != self.catalog.series_count(metric, endpoint):
+                # Runs were deleted or re-indexed: rebuild this series from scratch.
+                state = self._states[key] = SeriesState(**series_options)
+                rows = self.catalog.metric_series(metric, endpoint)
+            for rowid, run_id, started_at, value in rows:
+                state.add(rowid, run_id, started_at, float(value))
+            return state
+
+    def analyze(self, metric="p95_response_time", endpoint=None, include_series=False, tail=None, **series_options):
+        state = self.update(metric, endpoint, **series_options)
+        result = state.report(include_series, tail)
+        result.update({"metric": metric, "endpoint": endpoint})
+        return result